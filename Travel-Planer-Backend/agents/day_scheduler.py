@@ -0,0 +1,323 @@
+"""
+Day Scheduler - Fits places into days by their opening hours and the travel time between them.
+
+A day runs from DAY_START to DAY_END with a lunch and a dinner break. Visits follow one
+another: each starts only after travelling from the previous stop, while the place is
+open, and ends before it closes. Days are built greedily: at every step the open place
+that can be started soonest (better-rated places count as closer) is taken. The cost
+is O(days x visits per day x places), about a millisecond for 40 places over
+14 days, so it runs per request. The result is a feasible schedule: the basic itinerary
+renders it, and the GPT prompts carry it so the model narrates real times instead of inventing them.
+
+Opening hours are strings such as "Tue-Sun 09:00-18:00" or
+"Mon-Sun 12:00-15:00, 19:00-23:00; Sat 10:00-14:00" (Place.opening_hours). Places without
+them get the typical hours of their type. Trip dates aren't known, so each place is
+scheduled by its hours on the days it usually opens; the full string is shown alongside.
+"""
+
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from schemas.place_record import PlaceRecord
+
+DAY_START = 9 * 60
+MORNING_END = 13 * 60  # visits before lunch end by then
+DAY_END = 20 * 60  # last visit ends by then; dinner may start later
+LUNCH_EARLIEST = 12 * 60
+LUNCH_LATEST = 14 * 60
+DINNER_EARLIEST = 19 * 60
+DINNER_LATEST = 21 * 60 + 30
+LUNCH_MINUTES = 75
+DINNER_MINUTES = 90
+
+# Typical opening hours by place type, for places whose details have none
+TYPICAL_OPENING_HOURS = {
+    'museum': 'Tue-Sun 09:00-18:00',
+    'art_gallery': 'Tue-Sun 10:00-18:00',
+    'tourist_attraction': 'Mon-Sun 09:00-19:00',
+    'point_of_interest': 'Mon-Sun 09:00-19:00',
+    'historical_site': 'Mon-Sun 09:00-18:00',
+    'church': 'Mon-Sun 08:00-18:00',
+    'place_of_worship': 'Mon-Sun 08:00-18:00',
+    'park': 'Mon-Sun 07:00-21:00',
+    'natural_feature': 'Mon-Sun 00:00-24:00',
+    'zoo': 'Mon-Sun 09:30-17:30',
+    'aquarium': 'Mon-Sun 09:30-18:00',
+    'amusement_park': 'Mon-Sun 10:00-19:00',
+    'shopping_mall': 'Mon-Sun 10:00-21:00',
+    'store': 'Mon-Sat 10:00-19:30',
+    'market': 'Mon-Sat 08:00-14:00',
+    'restaurant': 'Mon-Sun 12:00-15:00, 19:00-23:00',
+    'cafe': 'Mon-Sun 08:00-19:00',
+    'bakery': 'Mon-Sat 07:00-19:00',
+    'bar': 'Mon-Sun 17:00-24:00',
+    'night_club': 'Wed-Sun 22:00-04:00',
+    'spa': 'Mon-Sun 10:00-21:00',
+    'stadium': 'Mon-Sun 10:00-18:00'
+}
+DEFAULT_OPENING_HOURS = 'Mon-Sun 09:00-18:00'
+
+# How long a visit takes by place type, in minutes
+VISIT_MINUTES = {
+    'museum': 120,
+    'art_gallery': 90,
+    'tourist_attraction': 90,
+    'amusement_park': 180,
+    'zoo': 150,
+    'aquarium': 120,
+    'park': 75,
+    'natural_feature': 120,
+    'church': 45,
+    'place_of_worship': 45,
+    'shopping_mall': 90,
+    'store': 45,
+    'market': 60,
+    'cafe': 45,
+    'bakery': 30,
+    'spa': 120
+}
+DEFAULT_VISIT_MINUTES = 90
+
+# Travel between stops: walk short hops, take transit for longer ones
+WALKING_KM = 1.5
+WALKING_KMH = 4.5
+TRANSIT_KMH = 20.0
+TRANSIT_OVERHEAD_MINUTES = 10
+DEFAULT_TRAVEL_MINUTES = 20  # when a place has no coordinates
+
+# Minutes of waiting or travel one rating star is worth when choosing the next stop
+RATING_WEIGHT = 20
+
+_WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+_RANGE_PATTERN = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?')
+
+Intervals = Tuple[Tuple[int, int], ...]
+
+@lru_cache(maxsize=1024)
+def parse_opening_hours(text: str) -> Optional[Tuple[Intervals, ...]]:
+    """
+    Opening intervals (minutes from midnight) for each weekday, Monday first,
+    or None if the text can't be read. Hours past midnight end the day at 24:00.
+    """
+    week: List[List[Tuple[int, int]]] = [[] for _ in _WEEKDAYS]
+    for rule in text.lower().split(';'):
+        rule = rule.strip()
+        if not rule:
+            continue
+        if rule.startswith(('daily', 'open 24')):
+            days, ranges = list(range(7)), ('00:00-24:00' if rule.startswith('open 24') else rule[5:])
+        else:
+            day_part, _, ranges = rule.partition(' ')
+            days = _parse_days(day_part)
+            if days is None:
+                return None
+        if ranges.strip() == 'closed':
+            for day in days:
+                week[day] = []
+            continue
+        intervals = []
+        for match in _RANGE_PATTERN.finditer(ranges):
+            start = int(match.group(1)) * 60 + int(match.group(2) or 0)
+            end = int(match.group(3)) * 60 + int(match.group(4) or 0)
+            intervals.append((start, end if end > start else 24 * 60))
+        if not intervals:
+            return None
+        for day in days:
+            week[day] = sorted(week[day] + intervals)
+    return tuple(tuple(day) for day in week)
+
+def _parse_days(text: str) -> Optional[List[int]]:
+    """
+    "Mon-Fri", "Sat,Sun" or "Tue" as weekday numbers (Monday is 0)
+    """
+    days = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        if first[:3] not in _WEEKDAYS or (last and last[:3] not in _WEEKDAYS):
+            return None
+        start = _WEEKDAYS.index(first[:3])
+        end = _WEEKDAYS.index(last[:3]) if last else start
+        days.extend((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    return days
+
+def opening_hours_for(place: PlaceRecord) -> str:
+    """
+    The place's opening hours, or the typical hours of its type
+    """
+    return place.opening_hours or TYPICAL_OPENING_HOURS.get(place.type_lower, DEFAULT_OPENING_HOURS)
+
+def _usual_hours(place: PlaceRecord) -> Intervals:
+    """
+    The hours the place keeps on most of the days it opens
+    """
+    week = parse_opening_hours(opening_hours_for(place))
+    if week is None:
+        week = parse_opening_hours(DEFAULT_OPENING_HOURS)
+    open_days = Counter(day for day in week if day)
+    return open_days.most_common(1)[0][0] if open_days else ()
+
+def travel_minutes(origin: Optional[PlaceRecord], destination: PlaceRecord) -> int:
+    """
+    Minutes from one stop to the next, rounded up to 5; 0 for the first stop of a day
+    """
+    if origin is None or origin is destination:
+        return 0
+    if None in (origin.lat, origin.lng, destination.lat, destination.lng):
+        return DEFAULT_TRAVEL_MINUTES
+    # Equirectangular approximation; exact enough within a city
+    mean_latitude = math.radians((origin.lat + destination.lat) / 2)
+    dx = (destination.lng - origin.lng) * math.cos(mean_latitude)
+    km = math.hypot(dx, destination.lat - origin.lat) * 111.32
+    if km <= WALKING_KM:
+        minutes = km / WALKING_KMH * 60
+    else:
+        minutes = TRANSIT_OVERHEAD_MINUTES + km / TRANSIT_KMH * 60
+    return max(5, 5 * math.ceil(minutes / 5))
+
+def _earliest_start(hours: Intervals, arrival: int, length: int, latest_start: int, latest_end: int) -> Optional[int]:
+    """
+    First time from arrival when the place is open for the whole visit, or None
+    """
+    for opens, closes in hours:
+        start = max(arrival, opens)
+        if start > latest_start:
+            return None
+        if start + length <= min(closes, latest_end):
+            return start
+    return None
+
+def clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class _Candidate:
+    """
+    A place with the facts the scheduler checks repeatedly, computed once
+    """
+
+    __slots__ = ('place', 'hours', 'length', 'rating_bonus', 'uses')
+
+    def __init__(self, place: PlaceRecord, length: int):
+        self.place = place
+        self.hours = _usual_hours(place)
+        self.length = length
+        self.rating_bonus = (place.rating or 0) * RATING_WEIGHT
+        self.uses = 0
+
+def _best_next(candidates: List[_Candidate], previous: Optional[PlaceRecord], now: int, latest_start: int,
+               latest_end: int, reuse_penalty: int = 0, length: Optional[int] = None) -> Optional[Tuple[_Candidate, int, int]]:
+    """
+    The candidate that can be started soonest (rating and reuse counted), with its start
+    and travel minutes; None if nothing fits. length overrides the candidates' own.
+    """
+    best = None
+    best_cost = math.inf
+    for candidate in candidates:
+        travel = travel_minutes(previous, candidate.place)
+        start = _earliest_start(candidate.hours, now + travel, length or candidate.length, latest_start, latest_end)
+        if start is None:
+            continue
+        cost = start - now - candidate.rating_bonus + candidate.uses * reuse_penalty
+        if cost < best_cost:
+            best, best_cost = (candidate, start, travel), cost
+    return best
+
+def _item(kind: str, candidate: _Candidate, start: int, length: int, travel: int,
+          previous: Optional[PlaceRecord]) -> Dict[str, Any]:
+    return {
+        'kind': kind,
+        'place': candidate.place,
+        'start': start,
+        'end': start + length,
+        'travel_minutes': travel,
+        'travel_from': previous.name if previous is not None and travel else None,
+        'opening_hours': opening_hours_for(candidate.place)
+    }
+
+def schedule_days(attractions: List[PlaceRecord], restaurants: List[PlaceRecord], duration: int,
+                  visits_per_day: int) -> List[Dict[str, Any]]:
+    """
+    A feasible schedule: one entry per day with its items in time order. Each item has
+    kind ("visit", "lunch" or "dinner"), place, start/end (minutes from midnight),
+    travel_minutes and travel_from (the previous stop) and the place's opening_hours.
+    Every attraction is visited at most once; days are filled evenly in list order of
+    preference, and restaurants repeat only once all have been used.
+    """
+    sights = [_Candidate(place, VISIT_MINUTES.get(place.type_lower, DEFAULT_VISIT_MINUTES)) for place in attractions]
+    # One list for both meals, so lunch and dinner go to different places while they can
+    meals = [_Candidate(place, LUNCH_MINUTES) for place in restaurants]
+    # Earlier attractions are preferred a little, like the ranking they came in
+    for rank, candidate in enumerate(sights):
+        candidate.rating_bonus -= rank
+
+    days = []
+    for day in range(1, duration + 1):
+        days_left = duration - day + 1
+        quota = min(visits_per_day, math.ceil(len(sights) / days_left)) if sights else 0
+        # At most half the day's visits (at least one) before lunch, the rest after
+        morning_quota = max(1, quota // 2) if quota else 0
+
+        items: List[Dict[str, Any]] = []
+        now, previous, visits = DAY_START, None, 0
+        lunch_done = False
+
+        while True:
+            if not lunch_done and (now >= LUNCH_EARLIEST or visits >= morning_quota):
+                now = max(now, LUNCH_EARLIEST)
+                choice = _best_next(meals, previous, now, LUNCH_LATEST, 24 * 60, reuse_penalty=24 * 60)
+                if choice is not None:
+                    candidate, start, travel = choice
+                    candidate.uses += 1
+                    items.append(_item('lunch', candidate, start, candidate.length, travel, previous))
+                    now, previous = start + candidate.length, candidate.place
+                else:
+                    # No restaurant open: still keep the lunch break free
+                    now += LUNCH_MINUTES
+                lunch_done = True
+                continue
+            if visits >= quota:
+                break
+
+            latest_end = MORNING_END if not lunch_done else DAY_END
+            choice = _best_next(sights, previous, now, latest_end, latest_end)
+            if choice is None:
+                if not lunch_done:
+                    # Nothing fits before lunch; have lunch and try the afternoon
+                    now = max(now, LUNCH_EARLIEST)
+                    visits = max(visits, morning_quota)
+                    continue
+                break
+
+            candidate, start, travel = choice
+            sights.remove(candidate)
+            items.append(_item('visit', candidate, start, candidate.length, travel, previous))
+            now, previous = start + candidate.length, candidate.place
+            visits += 1
+
+        lunch_places = [item['place'] for item in items if item['kind'] == 'lunch']
+        dinners = [meal for meal in meals if meal.place not in lunch_places] or meals
+        choice = _best_next(dinners, previous, max(now, DINNER_EARLIEST), DINNER_LATEST, 24 * 60,
+                            reuse_penalty=24 * 60, length=DINNER_MINUTES)
+        if choice is not None:
+            candidate, start, travel = choice
+            candidate.uses += 1
+            items.append(_item('dinner', candidate, start, DINNER_MINUTES, travel, previous))
+
+        days.append({'day': day, 'items': items})
+
+    return days
+
+def format_schedule(days: List[Dict[str, Any]]) -> str:
+    """
+    The schedule as one compact line per day, for LLM prompts
+    """
+    lines = []
+    for day in days:
+        parts = []
+        for item in day['items']:
+            label = item['place'].name if item['kind'] == 'visit' else f"{item['kind']} at {item['place'].name}"
+            parts.append(f"{clock(item['start'])}-{clock(item['end'])} {label} (open {item['opening_hours']})")
+        lines.append(f"Day {day['day']}: " + ("; ".join(parts) if parts else "free day"))
+    return "\n".join(lines)
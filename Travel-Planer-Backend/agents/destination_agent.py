@@ -3,39 +3,178 @@ Destination Agent - Responsible for parsing and understanding user travel reques
 """
 
 import re
-import openai
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import json
-import os
 
-def parse_destination_request(text: str) -> Dict[str, Any]:
-    """
-    Parse user's natural language travel request to extract:
-    - Destination
-    - Duration
-    - Interests/preferences
-    - Travel style
-    """
-    
-    print(f"Parsing request: {text}")
-    
-    # Try GPT parsing first
-    if os.getenv("OPENAI_API_KEY"):
-        try:
-            return _gpt_parse(text)
-        except Exception as e:
-            print(f"GPT parsing failed: {e}, falling back to regex parsing")
-            return _fallback_parse(text)
-    else:
-        print("No OpenAI API key found, using fallback parsing")
-        return _fallback_parse(text)
+from agents.interest_taxonomy import INTEREST_MATCHER
+from services.cache import get_cache
+from services.llm_client import chat_completion, llm_available
 
-def _gpt_parse(text: str) -> Dict[str, Any]:
-    """
-    Use GPT to parse the travel request intelligently
-    """
-    
-    system_prompt = """
+# A trip length in digits or words ("5 days", "5-day", "a week", "two nights"),
+# with the number of days per unit
+_NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14
+}
+_DAYS_PER_UNIT = {'day': 1, 'night': 1, 'week': 7, 'month': 30}
+_DURATION = r'\b(\d+|' + '|'.join(_NUMBER_WORDS) + r')\s*-?\s*(day|night|week|month)s?\b'
+_DURATION_PATTERN = re.compile(_DURATION)
+
+# Known destination phrases and their canonical names
+DESTINATION_MAPPING = {
+    'rome': 'Rome, Italy',
+    'florence': 'Florence, Italy',
+    'venice': 'Venice, Italy',
+    'milan': 'Milan, Italy',
+    'naples': 'Naples, Italy',
+    'italy': 'Italy',
+    'japan': 'Japan',
+    'tokyo': 'Tokyo, Japan',
+    'kyoto': 'Kyoto, Japan',
+    'osaka': 'Osaka, Japan',
+    'paris': 'Paris, France',
+    'france': 'France',
+    'london': 'London, UK',
+    'uk': 'United Kingdom',
+    'england': 'England, UK',
+    'spain': 'Spain',
+    'madrid': 'Madrid, Spain',
+    'barcelona': 'Barcelona, Spain',
+    'seville': 'Seville, Spain',
+    'greece': 'Greece',
+    'athens': 'Athens, Greece',
+    'santorini': 'Santorini, Greece',
+    'mykonos': 'Mykonos, Greece',
+    'thailand': 'Thailand',
+    'bangkok': 'Bangkok, Thailand',
+    'phuket': 'Phuket, Thailand',
+    'chiang mai': 'Chiang Mai, Thailand',
+    'india': 'India',
+    'delhi': 'New Delhi, India',
+    'mumbai': 'Mumbai, India',
+    'goa': 'Goa, India',
+    'rajasthan': 'Rajasthan, India',
+    'new york': 'New York, USA',
+    'usa': 'United States',
+    'america': 'United States',
+    'california': 'California, USA',
+    'los angeles': 'Los Angeles, USA',
+    'san francisco': 'San Francisco, USA',
+    'las vegas': 'Las Vegas, USA',
+    'miami': 'Miami, USA',
+    'germany': 'Germany',
+    'berlin': 'Berlin, Germany',
+    'munich': 'Munich, Germany',
+    'netherlands': 'Netherlands',
+    'amsterdam': 'Amsterdam, Netherlands',
+    'china': 'China',
+    'beijing': 'Beijing, China',
+    'shanghai': 'Shanghai, China',
+    'australia': 'Australia',
+    'sydney': 'Sydney, Australia',
+    'melbourne': 'Melbourne, Australia',
+    'canada': 'Canada',
+    'toronto': 'Toronto, Canada',
+    'vancouver': 'Vancouver, Canada',
+    'brazil': 'Brazil',
+    'rio': 'Rio de Janeiro, Brazil',
+    'sao paulo': 'São Paulo, Brazil',
+    'argentina': 'Argentina',
+    'buenos aires': 'Buenos Aires, Argentina',
+    'egypt': 'Egypt',
+    'cairo': 'Cairo, Egypt',
+    'turkey': 'Turkey',
+    'istanbul': 'Istanbul, Turkey',
+    'russia': 'Russia',
+    'moscow': 'Moscow, Russia',
+    'south korea': 'South Korea',
+    'seoul': 'Seoul, South Korea',
+    'vietnam': 'Vietnam',
+    'hanoi': 'Hanoi, Vietnam',
+    'ho chi minh': 'Ho Chi Minh City, Vietnam',
+    'singapore': 'Singapore',
+    'malaysia': 'Malaysia',
+    'kuala lumpur': 'Kuala Lumpur, Malaysia',
+    'indonesia': 'Indonesia',
+    'bali': 'Bali, Indonesia',
+    'jakarta': 'Jakarta, Indonesia',
+    'philippines': 'Philippines',
+    'manila': 'Manila, Philippines',
+    'morocco': 'Morocco',
+    'marrakech': 'Marrakech, Morocco',
+    'casablanca': 'Casablanca, Morocco',
+    'portugal': 'Portugal',
+    'lisbon': 'Lisbon, Portugal',
+    'porto': 'Porto, Portugal',
+    'croatia': 'Croatia',
+    'dubrovnik': 'Dubrovnik, Croatia',
+    'split': 'Split, Croatia',
+    'iceland': 'Iceland',
+    'reykjavik': 'Reykjavik, Iceland',
+    'norway': 'Norway',
+    'oslo': 'Oslo, Norway',
+    'bergen': 'Bergen, Norway',
+    'sweden': 'Sweden',
+    'stockholm': 'Stockholm, Sweden',
+    'denmark': 'Denmark',
+    'copenhagen': 'Copenhagen, Denmark',
+    'prague': 'Prague, Czech Republic',
+    'vienna': 'Vienna, Austria',
+    'budapest': 'Budapest, Hungary',
+    'edinburgh': 'Edinburgh, UK'
+}
+
+# Destination phrases, longest first, so multi-word names match before their parts
+_DESTINATIONS_BY_LENGTH = sorted(DESTINATION_MAPPING.items(), key=lambda x: len(x[0]), reverse=True)
+
+# Regions a trip tours rather than stays in, with the cities it visits in travel order
+REGION_ROUTES = {
+    'northern italy': ['Milan, Italy', 'Venice, Italy', 'Florence, Italy'],
+    'southern italy': ['Naples, Italy', 'Amalfi, Italy', 'Palermo, Italy'],
+    'tuscany': ['Florence, Italy', 'Siena, Italy', 'Pisa, Italy'],
+    'southern spain': ['Seville, Spain', 'Cordoba, Spain', 'Granada, Spain'],
+    'andalusia': ['Seville, Spain', 'Cordoba, Spain', 'Granada, Spain'],
+    'greek islands': ['Athens, Greece', 'Mykonos, Greece', 'Santorini, Greece'],
+    'scandinavia': ['Copenhagen, Denmark', 'Stockholm, Sweden', 'Oslo, Norway'],
+    'northern thailand': ['Chiang Mai, Thailand', 'Chiang Rai, Thailand'],
+    'southern thailand': ['Phuket, Thailand', 'Krabi, Thailand'],
+    'japan golden route': ['Tokyo, Japan', 'Kyoto, Japan', 'Osaka, Japan'],
+    'west coast': ['San Francisco, USA', 'Los Angeles, USA'],
+    'benelux': ['Amsterdam, Netherlands', 'Brussels, Belgium', 'Bruges, Belgium']
+}
+
+# Most stops a single trip is split into
+MAX_TRIP_CITIES = 5
+
+# Whole-word matches of regions and destinations, longest first; cities found this way
+# are the stops of a multi-city trip (countries are ignored when listing stops)
+_REGION_PATTERN = re.compile(r'\b(' + '|'.join(
+    re.escape(region) for region in sorted(REGION_ROUTES, key=len, reverse=True)) + r')\b')
+_DESTINATION_PATTERN = re.compile(r'\b(' + '|'.join(re.escape(key) for key, _ in _DESTINATIONS_BY_LENGTH) + r')\b')
+
+# Days given for one stop: "2 days in Rome", "Rome for a week", "Rome (2 nights)"
+_STOP_DAYS_BEFORE = re.compile(_DURATION + r'\s+(?:in|at)\s+$')
+_STOP_DAYS_AFTER = re.compile(r'\s*(?:for\s+|\()' + _DURATION)
+
+# A city the traveller starts from or lives in rather than visits: "from New York", "I live in London"
+_ORIGIN_BEFORE = re.compile(
+    r'\b(?:from|out of|leaving|departing|live in|living in|based in|home in|home is)\s+$')
+# What may stand between two stops of one trip ("Rome and Florence", "Rome, then Venice",
+# "Milan → Venice"), and between a city and its alternative ("Rome or Paris")
+_STOP_CONNECTOR = re.compile(
+    r'^(?:[\s,;.&+]|->|→|\b(?:and|then|plus|to|on to|followed by|finally|before)\b)*$')
+_ALTERNATIVE_CONNECTOR = re.compile(r'^[\s,]*\b(?:or|versus|vs)\b\.?[\s,]*$')
+# Country names are skipped when looking at the text between two cities ("Rome, Italy and Nice")
+_COUNTRY_PATTERN = re.compile(r'\b(' + '|'.join(
+    re.escape(key) for key, value in _DESTINATIONS_BY_LENGTH if ',' not in value) + r')\b')
+
+# Destinations that are also common words; they only count as a stop when capitalized
+_COMMON_WORD_DESTINATIONS = frozenset(('split',))
+
+# Static and byte-identical for every request so the provider can reuse its cached
+# prompt prefix; the request text only appears in the user message. Like the itinerary
+# prompt it is below OpenAI's 1024-token minimum for prompt caching, so it is not cached yet.
+PARSE_SYSTEM_PROMPT = """
     You are an expert travel request parser. Extract the following information from user's travel request and return ONLY a valid JSON object:
 
     Required fields:
@@ -44,6 +183,7 @@ def _gpt_parse(text: str) -> Dict[str, Any]:
     - interests: Array of interests/activities mentioned
     - travel_style: One of: "budget", "moderate", "luxury", "relaxed", "packed", "adventure"
     - special_requirements: Array of any special needs mentioned
+    - cities: Only for trips through several cities or a region: the stops in travel order as objects with "destination" and "days", the days adding up to duration. List only cities the traveller stays in: not the city they travel from or live in, and not alternatives joined by "or". Omit it for single-city trips.
 
     Common interests include: food, history, nature, art, technology, adventure, relaxation, nightlife, shopping, culture, architecture, music, sports, photography, wildlife, beaches, mountains, museums, festivals, local_life
 
@@ -54,19 +194,59 @@ def _gpt_parse(text: str) -> Dict[str, Any]:
     Input: "Planning a relaxing week in Bali with beaches and spa"
     Output: {"destination": "Bali, Indonesia", "duration": 7, "interests": ["relaxation", "beaches", "spa"], "travel_style": "relaxed", "special_requirements": []}
 
+    Input: "3-day trip in northern Italy, mostly food"
+    Output: {"destination": "Northern Italy", "duration": 3, "interests": ["food"], "travel_style": "moderate", "special_requirements": [], "cities": [{"destination": "Milan, Italy", "days": 1}, {"destination": "Venice, Italy", "days": 1}, {"destination": "Florence, Italy", "days": 1}]}
+
     Return ONLY the JSON object, no other text.
     """
+
+def parse_destination_request(text: str) -> Dict[str, Any]:
+    """
+    Parse user's natural language travel request to extract:
+    - Destination
+    - Duration
+    - Interests/preferences
+    - Travel style
+    - Cities with their days, for trips through several cities or a region
+    """
+    
+    destination_info, _ = parse_destination_request_with_source(text)
+    return destination_info
+
+def parse_destination_request_with_source(text: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Parse a travel request and report how: "gpt", or "fallback" (regex parsing
+    because there is no GPT or the GPT parse failed)
+    """
+    
+    print(f"Parsing request: {text}")
+    
+    # Try GPT parsing first; the same request text always parses the same way
+    if llm_available():
+        try:
+            cache_key = ' '.join(text.lower().split())
+            return get_cache().get_or_compute('parse', cache_key, lambda: _gpt_parse(text)), "gpt"
+        except Exception as e:
+            print(f"GPT parsing failed: {e}, falling back to regex parsing")
+            return _fallback_parse(text), "fallback"
+    else:
+        print("No OpenAI API key found, using fallback parsing")
+        return _fallback_parse(text), "fallback"
+
+def _gpt_parse(text: str) -> Dict[str, Any]:
+    """
+    Use GPT to parse the travel request intelligently
+    """
     
     try:
         # Using the new OpenAI API format
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",  # Using gpt-4o-mini as in the main.py
+        response = chat_completion(
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": PARSE_SYSTEM_PROMPT},
                 {"role": "user", "content": f"Parse this travel request: {text}"}
             ],
             temperature=0.1,
-            max_tokens=300
+            max_tokens=400
         )
         
         response_text = response.choices[0].message.content.strip()
@@ -84,25 +264,7 @@ def _gpt_parse(text: str) -> Dict[str, Any]:
             else:
                 raise ValueError("No valid JSON found in GPT response")
         
-        # Validate and clean the parsed data
-        result = {
-            "destination": parsed_data.get("destination", "").strip(),
-            "duration": int(parsed_data.get("duration", 7)),
-            "interests": [interest.strip().lower() for interest in parsed_data.get("interests", [])],
-            "travel_style": parsed_data.get("travel_style", "moderate").lower(),
-            "special_requirements": parsed_data.get("special_requirements", [])
-        }
-        
-        # Validate destination
-        if not result["destination"] or result["destination"].lower() == "unknown":
-            print("GPT couldn't identify destination, using fallback")
-            fallback_result = _fallback_parse(text)
-            result["destination"] = fallback_result["destination"]
-        
-        # Ensure we have at least one interest
-        if not result["interests"]:
-            result["interests"] = ["general"]
-        
+        result = clean_parsed_request(parsed_data, text)
         print(f"GPT parsed result: {result}")
         return result
         
@@ -110,52 +272,112 @@ def _gpt_parse(text: str) -> Dict[str, Any]:
         print(f"Error in GPT parsing: {e}")
         raise e
 
+def clean_parsed_request(parsed_data: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """
+    Validate and clean a spec parsed by GPT (from the parse call or a single-call header)
+    """
+    
+    result = {
+        "destination": (parsed_data.get("destination") or "").strip(),
+        "duration": int(parsed_data.get("duration") or 7),
+        "interests": [interest.strip().lower() for interest in parsed_data.get("interests") or []],
+        "travel_style": (parsed_data.get("travel_style") or "moderate").lower(),
+        "special_requirements": parsed_data.get("special_requirements") or []
+    }
+    
+    # Validate destination
+    if not result["destination"] or result["destination"].lower() == "unknown":
+        print("GPT couldn't identify destination, using fallback")
+        fallback_result = _fallback_parse(text)
+        result["destination"] = fallback_result["destination"]
+    
+    # Ensure we have at least one interest
+    if not result["interests"]:
+        result["interests"] = ["general"]
+    
+    # Multi-city trips: keep valid stops and make their days add up to the duration
+    stops = []
+    for city in parsed_data.get("cities") or []:
+        if not isinstance(city, dict) or not str(city.get("destination") or "").strip():
+            continue
+        try:
+            days = int(city.get("days")) if city.get("days") else None
+        except (TypeError, ValueError):
+            days = None
+        stops.append((str(city["destination"]).strip(), days))
+    cities = split_trip_days(stops, result["duration"])
+    if len(cities) > 1:
+        result["cities"] = cities
+        result["duration"] = sum(city["days"] for city in cities)
+    
+    return result
+
+def split_trip_days(stops: List[Tuple[str, Optional[int]]], duration: int) -> List[Dict[str, Any]]:
+    """
+    Allocate a trip's days to its stops, given as (destination, days or None) in travel order.
+    Requested days are kept (a trip is never shorter than what was asked for), the
+    remaining days are shared by the other stops, and extra days go to the earliest stops.
+    Consecutive repeats are merged and at most MAX_TRIP_CITIES stops are kept; a trip
+    shorter than its list of stops keeps the first ones, one day each.
+    """
+    
+    merged: List[List[Any]] = []
+    for destination, days in stops:
+        if merged and merged[-1][0].lower() == destination.lower():
+            if days:
+                merged[-1][1] = (merged[-1][1] or 0) + days
+            continue
+        merged.append([destination, days if days and days > 0 else None])
+    merged = merged[:MAX_TRIP_CITIES]
+    if not merged:
+        return []
+    
+    requested = sum(days for _, days in merged if days)
+    duration = max(duration, requested)
+    open_stops = [stop for stop in merged if not stop[1]]
+    if len(open_stops) > duration - requested:
+        # Not a day left for each of them: the last stops without requested days are dropped
+        dropped = open_stops[duration - requested:]
+        open_stops = open_stops[:duration - requested]
+        merged = [stop for stop in merged if not any(stop is other for other in dropped)]
+    
+    for stop in open_stops:
+        stop[1] = 0
+    leftover = duration - requested
+    # Share the leftover days round-robin, first stops first
+    receivers = open_stops or merged
+    for index in range(leftover):
+        receivers[index % len(receivers)][1] += 1
+    
+    return [{"destination": destination, "days": days} for destination, days in merged]
+
 def _fallback_parse(text: str) -> Dict[str, Any]:
     """
     Fallback parsing method using regex and keyword matching
     """
     text_lower = text.lower()
     
-    # Extract duration
-    duration_patterns = [
-        r'(\d+)\s*days?',
-        r'(\d+)\s*weeks?',
-        r'(\d+)\s*months?'
-    ]
+    # A trip through several cities or a region, with any days asked for per stop
+    stops, stop_day_spans, region = _extract_stops(text)
     
-    duration = 7  # default
-    for pattern in duration_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            num = int(match.group(1))
-            if 'week' in pattern:
-                duration = num * 7
-            elif 'month' in pattern:
-                duration = num * 30
-            else:
-                duration = num
-            break
+    # Extract duration (ignoring the per-stop days)
+    duration = _extract_duration(text_lower, stop_day_spans)
+    if duration is None:
+        requested = [days for _, days in stops if days]
+        # "2 days in Rome and 3 days in Florence" is a 5-day trip
+        duration = sum(requested) + 2 * (len(stops) - len(requested)) if requested else 7
     
-    # Extract interests using keywords
-    interest_keywords = {
-        'nature': ['nature', 'hiking', 'mountains', 'forest', 'beach', 'outdoor', 'wildlife', 'park'],
-        'food': ['food', 'cuisine', 'restaurant', 'culinary', 'cooking', 'eating', 'local food', 'dining'],
-        'history': ['history', 'historical', 'museum', 'ancient', 'heritage', 'culture', 'historic'],
-        'art': ['art', 'gallery', 'painting', 'sculpture', 'artistic', 'exhibition'],
-        'technology': ['technology', 'tech', 'innovation', 'modern', 'digital', 'science'],
-        'adventure': ['adventure', 'extreme', 'sports', 'climbing', 'diving', 'thrill'],
-        'relaxation': ['relax', 'spa', 'peaceful', 'quiet', 'calm', 'rest', 'wellness'],
-        'nightlife': ['nightlife', 'bars', 'clubs', 'party', 'entertainment', 'night'],
-        'shopping': ['shopping', 'market', 'boutique', 'souvenir', 'mall', 'store']
-    }
-    
-    interests = []
-    for category, keywords in interest_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            interests.append(category)
+    # Extract interests using the shared keyword taxonomy
+    interests = list(INTEREST_MATCHER.match(text_lower))
     
     # Extract destination
-    destination = _extract_destination(text)
+    cities = split_trip_days(stops, duration) if len(stops) > 1 else []
+    if len(cities) > 1:
+        duration = sum(city['days'] for city in cities)
+        destination = region.title() if region else _route_name(cities)
+    else:
+        cities = []
+        destination = _extract_destination(text)
     
     # Extract travel style
     travel_style = 'moderate'  # default
@@ -175,116 +397,141 @@ def _fallback_parse(text: str) -> Dict[str, Any]:
         "travel_style": travel_style,
         "special_requirements": []
     }
+    if cities:
+        result["cities"] = cities
     
     print(f"Fallback parsed result: {result}")
     return result
 
+def _extract_duration(text_lower: str, skip_spans: List[Tuple[int, int]]) -> Optional[int]:
+    """
+    Trip length in days from the first duration mentioned outside skip_spans, None if there is none
+    """
+    for match in _DURATION_PATTERN.finditer(text_lower):
+        if not any(start <= match.start() < end for start, end in skip_spans):
+            return _duration_days(match, 1)
+    return None
+
+def _duration_days(match: re.Match, group: int) -> int:
+    """
+    Days in a duration matched by _DURATION, whose number is in the given group
+    """
+    number = match.group(group)
+    count = int(number) if number.isdigit() else _NUMBER_WORDS[number]
+    return count * _DAYS_PER_UNIT[match.group(group + 1)]
+
+def _find_mentions(text: str) -> List[Dict[str, Any]]:
+    """
+    The destinations named in the request, in order, each with the days asked for there
+    (and their span) and whether it is a city, an origin ("from New York", "I live in London"),
+    an alternative to the city before it ("Rome or Paris") or joined to a neighbouring city
+    by a connector ("Rome and Florence", "Rome, then Venice")
+    """
+    text_lower = text.lower()
+    mentions: List[Dict[str, Any]] = []
+    for match in _DESTINATION_PATTERN.finditer(text_lower):
+        if match.group(1) in _COMMON_WORD_DESTINATIONS and text[match.start()].islower():
+            continue
+        mention = {
+            "destination": DESTINATION_MAPPING[match.group(1)],
+            "days": None,
+            "days_span": None,
+            "days_after": False,
+            "start": match.start(),
+            "end": match.end(),
+            "alternative": False,
+            "linked": False
+        }
+        mention["is_city"] = ',' in mention["destination"]
+        before = _STOP_DAYS_BEFORE.search(text_lower, 0, match.start())
+        after = _STOP_DAYS_AFTER.match(text_lower, match.end())
+        days_match = before or after
+        if days_match:
+            mention["days"] = _duration_days(days_match, 1)
+            mention["days_span"] = days_match.span(1)
+            mention["days_after"] = before is None
+            if before:
+                mention["start"] = before.start()
+            else:
+                mention["end"] = after.end()
+        mention["origin"] = _ORIGIN_BEFORE.search(text_lower, 0, mention["start"]) is not None
+        mentions.append(mention)
+    
+    cities = [mention for mention in mentions if mention["is_city"] and not mention["origin"]]
+    for previous, current in zip(cities, cities[1:]):
+        gap = _COUNTRY_PATTERN.sub('', text_lower[previous["end"]:current["start"]])
+        if _ALTERNATIVE_CONNECTOR.match(gap):
+            current["alternative"] = True
+        elif _STOP_CONNECTOR.match(gap) and not previous["alternative"]:
+            previous["linked"] = current["linked"] = True
+    return mentions
+
+def _extract_stops(text: str) -> Tuple[List[Tuple[str, Optional[int]]], List[Tuple[int, int]], Optional[str]]:
+    """
+    The cities the trip stays in, in order, with the days asked for in each,
+    and the text spans those day counts came from. A city is a stop when it has its
+    own days or is joined to another city by a connector; origins and alternatives
+    are not stops. With fewer than two cities, a region's route is used instead
+    (and the region returned).
+    """
+    text_lower = text.lower()
+    stops = [
+        mention for mention in _find_mentions(text)
+        if mention["is_city"] and not mention["origin"] and not mention["alternative"]
+        and (mention["days"] is not None or mention["linked"])
+    ]
+    
+    # "Tokyo, Kyoto and Osaka for 10 days", "a week in Rome, Paris and Tokyo": days after
+    # the last city or before the first, when no other city has its own, are the length
+    # of the whole trip
+    with_days = [stop for stop in stops if stop["days"] is not None]
+    if len(stops) > 1 and len(with_days) == 1:
+        stop = with_days[0]
+        if (stop is stops[-1] and stop["days_after"]) or (stop is stops[0] and not stop["days_after"]):
+            stop["days"] = None
+            stop["days_span"] = None
+    
+    if len({stop["destination"] for stop in stops}) < 2:
+        region = _REGION_PATTERN.search(text_lower)
+        if region:
+            return [(city, None) for city in REGION_ROUTES[region.group(1)]], [], region.group(1)
+        return [], [], None
+    spans = [stop["days_span"] for stop in stops if stop["days_span"]]
+    return [(stop["destination"], stop["days"]) for stop in stops], spans, None
+
+def mentions_several_cities(text: str) -> bool:
+    """
+    Whether the request names a region or more than one city to visit (origins and
+    "or" alternatives aside), even where the offline parser found no stops
+    """
+    if _REGION_PATTERN.search(text.lower()):
+        return True
+    cities = {
+        mention["destination"] for mention in _find_mentions(text)
+        if mention["is_city"] and not mention["origin"] and not mention["alternative"]
+    }
+    return len(cities) > 1
+
+def _route_name(cities: List[Dict[str, Any]]) -> str:
+    """
+    "Rome, Florence & Venice" for a trip through those cities
+    """
+    names = [city['destination'].split(',')[0] for city in cities]
+    return f"{', '.join(names[:-1])} & {names[-1]}"
+
 def _extract_destination(text: str) -> str:
     """
     Extract destination from text using multiple strategies
     """
     text_lower = text.lower()
     
-    # Enhanced destination mapping
-    destination_mapping = {
-        'rome': 'Rome, Italy',
-        'italy': 'Italy',
-        'japan': 'Japan',
-        'tokyo': 'Tokyo, Japan',
-        'kyoto': 'Kyoto, Japan',
-        'osaka': 'Osaka, Japan',
-        'paris': 'Paris, France',
-        'france': 'France',
-        'london': 'London, UK',
-        'uk': 'United Kingdom',
-        'england': 'England, UK',
-        'spain': 'Spain',
-        'madrid': 'Madrid, Spain',
-        'barcelona': 'Barcelona, Spain',
-        'seville': 'Seville, Spain',
-        'greece': 'Greece',
-        'athens': 'Athens, Greece',
-        'santorini': 'Santorini, Greece',
-        'mykonos': 'Mykonos, Greece',
-        'thailand': 'Thailand',
-        'bangkok': 'Bangkok, Thailand',
-        'phuket': 'Phuket, Thailand',
-        'chiang mai': 'Chiang Mai, Thailand',
-        'india': 'India',
-        'delhi': 'New Delhi, India',
-        'mumbai': 'Mumbai, India',
-        'goa': 'Goa, India',
-        'rajasthan': 'Rajasthan, India',
-        'new york': 'New York, USA',
-        'usa': 'United States',
-        'america': 'United States',
-        'california': 'California, USA',
-        'los angeles': 'Los Angeles, USA',
-        'san francisco': 'San Francisco, USA',
-        'las vegas': 'Las Vegas, USA',
-        'miami': 'Miami, USA',
-        'germany': 'Germany',
-        'berlin': 'Berlin, Germany',
-        'munich': 'Munich, Germany',
-        'netherlands': 'Netherlands',
-        'amsterdam': 'Amsterdam, Netherlands',
-        'china': 'China',
-        'beijing': 'Beijing, China',
-        'shanghai': 'Shanghai, China',
-        'australia': 'Australia',
-        'sydney': 'Sydney, Australia',
-        'melbourne': 'Melbourne, Australia',
-        'canada': 'Canada',
-        'toronto': 'Toronto, Canada',
-        'vancouver': 'Vancouver, Canada',
-        'brazil': 'Brazil',
-        'rio': 'Rio de Janeiro, Brazil',
-        'sao paulo': 'São Paulo, Brazil',
-        'argentina': 'Argentina',
-        'buenos aires': 'Buenos Aires, Argentina',
-        'egypt': 'Egypt',
-        'cairo': 'Cairo, Egypt',
-        'turkey': 'Turkey',
-        'istanbul': 'Istanbul, Turkey',
-        'russia': 'Russia',
-        'moscow': 'Moscow, Russia',
-        'south korea': 'South Korea',
-        'seoul': 'Seoul, South Korea',
-        'vietnam': 'Vietnam',
-        'hanoi': 'Hanoi, Vietnam',
-        'ho chi minh': 'Ho Chi Minh City, Vietnam',
-        'singapore': 'Singapore',
-        'malaysia': 'Malaysia',
-        'kuala lumpur': 'Kuala Lumpur, Malaysia',
-        'indonesia': 'Indonesia',
-        'bali': 'Bali, Indonesia',
-        'jakarta': 'Jakarta, Indonesia',
-        'philippines': 'Philippines',
-        'manila': 'Manila, Philippines',
-        'morocco': 'Morocco',
-        'marrakech': 'Marrakech, Morocco',
-        'casablanca': 'Casablanca, Morocco',
-        'portugal': 'Portugal',
-        'lisbon': 'Lisbon, Portugal',
-        'porto': 'Porto, Portugal',
-        'croatia': 'Croatia',
-        'dubrovnik': 'Dubrovnik, Croatia',
-        'split': 'Split, Croatia',
-        'iceland': 'Iceland',
-        'reykjavik': 'Reykjavik, Iceland',
-        'norway': 'Norway',
-        'oslo': 'Oslo, Norway',
-        'bergen': 'Bergen, Norway',
-        'sweden': 'Sweden',
-        'stockholm': 'Stockholm, Sweden',
-        'denmark': 'Denmark',
-        'copenhagen': 'Copenhagen, Denmark'
-    }
+    # The first city (then country) the traveller goes to, skipping origins and alternatives
+    mentions = [mention for mention in _find_mentions(text) if not mention["origin"] and not mention["alternative"]]
+    if mentions:
+        return min(mentions, key=lambda mention: not mention["is_city"])["destination"]
     
     # Check for exact matches first (longer phrases first)
-    sorted_destinations = sorted(destination_mapping.items(), key=lambda x: len(x[0]), reverse=True)
-    
-    for key, value in sorted_destinations:
+    for key, value in _DESTINATIONS_BY_LENGTH:
         if key in text_lower:
             return value
     
@@ -293,8 +540,8 @@ def _extract_destination(text: str) -> str:
     for word in words:
         if word[0].isupper() and len(word) > 3:
             # Check if it's a common destination
-            if word.lower() in destination_mapping:
-                return destination_mapping[word.lower()]
+            if word.lower() in DESTINATION_MAPPING:
+                return DESTINATION_MAPPING[word.lower()]
             # Otherwise return as-is if it looks like a place name
             return word
     
@@ -2,8 +2,53 @@
 Google Places Agent - Handles searching for places and attractions
 """
 
-from typing import List, Dict, Any
-import os
+from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+
+from agents.day_scheduler import DEFAULT_OPENING_HOURS, TYPICAL_OPENING_HOURS
+from agents.interest_taxonomy import GENERAL_PLACE_TYPES, INTEREST_MATCHER, INTEREST_TAXONOMY
+from agents.place_dedup import PlaceDeduplicator
+from config import get_settings
+from schemas.place_record import PlaceRecord, to_dicts, to_records
+from services.cache import get_cache
+
+# Mock places by city and place type, used until the real Places API is wired in
+MOCK_PLACES = {
+    'rome': {
+        'tourist_attraction': [
+            {'name': 'Colosseum', 'rating': 4.6, 'description': 'Ancient Roman amphitheater and gladiator arena', 'opening_hours': 'Mon-Sun 08:30-19:00'},
+            {'name': 'Vatican Museums', 'rating': 4.5, 'description': 'World-renowned art collection including Sistine Chapel', 'opening_hours': 'Mon-Sat 08:00-19:00'},
+            {'name': 'Trevi Fountain', 'rating': 4.4, 'description': 'Baroque fountain where wishes come true', 'opening_hours': 'Mon-Sun 00:00-24:00'},
+            {'name': 'Pantheon', 'rating': 4.5, 'description': 'Best-preserved Roman building with impressive dome', 'opening_hours': 'Mon-Sun 09:00-19:00'},
+            {'name': 'Roman Forum', 'rating': 4.3, 'description': 'Ancient Roman marketplace and political center', 'opening_hours': 'Mon-Sun 09:00-19:00'}
+        ],
+        'restaurant': [
+            {'name': 'Da Enzo al 29', 'rating': 4.7, 'description': 'Authentic Roman trattoria in Trastevere', 'opening_hours': 'Mon-Sat 12:30-15:00, 19:00-23:00'},
+            {'name': 'Checchino dal 1887', 'rating': 4.5, 'description': 'Historic restaurant serving traditional Roman cuisine', 'opening_hours': 'Tue-Sat 12:30-15:00, 19:30-23:30'},
+            {'name': 'Piperno', 'rating': 4.4, 'description': 'Famous for carciofi alla giudia since 1860', 'opening_hours': 'Tue-Sun 12:45-14:45, 19:45-23:00'},
+            {'name': 'Il Sorpasso', 'rating': 4.3, 'description': 'Modern bistro with excellent wine selection', 'opening_hours': 'Mon-Sun 08:00-24:00'}
+        ],
+        'museum': [
+            {'name': 'Capitoline Museums', 'rating': 4.4, 'description': 'Oldest public museums with ancient Roman statues', 'opening_hours': 'Mon-Sun 09:30-19:30'},
+            {'name': 'Palazzo Altemps', 'rating': 4.2, 'description': 'Renaissance palace housing ancient sculptures', 'opening_hours': 'Tue-Sun 09:30-19:00'},
+            {'name': 'Baths of Diocletian', 'rating': 4.1, 'description': 'Ancient Roman public baths complex', 'opening_hours': 'Tue-Sun 09:30-19:00'}
+        ]
+    },
+    'tokyo': {
+        'tourist_attraction': [
+            {'name': 'Senso-ji Temple', 'rating': 4.3, 'description': 'Ancient Buddhist temple in Asakusa', 'opening_hours': 'Mon-Sun 06:00-17:00'},
+            {'name': 'Tokyo Skytree', 'rating': 4.2, 'description': 'Tallest tower in Japan with panoramic views', 'opening_hours': 'Mon-Sun 10:00-21:00'},
+            {'name': 'Meiji Shrine', 'rating': 4.4, 'description': 'Shinto shrine dedicated to Emperor Meiji', 'opening_hours': 'Mon-Sun 06:00-16:30'},
+            {'name': 'Tsukiji Outer Market', 'rating': 4.1, 'description': 'Famous fish market and food destination', 'opening_hours': 'Mon-Sat 05:00-14:00'}
+        ],
+        'restaurant': [
+            {'name': 'Sukiyabashi Jiro', 'rating': 4.8, 'description': 'World-famous sushi restaurant', 'opening_hours': 'Mon-Sat 11:30-14:00, 17:30-20:30'},
+            {'name': 'Ramen Yashichi', 'rating': 4.5, 'description': 'Authentic ramen shop in Shibuya', 'opening_hours': 'Mon-Sun 11:00-15:00, 18:00-23:00'},
+            {'name': 'Tonki', 'rating': 4.4, 'description': 'Traditional tonkatsu restaurant since 1939', 'opening_hours': 'Mon,Wed-Sun 16:00-22:45'}
+        ]
+    }
+}
 
 class GooglePlacesService:
     """
@@ -11,7 +56,7 @@ class GooglePlacesService:
     """
     
     def __init__(self):
-        self.api_key = os.getenv("GOOGLE_PLACES_API_KEY")
+        self.api_key = get_settings().google_places_api_key
         self.use_mock_data = not self.api_key
         
     def search_places(self, location: str, place_type: str, radius: int = 50000) -> List[Dict[str, Any]]:
@@ -20,50 +65,17 @@ class GooglePlacesService:
         """
         print(f"Searching for {place_type} in {location}")
         
-        # Use mock data for demonstration
-        return self._get_mock_places(location, place_type)
+        # Use mock data for demonstration; cached per location and type like real API results
+        return get_cache().get_or_compute(
+            'places', [location.lower().strip(), place_type, radius],
+            lambda: self._get_mock_places(location, place_type)
+        )
     
     def _get_mock_places(self, location: str, place_type: str) -> List[Dict[str, Any]]:
         """
         Generate mock places data for demonstration
         """
         
-        mock_data = {
-            'rome': {
-                'tourist_attraction': [
-                    {'name': 'Colosseum', 'rating': 4.6, 'description': 'Ancient Roman amphitheater and gladiator arena'},
-                    {'name': 'Vatican Museums', 'rating': 4.5, 'description': 'World-renowned art collection including Sistine Chapel'},
-                    {'name': 'Trevi Fountain', 'rating': 4.4, 'description': 'Baroque fountain where wishes come true'},
-                    {'name': 'Pantheon', 'rating': 4.5, 'description': 'Best-preserved Roman building with impressive dome'},
-                    {'name': 'Roman Forum', 'rating': 4.3, 'description': 'Ancient Roman marketplace and political center'}
-                ],
-                'restaurant': [
-                    {'name': 'Da Enzo al 29', 'rating': 4.7, 'description': 'Authentic Roman trattoria in Trastevere'},
-                    {'name': 'Checchino dal 1887', 'rating': 4.5, 'description': 'Historic restaurant serving traditional Roman cuisine'},
-                    {'name': 'Piperno', 'rating': 4.4, 'description': 'Famous for carciofi alla giudia since 1860'},
-                    {'name': 'Il Sorpasso', 'rating': 4.3, 'description': 'Modern bistro with excellent wine selection'}
-                ],
-                'museum': [
-                    {'name': 'Capitoline Museums', 'rating': 4.4, 'description': 'Oldest public museums with ancient Roman statues'},
-                    {'name': 'Palazzo Altemps', 'rating': 4.2, 'description': 'Renaissance palace housing ancient sculptures'},
-                    {'name': 'Baths of Diocletian', 'rating': 4.1, 'description': 'Ancient Roman public baths complex'}
-                ]
-            },
-            'tokyo': {
-                'tourist_attraction': [
-                    {'name': 'Senso-ji Temple', 'rating': 4.3, 'description': 'Ancient Buddhist temple in Asakusa'},
-                    {'name': 'Tokyo Skytree', 'rating': 4.2, 'description': 'Tallest tower in Japan with panoramic views'},
-                    {'name': 'Meiji Shrine', 'rating': 4.4, 'description': 'Shinto shrine dedicated to Emperor Meiji'},
-                    {'name': 'Tsukiji Outer Market', 'rating': 4.1, 'description': 'Famous fish market and food destination'}
-                ],
-                'restaurant': [
-                    {'name': 'Sukiyabashi Jiro', 'rating': 4.8, 'description': 'World-famous sushi restaurant'},
-                    {'name': 'Ramen Yashichi', 'rating': 4.5, 'description': 'Authentic ramen shop in Shibuya'},
-                    {'name': 'Tonki', 'rating': 4.4, 'description': 'Traditional tonkatsu restaurant since 1939'}
-                ]
-            }
-        }
-        
         # Normalize location name
         location_key = location.lower().split(',')[0].strip()
         
@@ -71,9 +83,9 @@ class GooglePlacesService:
         places_data = []
         
         # Try to find exact match for location
-        if location_key in mock_data:
-            if place_type in mock_data[location_key]:
-                places_data = mock_data[location_key][place_type]
+        if location_key in MOCK_PLACES:
+            if place_type in MOCK_PLACES[location_key]:
+                places_data = MOCK_PLACES[location_key][place_type]
         
         # If no exact match, generate some generic places
         if not places_data:
@@ -96,41 +108,48 @@ class GooglePlacesService:
                 'address': f"{location}",
                 'coordinates': {'lat': 41.9028 + i*0.01, 'lng': 12.4964 + i*0.01},  # Mock coordinates
                 'description': place_data.get('description', 'A popular destination'),
-                'place_id': f"mock_{location_key}_{place_type}_{i}"
+                'place_id': f"mock_{location_key}_{place_type}_{i}",
+                # As in Place Details; generated places keep the typical hours of their type
+                'opening_hours': place_data.get('opening_hours') or TYPICAL_OPENING_HOURS.get(place_type, DEFAULT_OPENING_HOURS)
             }
             places.append(place)
         
         return places
 
+# Map interests to place types
+INTEREST_TO_PLACE_TYPES = {
+    interest: entry['place_types'] for interest, entry in INTEREST_TAXONOMY.items() if entry['place_types']
+}
+INTEREST_TO_PLACE_TYPES['general'] = GENERAL_PLACE_TYPES
+
 def search_places(location: str, interests: List[str], place_types: List[str] = None) -> List[Dict[str, Any]]:
     """
     Search for places based on location and user interests
     """
     
+    return to_dicts(_search_place_records(location, interests, place_types))
+
+def _search_place_records(location: str, interests: List[str], place_types: List[str] = None, 
+                          results_by_type: Optional[Dict[str, List[PlaceRecord]]] = None) -> List[PlaceRecord]:
+    """
+    search_places, returning PlaceRecords for further ranking.
+    results_by_type collects the per-type results so a later search in the same
+    request can reuse the types it shares with this one.
+    """
+    
     print(f"Searching for places in {location} with interests: {interests}")
     
     # Initialize the Google Places service
     places_service = GooglePlacesService()
-    
-    # Map interests to place types
-    interest_to_place_types = {
-        'food': ['restaurant', 'cafe', 'bakery', 'meal_takeaway'],
-        'nature': ['park', 'natural_feature', 'zoo'],
-        'history': ['museum', 'church', 'tourist_attraction'],
-        'art': ['art_gallery', 'museum'],
-        'technology': ['electronics_store', 'museum'],
-        'adventure': ['amusement_park', 'gym', 'tourist_attraction'],
-        'relaxation': ['spa', 'park', 'beach'],
-        'shopping': ['shopping_mall', 'store', 'clothing_store'],
-        'general': ['tourist_attraction', 'point_of_interest']
-    }
+    if results_by_type is None:
+        results_by_type = {}
     
     # Determine place types to search for
     if not place_types:
         place_types = []
         for interest in interests:
-            if interest in interest_to_place_types:
-                place_types.extend(interest_to_place_types[interest])
+            if interest in INTEREST_TO_PLACE_TYPES:
+                place_types.extend(INTEREST_TO_PLACE_TYPES[interest])
         
         # Remove duplicates
         place_types = list(set(place_types))
@@ -139,38 +158,31 @@ def search_places(location: str, interests: List[str], place_types: List[str] =
     if not place_types:
         place_types = ['tourist_attraction', 'restaurant', 'museum']
     
-    all_places = []
+    # Search for each place type; the same place found under several types is kept once
+    deduplicator = PlaceDeduplicator()
     
-    # Search for each place type
     for place_type in place_types[:5]:  # Limit to 5 types to avoid too many API calls
-        try:
-            places = places_service.search_places(
-                location=location,
-                place_type=place_type,
-                radius=50000  # 50km radius
-            )
-            all_places.extend(places)
-        except Exception as e:
-            print(f"Error searching for {place_type} in {location}: {e}")
-            continue
-    
-    # Remove duplicates based on name and location
-    unique_places = []
-    seen_names = set()
-    
-    for place in all_places:
-        place_key = f"{place['name']}_{place.get('address', '')}"
-        if place_key not in seen_names:
-            seen_names.add(place_key)
-            unique_places.append(place)
+        if place_type not in results_by_type:
+            try:
+                places = places_service.search_places(
+                    location=location,
+                    place_type=place_type,
+                    radius=50000  # 50km radius
+                )
+            except Exception as e:
+                print(f"Error searching for {place_type} in {location}: {e}")
+                continue
+            results_by_type[place_type] = [PlaceRecord.from_dict(place) for place in places]
+        
+        for record in results_by_type[place_type]:
+            deduplicator.add(record)
     
-    # Sort by rating (highest first) - SAFELY
-    def get_rating(place):
-        rating = place.get('rating')
-        # Return a default rating if None to avoid comparison errors
-        return rating if rating is not None else 0
+    unique_places = deduplicator.places
+    if deduplicator.merged:
+        print(f"Merged {deduplicator.merged} duplicate places")
     
-    unique_places.sort(key=get_rating, reverse=True)
+    # Sort by rating (highest first); a missing rating counts as 0
+    unique_places.sort(key=lambda record: record.rating if record.rating is not None else 0, reverse=True)
     
     # Return top 20 places
     return unique_places[:20]
@@ -181,50 +193,81 @@ def get_place_recommendations(location: str, interests: List[str], max_places: i
     """
     
     # Search for places
-    places = search_places(location, interests)
+    results_by_type = {}
+    places = _search_place_records(location, interests, results_by_type=results_by_type)
     
     # Filter by interests
-    filtered_places = filter_places_by_interest(places, interests)
+    filtered_places = _filter_records_by_interest(places, interests)[:max_places]
     
-    # If we don't have enough places, add some general attractions
+    # If we don't have enough places, add some general attractions.
+    # Types already searched above are reused, and candidates are resolved
+    # against the chosen places the same way the searches are de-duplicated.
     if len(filtered_places) < max_places:
-        general_places = search_places(location, ['general'])
+        chosen = PlaceDeduplicator()
+        for place in filtered_places:
+            chosen.add(place)
+        general_places = _search_place_records(location, ['general'], results_by_type=results_by_type)
         for place in general_places:
-            if place not in filtered_places and len(filtered_places) < max_places:
+            if len(filtered_places) >= max_places:
+                break
+            if chosen.add(place):
                 filtered_places.append(place)
     
-    return filtered_places[:max_places]
+    return to_dicts(filtered_places)
+
+# Speculative searches started before the request is fully parsed
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="places-prefetch")
+
+class PlacesPrefetch:
+    """
+    get_place_recommendations started early for a guessed trip.
+    The result is used only if the guess is confirmed; otherwise it is dropped,
+    but the per-type searches it made stay in the places cache.
+    """
+    
+    def __init__(self, location: str, interests: List[str], max_places: int = 15):
+        self.location = location
+        self.interests = interests
+        self.max_places = max_places
+        # Runs in the caller's context, so the request deadline applies
+        context = contextvars.copy_context()
+        self._future: Future = _prefetch_executor.submit(
+            context.run, get_place_recommendations, location, interests, max_places
+        )
+    
+    def result_for(self, location: str, interests: List[str], max_places: int = 15) -> Optional[List[Dict[str, Any]]]:
+        """
+        The prefetched places if they answer this search, else None
+        """
+        if (location != self.location or sorted(interests) != sorted(self.interests)
+                or max_places != self.max_places):
+            print(f"Prefetched places for {self.location} {self.interests} don't match the parsed trip, discarding")
+            return None
+        try:
+            return self._future.result()
+        except Exception as e:
+            print(f"Places prefetch failed: {e}")
+            return None
 
 def filter_places_by_interest(places: List[Dict[str, Any]], interests: List[str]) -> List[Dict[str, Any]]:
     """
     Filter places based on user interests
     """
     
-    interest_keywords = {
-        'food': ['restaurant', 'cafe', 'food', 'cuisine', 'dining'],
-        'nature': ['park', 'garden', 'nature', 'outdoor', 'hiking'],
-        'history': ['museum', 'historical', 'ancient', 'heritage', 'monument'],
-        'art': ['gallery', 'art', 'exhibition', 'cultural'],
-        'technology': ['tech', 'science', 'innovation', 'modern'],
-        'adventure': ['adventure', 'sports', 'activity', 'thrill'],
-        'relaxation': ['spa', 'peaceful', 'quiet', 'relaxing'],
-        'nightlife': ['bar', 'club', 'nightlife', 'entertainment'],
-        'shopping': ['shop', 'market', 'mall', 'boutique']
-    }
+    records = to_records(places)
+    matching = set(map(id, _filter_records_by_interest(records, interests)))
+    return [place for place, record in zip(places, records) if id(record) in matching]
+
+def _filter_records_by_interest(places: List[PlaceRecord], interests: List[str]) -> List[PlaceRecord]:
+    """
+    filter_places_by_interest on PlaceRecords, using their precomputed search text
+    """
     
     filtered_places = []
     
     for place in places:
-        place_text = f"{place['name']} {place.get('description', '')} {place.get('type', '')}".lower()
-        
-        # Check if place matches any of the user's interests
-        matches_interest = False
-        for interest in interests:
-            if interest in interest_keywords:
-                keywords = interest_keywords[interest]
-                if any(keyword in place_text for keyword in keywords):
-                    matches_interest = True
-                    break
+        # Check if place matches any of the user's interests (one scan of the place text)
+        matches_interest = INTEREST_MATCHER.matches_any(place.search_text, interests)
         
         if matches_interest or not interests:  # Include if matches interest or no specific interests
             filtered_places.append(place)
@@ -0,0 +1,92 @@
+"""
+Interest Taxonomy - The interest categories shared by the request parser, place search and filtering,
+and the basic itinerary.
+
+Each interest lists the words that signal it (in a travel request or in a place's
+name/description/type) and the Places types to search for it. All keywords are
+compiled into one regex, so matching a text against every interest is a single scan.
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+INTEREST_TAXONOMY = {
+    'nature': {
+        'keywords': ['nature', 'natural', 'hiking', 'hike', 'mountain', 'forest', 'beach', 'outdoor', 
+                     'wildlife', 'park', 'garden', 'zoo'],
+        'place_types': ['park', 'natural_feature', 'zoo']
+    },
+    'food': {
+        'keywords': ['food', 'local food', 'cuisine', 'restaurant', 'culinary', 'cooking', 'eating', 
+                     'dining', 'cafe', 'bakery'],
+        'place_types': ['restaurant', 'cafe', 'bakery', 'meal_takeaway']
+    },
+    'history': {
+        'keywords': ['history', 'historical', 'historic', 'museum', 'ancient', 'heritage', 'culture', 
+                     'monument', 'church'],
+        'place_types': ['museum', 'church', 'tourist_attraction']
+    },
+    'art': {
+        'keywords': ['art', 'gallery', 'galleries', 'painting', 'sculpture', 'artistic', 'exhibition', 'cultural'],
+        'place_types': ['art_gallery', 'museum']
+    },
+    'technology': {
+        'keywords': ['technology', 'tech', 'innovation', 'modern', 'digital', 'science'],
+        'place_types': ['electronics_store', 'museum']
+    },
+    'adventure': {
+        'keywords': ['adventure', 'extreme', 'sport', 'climbing', 'diving', 'thrill', 'activity', 'activities'],
+        'place_types': ['amusement_park', 'gym', 'tourist_attraction']
+    },
+    'relaxation': {
+        'keywords': ['relax', 'relaxing', 'relaxation', 'spa', 'peaceful', 'quiet', 'calm', 'rest', 'wellness'],
+        'place_types': ['spa', 'park', 'beach']
+    },
+    'nightlife': {
+        'keywords': ['nightlife', 'bar', 'club', 'party', 'parties', 'entertainment', 'night'],
+        'place_types': []
+    },
+    'shopping': {
+        'keywords': ['shopping', 'shop', 'market', 'boutique', 'souvenir', 'mall', 'store'],
+        'place_types': ['shopping_mall', 'store', 'clothing_store']
+    }
+}
+
+# Place types searched when no interest applies
+GENERAL_PLACE_TYPES = ['tourist_attraction', 'point_of_interest']
+
+class InterestMatcher:
+    """
+    All interest keywords compiled into one word-boundary regex.
+    Keywords also match their plural ("museums", "beaches").
+    """
+    
+    def __init__(self, taxonomy: Dict[str, Dict[str, List[str]]]):
+        self.categories = list(taxonomy)
+        self._keyword_categories = {}
+        for category, entry in taxonomy.items():
+            for keyword in entry['keywords']:
+                self._keyword_categories.setdefault(keyword, []).append(category)
+        
+        # Longest first so phrases win over the words inside them
+        alternatives = sorted(self._keyword_categories, key=len, reverse=True)
+        self._pattern = re.compile(
+            r'\b(' + '|'.join(re.escape(keyword) for keyword in alternatives) + r')(?:e?s)?\b',
+            re.IGNORECASE
+        )
+    
+    def match(self, text: str) -> Dict[str, int]:
+        """
+        Matched interests with the number of keyword hits, in taxonomy order
+        """
+        scores = {}
+        for match in self._pattern.finditer(text):
+            for category in self._keyword_categories[match.group(1).lower()]:
+                scores[category] = scores.get(category, 0) + 1
+        return {category: scores[category] for category in self.categories if category in scores}
+    
+    def matches_any(self, text: str, interests: Iterable[str]) -> bool:
+        matched = self.match(text)
+        return any(interest in matched for interest in interests)
+
+INTEREST_MATCHER = InterestMatcher(INTEREST_TAXONOMY)
@@ -2,11 +2,29 @@
 Itinerary Agent - Generates detailed day-by-day travel itineraries using GPT
 """
 
-import openai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import json
 import math
-import os
+
+from schemas.models import Itinerary, DayPlan
+from schemas.place_record import to_records
+from agents.day_scheduler import clock, format_schedule, schedule_days
+from agents.interest_taxonomy import INTEREST_MATCHER
+from agents.tips_agent import GENERIC_TIPS
+from services.cache import get_cache
+from services.tips_store import tips_store
+from services.deadline import DeadlineExceeded
+from services.llm_client import chat_completion, llm_available, stream_chat_completion
+
+# Activities per day for each travel style
+ACTIVITIES_PER_DAY = {
+    'relaxed': 2,
+    'moderate': 3,
+    'packed': 4,
+    'luxury': 2,
+    'budget': 3,
+    'adventure': 4
+}
 
 def generate_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
                       interests: List[str], travel_style: str = "moderate") -> str:
@@ -14,6 +32,19 @@ def generate_itinerary(destination: str, duration: int, places: List[Dict[str, A
     Generate a detailed day-by-day itinerary using GPT
     """
     
+    itinerary, _ = generate_itinerary_with_source(destination, duration, places, interests, travel_style)
+    return itinerary
+
+def generate_itinerary_with_source(destination: str, duration: int, places: List[Dict[str, Any]], 
+                                   interests: List[str], travel_style: str = "moderate",
+                                   arrival: bool = True, departure: bool = True) -> Tuple[str, str]:
+    """
+    Generate an itinerary and report where it came from:
+    "gpt", "basic" (no GPT or GPT failed) or "deadline" (GPT too slow for the request deadline).
+    arrival/departure say whether the trip starts/ends here (not for the inner stops of a
+    multi-city trip); the basic itinerary only gives arrival and departure tips then.
+    """
+    
     print(f"Generating itinerary for {destination}, {duration} days, {len(places)} places")
     
     # Validate inputs to prevent errors
@@ -30,23 +61,71 @@ def generate_itinerary(destination: str, duration: int, places: List[Dict[str, A
         interests = ["general"]
     
     # Try GPT generation first
-    if os.getenv("OPENAI_API_KEY"):
+    if llm_available():
         try:
-            return _gpt_generate_itinerary(destination, duration, places, interests, travel_style)
+            # GPT itineraries are cached per parsed spec, so different phrasings of the
+            # same trip (and trips pre-warmed by the cache warmer) reuse one generation
+            cache_key = [destination, duration, sorted(interests), travel_style, [place.get('name') for place in places[:20]]]
+            itinerary = get_cache().get_or_compute(
+                'itinerary', cache_key,
+                lambda: _gpt_generate_itinerary(destination, duration, places, interests, travel_style)
+            )
+            return itinerary, "gpt"
+        except DeadlineExceeded as e:
+            print(f"GPT itinerary too slow ({e}), returning basic itinerary")
+            return _generate_basic_itinerary(destination, duration, places, interests, travel_style,
+                                             arrival, departure), "deadline"
         except Exception as e:
             print(f"GPT itinerary generation failed: {e}, falling back to basic generation")
-            return _generate_basic_itinerary(destination, duration, places, interests, travel_style)
+            return _generate_basic_itinerary(destination, duration, places, interests, travel_style,
+                                             arrival, departure), "basic"
     else:
         print("No OpenAI API key found, using basic itinerary generation")
-        return _generate_basic_itinerary(destination, duration, places, interests, travel_style)
+        return _generate_basic_itinerary(destination, duration, places, interests, travel_style,
+                                         arrival, departure), "basic"
 
-def _gpt_generate_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
-                           interests: List[str], travel_style: str) -> str:
+# Static instructions first and byte-identical for every trip, so the provider can
+# reuse its cached prompt prefix; everything trip-specific goes in the user message.
+# At ~450 tokens it is still below OpenAI's 1024-token minimum for prompt caching,
+# so today it is not cached; tests/test_prompt_prefix.py keeps it stable for when it is.
+ITINERARY_SYSTEM_PROMPT = """
+You are an expert travel planner with deep knowledge of destinations worldwide. Create a detailed, engaging, and practical day-by-day itinerary for the trip described in the user's message.
+
+**Travel Style Guidelines:**
+- **Budget**: Focus on free/cheap activities, local transport, street food, hostels
+- **Moderate**: Mix of paid attractions and free activities, mid-range dining
+- **Luxury**: High-end experiences, fine dining, premium accommodations
+- **Relaxed**: 2-3 activities per day, longer breaks, leisurely pace
+- **Packed**: 4-6 activities per day, efficient scheduling, maximize experiences
+- **Adventure**: Outdoor activities, unique experiences, off-the-beaten-path
+
+**Instructions:**
+1. Create a day-by-day plan with specific times
+2. Include morning, afternoon, and evening activities
+3. Suggest specific restaurants/cafes for meals
+4. Add transportation tips between locations
+5. Include cultural insights and local tips
+6. Follow the feasible schedule in the user's message: its times already fit each place's opening hours and the travel between places, so narrate it instead of inventing other times
+7. Add budget estimates where relevant
+8. Include backup plans for bad weather
+9. Suggest what to wear/bring each day
+10. Add local customs and etiquette tips
+
+**Format Requirements:**
+- Use markdown formatting with headers and bullet points
+- Include emojis to make it engaging
+- Add practical tips and insider knowledge
+- Structure: Day X → Morning → Lunch → Afternoon → Evening
+- End with general tips and recommendations
+
+Prefer the places listed in the user's message. Make it personal, engaging, and actionable. Include specific details that show local expertise.
+"""
+
+def _format_places_for_prompt(places: List[Dict[str, Any]]) -> str:
     """
-    Use GPT to generate a sophisticated, personalized itinerary
+    Numbered place list for the user message
     """
     
-    # Prepare places information for GPT
     places_info = []
     for i, place in enumerate(places[:20], 1):  # Limit to top 20 places
         place_info = f"{i}. **{place['name']}**"
@@ -62,75 +141,67 @@ def _gpt_generate_itinerary(destination: str, duration: int, places: List[Dict[s
             place_info += f"\n   Description: {place['description']}"
         if place.get('address'):
             place_info += f"\n   Location: {place['address']}"
+        if place.get('opening_hours'):
+            place_info += f"\n   Hours: {place['opening_hours']}"
         places_info.append(place_info)
     
-    places_text = "\n\n".join(places_info) if places_info else "No specific places provided - please suggest popular attractions."
-    
-    # Create comprehensive system prompt
-    system_prompt = f"""
-    You are an expert travel planner with deep knowledge of destinations worldwide. Create a detailed, engaging, and practical {duration}-day itinerary for {destination}.
+    return "\n\n".join(places_info) if places_info else "No specific places provided - please suggest popular attractions."
 
-    **User Profile:**
-    - Destination: {destination}
-    - Duration: {duration} days
-    - Interests: {', '.join(interests)}
-    - Travel Style: {travel_style}
+def _format_schedule_for_prompt(places: List[Dict[str, Any]], duration: int, travel_style: str) -> str:
+    """
+    The feasible schedule of the listed places, for the model to narrate
+    """
+    
+    if not places:
+        return "No schedule - plan around typical opening hours."
+    return format_schedule(_plan_basic_days(places[:20], duration, travel_style))
 
-    **Travel Style Guidelines:**
-    - **Budget**: Focus on free/cheap activities, local transport, street food, hostels
-    - **Moderate**: Mix of paid attractions and free activities, mid-range dining
-    - **Luxury**: High-end experiences, fine dining, premium accommodations
-    - **Relaxed**: 2-3 activities per day, longer breaks, leisurely pace
-    - **Packed**: 4-6 activities per day, efficient scheduling, maximize experiences
-    - **Adventure**: Outdoor activities, unique experiences, off-the-beaten-path
+def _itinerary_messages(destination: str, duration: int, places: List[Dict[str, Any]], 
+                        interests: List[str], travel_style: str) -> List[Dict[str, str]]:
+    """
+    Chat messages for the Markdown itinerary: the static system prompt, then the trip
+    """
+    
+    places_text = _format_places_for_prompt(places)
+    
+    user_prompt = f"""
+**User Profile:**
+- Destination: {destination}
+- Duration: {duration} days
+- Interests: {', '.join(interests)}
+- Travel Style: {travel_style}
 
-    **Available Places and Attractions:**
-    {places_text}
+**Available Places and Attractions:**
+{places_text}
 
-    **Instructions:**
-    1. Create a day-by-day plan with specific times
-    2. Include morning, afternoon, and evening activities
-    3. Suggest specific restaurants/cafes for meals
-    4. Add transportation tips between locations
-    5. Include cultural insights and local tips
-    6. Consider opening hours and travel distances
-    7. Add budget estimates where relevant
-    8. Include backup plans for bad weather
-    9. Suggest what to wear/bring each day
-    10. Add local customs and etiquette tips
+**Feasible Schedule** (fits opening hours and travel times between places):
+{_format_schedule_for_prompt(places, duration, travel_style)}
 
-    **Format Requirements:**
-    - Use markdown formatting with headers and bullet points
-    - Include emojis to make it engaging
-    - Add practical tips and insider knowledge
-    - Structure: Day X → Morning → Lunch → Afternoon → Evening
-    - End with general tips and recommendations
+Create a comprehensive {duration}-day itinerary for {destination} that focuses on {', '.join(interests)}.
+Make it detailed, practical, and exciting. Include specific recommendations, timing, and local insights.
+"""
+    
+    return [
+        {"role": "system", "content": ITINERARY_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    Make it personal, engaging, and actionable. Include specific details that show local expertise.
+def _gpt_generate_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
+                           interests: List[str], travel_style: str) -> str:
     """
-    
-    user_prompt = f"""
-    Create a comprehensive {duration}-day itinerary for {destination} that focuses on {', '.join(interests)}.
-    
-    Travel style: {travel_style}
-    
-    Make it detailed, practical, and exciting. Include specific recommendations, timing, and local insights.
+    Use GPT to generate a sophisticated, personalized itinerary
     """
     
+    messages = _itinerary_messages(destination, duration, places, interests, travel_style)
+    
     try:
-        # Using the new OpenAI API format
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",  # Using gpt-4o-mini as in the main.py
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+        # Streamed so a slow start can be hedged or cut off by the request deadline
+        itinerary = stream_chat_completion(
+            messages=messages,
             temperature=0.7,
             max_tokens=3000
         )
         
-        itinerary = response.choices[0].message.content
-        
         # Add some post-processing to ensure quality
         if len(itinerary) < 500:
             print("GPT response too short, enhancing...")
@@ -149,63 +220,138 @@ def _enhance_short_itinerary(short_itinerary: str, destination: str, duration: i
     Enhance a short GPT response with additional details
     """
     
-    enhanced = f"# {duration}-Day Itinerary for {destination} 🌍\n\n"
-    enhanced += f"**Interests:** {', '.join(interests)} | **Style:** Comprehensive\n\n"
-    enhanced += short_itinerary
-    enhanced += "\n\n---\n\n"
-    enhanced += _generate_additional_tips(destination, interests)
-    
-    return enhanced
+    return "".join((
+        f"# {duration}-Day Itinerary for {destination} 🌍\n\n",
+        f"**Interests:** {', '.join(interests)} | **Style:** Comprehensive\n\n",
+        short_itinerary,
+        "\n\n---\n\n",
+        _generate_additional_tips(destination, interests)
+    ))
 
 def _generate_additional_tips(destination: str, interests: List[str]) -> str:
     """
     Generate additional tips based on destination and interests
     """
     
-    tips = f"## 💡 Additional Tips for {destination}\n\n"
+    tips = [f"## 💡 Additional Tips for {destination}\n\n"]
     
     # General tips
-    tips += "### 🎯 General Travel Tips\n"
-    tips += "- Download offline maps before you go\n"
-    tips += "- Learn basic local phrases\n"
-    tips += "- Keep digital and physical copies of important documents\n"
-    tips += "- Research local customs and etiquette\n"
-    tips += "- Check visa requirements and vaccination needs\n\n"
+    tips.append(_GENERAL_TIPS_SECTION)
+    
+    # Destination tips from the precomputed store (never calls GPT on the hot path)
+    local_tips = tips_store.get(destination, 'general')
+    if local_tips:
+        tips.append("### 📍 Local Tips\n")
+        tips.extend(f"- {tip}\n" for tip in local_tips)
+        tips.append("\n")
     
     # Interest-specific tips
     if interests:
-        tips += "### 🎨 Based on Your Interests\n"
-        for interest in interests:
-            if interest == 'food':
-                tips += "- **Food:** Try street food, visit local markets, book food tours\n"
-            elif interest == 'history':
-                tips += "- **History:** Consider guided tours, audio guides, museum passes\n"
-            elif interest == 'nature':
-                tips += "- **Nature:** Bring appropriate gear, check weather, book eco-tours\n"
-            elif interest == 'art':
-                tips += "- **Art:** Check museum schedules, book special exhibitions in advance\n"
-            elif interest == 'adventure':
-                tips += "- **Adventure:** Book activities in advance, check safety requirements\n"
-            elif interest == 'relaxation':
-                tips += "- **Relaxation:** Book spa treatments early, find quiet spots\n"
-    
-    tips += "\n### 📱 Useful Apps\n"
-    tips += "- Google Translate for language help\n"
-    tips += "- Google Maps for navigation\n"
-    tips += "- Local transport apps\n"
-    tips += "- Currency converter\n"
-    tips += "- Weather forecast app\n"
+        tips.append("### 🎨 Based on Your Interests\n")
+        tips.extend(_INTEREST_TIP_LINES.get(interest, "") for interest in interests)
     
-    return tips
+    tips.append(_USEFUL_APPS_SECTION)
+    
+    return "".join(tips)
+
+# Static parts of the tips section, built once at import
+_GENERAL_TIPS_SECTION = "### 🎯 General Travel Tips\n" + "".join(
+    f"- {tip}\n" for tip in GENERIC_TIPS['general']
+) + "\n"
+
+_INTEREST_TIP_LINES = {
+    interest: f"- **{interest.title()}:** {GENERIC_TIPS[interest][0]}\n"
+    for interest in ['food', 'history', 'nature', 'art', 'adventure', 'relaxation']
+}
+
+_USEFUL_APPS_SECTION = "\n### 📱 Useful Apps\n" + "".join(
+    f"- {app}\n" for app in GENERIC_TIPS['apps']
+)
+
+def _plan_basic_days(places: List[Dict[str, Any]], duration: int, 
+                     travel_style: str) -> List[Dict[str, Any]]:
+    """
+    Schedule the places across days for the basic (non-GPT) generators and the GPT prompts.
+    Returns one entry per day with its items in time order (see day_scheduler.schedule_days).
+    """
+    
+    # Determine activities per day based on travel style
+    activities_per_day = ACTIVITIES_PER_DAY.get(travel_style, 3)
+    
+    # Group places by type
+    categorized_places = {
+        'attractions': [],
+        'restaurants': [],
+        'nature': [],
+        'culture': [],
+        'general': []
+    }
+    
+    for place in to_records(places):
+        # Categorize by the interests its name and type match
+        interests = INTEREST_MATCHER.match(f"{place.name_lower} {place.type_lower.replace('_', ' ')}")
+        
+        if 'food' in interests:
+            categorized_places['restaurants'].append(place)
+        elif 'nature' in interests:
+            categorized_places['nature'].append(place)
+        elif 'history' in interests or 'art' in interests:
+            categorized_places['culture'].append(place)
+        elif place.type_lower == 'tourist_attraction':
+            categorized_places['attractions'].append(place)
+        else:
+            categorized_places['general'].append(place)
+    
+    # Combine all attraction places
+    all_attractions = (categorized_places['attractions'] + 
+                      categorized_places['culture'] + 
+                      categorized_places['nature'] +
+                      categorized_places['general'])
+    restaurants = categorized_places['restaurants']
+    
+    # Fit the places into days by opening hours and travel time
+    return schedule_days(all_attractions, restaurants, duration, activities_per_day)
+
+def _day_sections(items: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    A day's scheduled items by part of the day: visits before lunch are the morning,
+    later ones the afternoon until 5 PM, then the evening (with dinner)
+    """
+    
+    sections = {'morning': [], 'lunch': [], 'afternoon': [], 'evening': []}
+    had_lunch = False
+    for item in items:
+        if item['kind'] == 'lunch':
+            sections['lunch'].append(item)
+            had_lunch = True
+        elif item['kind'] == 'dinner' or item['start'] >= 17 * 60:
+            sections['evening'].append(item)
+        elif had_lunch or item['start'] >= 12 * 60:
+            sections['afternoon'].append(item)
+        else:
+            sections['morning'].append(item)
+    return sections
 
 def _generate_basic_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
-                             interests: List[str], travel_style: str) -> str:
+                             interests: List[str], travel_style: str,
+                             arrival: bool = True, departure: bool = True) -> str:
     """
     Fallback method to generate a basic itinerary without GPT
     """
     
+    return "".join(iter_basic_itinerary(destination, duration, places, interests, travel_style, arrival, departure))
+
+def iter_basic_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
+                         interests: List[str], travel_style: str,
+                         arrival: bool = True, departure: bool = True) -> Iterator[str]:
+    """
+    Render the basic itinerary as Markdown chunks (the header, then one chunk per day, then the tips).
+    Rendering is linear in the trip length and the first chunk is ready immediately,
+    so it can be written straight to a streaming response.
+    """
+    
     if not places:
-        return f"""# {duration}-Day Itinerary for {destination} 🌍
+        yield f"""# {duration}-Day Itinerary for {destination} 🌍
 
 **Travel Style:** {travel_style.title()}
 **Interests:** {', '.join(interests)}
@@ -242,163 +388,391 @@ Continue this pattern for the remaining days, focusing on your interests: {', '.
 - Learn basic phrases in the local language
 - Keep important documents safe
 """
+        return
     
-    # Determine activities per day based on travel style
-    activities_per_day = {
-        'relaxed': 2,
-        'moderate': 3,
-        'packed': 4,
-        'luxury': 2,
-        'budget': 3,
-        'adventure': 4
-    }.get(travel_style, 3)
-    
-    # Group places by type
-    categorized_places = {
-        'attractions': [],
-        'restaurants': [],
-        'nature': [],
-        'culture': [],
-        'general': []
-    }
-    
-    for place in places:
-        place_type = place.get('type', '').lower()
-        place_name = place.get('name', '').lower()
-        
-        if 'restaurant' in place_type or 'cafe' in place_type or 'food' in place_name:
-            categorized_places['restaurants'].append(place)
-        elif 'park' in place_type or 'nature' in place_type or 'garden' in place_name:
-            categorized_places['nature'].append(place)
-        elif 'museum' in place_type or 'gallery' in place_type or 'church' in place_type:
-            categorized_places['culture'].append(place)
-        elif 'tourist_attraction' in place_type:
-            categorized_places['attractions'].append(place)
-        else:
-            categorized_places['general'].append(place)
-    
-    # Start building the itinerary
-    itinerary = f"# {duration}-Day Itinerary for {destination} 🌍\n\n"
-    itinerary += f"**Travel Style:** {travel_style.title()} | **Interests:** {', '.join(interests)}\n"
-    itinerary += f"**Total Places to Visit:** {len(places)} 📍\n\n"
-    
-    # Combine all attraction places
-    all_attractions = (categorized_places['attractions'] + 
-                      categorized_places['culture'] + 
-                      categorized_places['nature'] +
-                      categorized_places['general'])
-    
-    # Distribute places across days
-    places_per_day = max(1, len(all_attractions) // max(1, duration))
+    # Header
+    yield (f"# {duration}-Day Itinerary for {destination} 🌍\n\n"
+           f"**Travel Style:** {travel_style.title()} | **Interests:** {', '.join(interests)}\n"
+           f"**Total Places to Visit:** {len(places)} 📍\n\n")
     
     day_emojis = ['🚀', '🏛️', '🎨', '🌟', '🎯', '🌈', '✨']
     
-    for day in range(1, duration + 1):
-        emoji = day_emojis[(day-1) % len(day_emojis)]
-        itinerary += f"## Day {day} {emoji}\n\n"
+    for day_slot in _plan_basic_days(places, duration, travel_style):
+        day = day_slot['day']
+        sections = _day_sections(day_slot['items'])
         
-        # Get places for this day
-        start_idx = (day - 1) * places_per_day
-        end_idx = min(start_idx + activities_per_day, len(all_attractions))
-        day_places = all_attractions[start_idx:end_idx] if start_idx < len(all_attractions) else []
+        # Each day is collected in a list and joined once, then sent as one chunk
+        itinerary = []
+        emoji = day_emojis[(day-1) % len(day_emojis)]
+        itinerary.append(f"## Day {day} {emoji}\n\n")
         
-        # Morning activity
-        itinerary += "### 🌅 Morning (9:00 AM - 12:00 PM)\n"
-        if day_places:
-            place = day_places[0]
-            itinerary += f"**Visit {place['name']}**"
-            
-            # Safely get rating
-            rating = place.get('rating')
-            if rating is not None:
-                itinerary += f" ⭐ {rating}/5\n"
-            else:
-                itinerary += "\n"
-                
-            if place.get('description'):
-                itinerary += f"- {place['description']}\n"
-            itinerary += f"- Type: {place.get('type', 'Attraction').replace('_', ' ').title()}\n"
-            if place.get('address'):
-                itinerary += f"- Location: {place['address']}\n"
+        # Morning activities
+        itinerary.append("### 🌅 Morning\n")
+        if sections['morning']:
+            itinerary.append("\n".join(_render_scheduled_item(item) for item in sections['morning']))
         else:
-            itinerary += "- Free time for exploration 🚶‍♂️\n"
+            itinerary.append("- Free time for exploration 🚶‍♂️\n")
         
         # Lunch
-        itinerary += "\n### 🍽️ Lunch (12:00 PM - 1:30 PM)\n"
-        if categorized_places['restaurants']:
-            restaurant_idx = (day - 1) % len(categorized_places['restaurants'])
-            restaurant = categorized_places['restaurants'][restaurant_idx]
-            itinerary += f"**{restaurant['name']}**"
-            
-            # Safely get rating
-            rating = restaurant.get('rating')
-            if rating is not None:
-                itinerary += f" ⭐ {rating}/5\n"
-            else:
-                itinerary += "\n"
-                
-            if restaurant.get('description'):
-                itinerary += f"- {restaurant['description']}\n"
+        itinerary.append("\n### 🍽️ Lunch\n")
+        if sections['lunch']:
+            itinerary.append("\n".join(_render_scheduled_item(item) for item in sections['lunch']))
         else:
-            itinerary += "- Local restaurant (explore the area for dining options) 🔍\n"
+            itinerary.append("- Local restaurant (explore the area for dining options) 🔍\n")
         
-        # Afternoon activity
-        itinerary += "\n### ☀️ Afternoon (1:30 PM - 5:00 PM)\n"
-        if len(day_places) > 1:
-            place = day_places[1]
-            itinerary += f"**Explore {place['name']}**"
-            
-            # Safely get rating
-            rating = place.get('rating')
-            if rating is not None:
-                itinerary += f" ⭐ {rating}/5\n"
-            else:
-                itinerary += "\n"
-                
-            if place.get('description'):
-                itinerary += f"- {place['description']}\n"
-        elif day_places:
-            itinerary += f"- Continue exploring the {day_places[0]['name']} area 🗺️\n"
-            itinerary += "- Walk around the neighborhood and discover hidden gems\n"
+        # Afternoon activities
+        itinerary.append("\n### ☀️ Afternoon\n")
+        if sections['afternoon']:
+            itinerary.append("\n".join(_render_scheduled_item(item) for item in sections['afternoon']))
+        elif sections['morning']:
+            itinerary.append(f"- Continue exploring the {sections['morning'][-1]['place'].name} area 🗺️\n")
+            itinerary.append("- Walk around the neighborhood and discover hidden gems\n")
         else:
-            itinerary += "- Free time for shopping or relaxation 🛍️\n"
+            itinerary.append("- Free time for shopping or relaxation 🛍️\n")
         
         # Evening
-        itinerary += "\n### 🌆 Evening (5:00 PM onwards)\n"
-        if len(day_places) > 2:
-            place = day_places[2]
-            itinerary += f"**Visit {place['name']}**"
-            
-            # Safely get rating
-            rating = place.get('rating')
-            if rating is not None:
-                itinerary += f" ⭐ {rating}/5\n"
-            else:
-                itinerary += "\n"
-                
-            if place.get('description'):
-                itinerary += f"- {place['description']}\n"
-        else:
-            itinerary += "- Dinner at a local restaurant 🍽️\n"
-            itinerary += "- Evening stroll or local entertainment 🎭\n"
+        itinerary.append("\n### 🌆 Evening\n")
+        if sections['evening']:
+            itinerary.append("\n".join(_render_scheduled_item(item) for item in sections['evening']))
+        if not any(item['kind'] == 'dinner' for item in sections['evening']):
+            itinerary.append("- Dinner at a local restaurant 🍽️\n")
+        itinerary.append("- Evening stroll or local entertainment 🎭\n")
         
         # Add day-specific tips
-        itinerary += "\n**💡 Day Tips:**\n"
-        if day == 1:
-            itinerary += "- Arrive early to make the most of your first day\n"
-            itinerary += "- Get a local SIM card or check WiFi options 📱\n"
-        elif day == duration:
-            itinerary += "- Pack and prepare for departure ✈️\n"
-            itinerary += "- Buy souvenirs and last-minute shopping 🎁\n"
+        itinerary.append("\n**💡 Day Tips:**\n")
+        if day == 1 and arrival:
+            itinerary.append("- Arrive early to make the most of your first day\n")
+            itinerary.append("- Get a local SIM card or check WiFi options 📱\n")
+        elif day == duration and departure:
+            itinerary.append("- Pack and prepare for departure ✈️\n")
+            itinerary.append("- Buy souvenirs and last-minute shopping 🎁\n")
         else:
-            itinerary += "- Wear comfortable walking shoes 👟\n"
-            itinerary += "- Carry water and snacks 💧\n"
+            itinerary.append("- Wear comfortable walking shoes 👟\n")
+            itinerary.append("- Carry water and snacks 💧\n")
         
-        itinerary += "\n" + "-" * 50 + "\n\n"
+        itinerary.append("\n" + "-" * 50 + "\n\n")
+        yield "".join(itinerary)
     
     # Add comprehensive tips section
-    itinerary += _generate_additional_tips(destination, interests)
+    yield _generate_additional_tips(destination, interests)
+    
+    yield "\n**Have an amazing trip! 🌟✈️**"
+
+def _render_scheduled_item(item: Dict[str, Any]) -> str:
+    """
+    One scheduled visit or meal as Markdown, with its time, opening hours and the way there
+    """
+    
+    place = item['place']
+    label = {'visit': f"Visit {place.name}", 'lunch': place.name, 'dinner': f"Dinner at {place.name}"}[item['kind']]
+    lines = [f"**{clock(item['start'])}-{clock(item['end'])} · {label}**"]
+    lines.append(f" ⭐ {place.rating}/5\n" if place.rating is not None else "\n")
+    if place.description:
+        lines.append(f"- {place.description}\n")
+    if item['kind'] == 'visit':
+        lines.append(f"- Type: {(place.type if place.type is not None else 'Attraction').replace('_', ' ').title()}\n")
+        if place.address:
+            lines.append(f"- Location: {place.address}\n")
+    lines.append(f"- Open: {item['opening_hours']}\n")
+    if item['travel_from']:
+        lines.append(f"- 🚶 {item['travel_minutes']} min from {item['travel_from']}\n")
+    return "".join(lines)
+
+def generate_structured_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
+                                 interests: List[str], travel_style: str = "moderate") -> Itinerary:
+    """
+    Generate a day-by-day itinerary as a structured Itinerary model.
+    Uses GPT JSON output when available, otherwise the basic generator.
+    """
+    
+    print(f"Generating structured itinerary for {destination}, {duration} days, {len(places)} places")
+    
+    # Validate inputs the same way as generate_itinerary
+    if not destination or destination == "Unknown":
+        destination = "your destination"
+    
+    if not isinstance(duration, int) or duration <= 0:
+        duration = 7
+    
+    if not places:
+        places = []
+    
+    if not interests:
+        interests = ["general"]
+    
+    if llm_available():
+        try:
+            return _gpt_generate_structured_itinerary(destination, duration, places, interests, travel_style)
+        except Exception as e:
+            print(f"GPT structured itinerary failed: {e}, falling back to basic generation")
+            return _generate_basic_structured_itinerary(destination, duration, places, interests, travel_style)
+    else:
+        print("No OpenAI API key found, using basic structured itinerary")
+        return _generate_basic_structured_itinerary(destination, duration, places, interests, travel_style)
+
+STRUCTURED_ITINERARY_SYSTEM_PROMPT = """
+    You are an expert travel planner. Return ONLY a valid JSON object with this shape:
+
+    {
+      "daily_plans": [
+        {"day": 1, "activities": ["Morning: ...", "Lunch: ...", "Afternoon: ...", "Evening: ..."],
+         "places": ["Place name", ...], "notes": "Practical tips for the day"}
+      ],
+      "general_tips": ["...", "..."],
+      "estimated_budget": "Short budget estimate"
+    }
+
+    Include exactly one entry in daily_plans per day of the trip, numbered from 1.
+    Prefer places from the provided list and use their exact names in "places".
+    Follow the feasible schedule when one is given and keep its times: they fit the opening hours and travel between places.
+    """
+
+def _gpt_generate_structured_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
+                                      interests: List[str], travel_style: str) -> Itinerary:
+    """
+    Ask GPT for the itinerary as a JSON object matching the Itinerary/DayPlan models
+    """
+    
+    places_text = "\n".join(
+        f"- {place['name']} ({place.get('type', 'attraction').replace('_', ' ')})"
+        for place in places[:20]
+    ) or "No specific places provided - please suggest popular attractions."
+    
+    user_prompt = f"""
+    Destination: {destination}
+    Duration: {duration} days
+    Interests: {', '.join(interests)}
+    Travel style: {travel_style}
+
+    Available places:
+    {places_text}
+
+    Feasible schedule:
+    {_format_schedule_for_prompt(places, duration, travel_style)}
+    """
+    
+    response = chat_completion(
+        messages=[
+            {"role": "system", "content": STRUCTURED_ITINERARY_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        max_tokens=3000
+    )
+    
+    data = json.loads(response.choices[0].message.content)
+    
+    daily_plans = {}
+    for plan in data.get("daily_plans", []):
+        day_plan = DayPlan(**plan)
+        if 1 <= day_plan.day <= duration:
+            daily_plans[day_plan.day] = day_plan
+    
+    if not daily_plans:
+        raise ValueError("GPT returned no daily plans")
+    
+    # Fill any days GPT skipped from the basic generator
+    if len(daily_plans) < duration:
+        print(f"GPT returned {len(daily_plans)}/{duration} days, filling the rest")
+        for day_plan in _build_basic_day_plans(places, duration, travel_style):
+            daily_plans.setdefault(day_plan.day, day_plan)
+    
+    return Itinerary(
+        destination=destination,
+        duration=duration,
+        total_days=duration,
+        daily_plans=[daily_plans[day] for day in sorted(daily_plans)],
+        general_tips=data.get("general_tips") or _basic_general_tips(interests),
+        estimated_budget=data.get("estimated_budget")
+    )
+
+def regenerate_days(itinerary: Itinerary, days: List[int], places: List[Dict[str, Any]], 
+                    interests: List[str], travel_style: str = "moderate", 
+                    instructions: Optional[str] = None) -> Itinerary:
+    """
+    Regenerate only the requested days of a structured itinerary.
+    The other days are kept as-is and their places are avoided in the new days.
+    Days of a multi-city trip stay in their city and use that city's places.
+    """
+    
+    print(f"Regenerating days {days} of {itinerary.destination} itinerary")
+    
+    daily_plans = {day_plan.day: day_plan for day_plan in itinerary.daily_plans}
+    
+    for day in sorted(set(days)):
+        # Places already used elsewhere in the trip shouldn't be repeated
+        used_places = set()
+        for other_day, day_plan in daily_plans.items():
+            if other_day != day:
+                used_places.update(day_plan.places)
+        available_places = [place for place in places if place['name'] not in used_places]
+        city = daily_plans[day].city if day in daily_plans else None
+        if city:
+            available_places = [place for place in available_places if place.get('city') == city]
+        
+        if llm_available():
+            try:
+                daily_plans[day] = _gpt_generate_day_plan(
+                    city or itinerary.destination, day, itinerary.duration, available_places,
+                    interests, travel_style, instructions, daily_plans.get(day)
+                )
+                daily_plans[day].city = city
+                continue
+            except Exception as e:
+                print(f"GPT day regeneration failed: {e}, falling back to basic generation")
+        
+        day_plan = _build_basic_day_plans(available_places, 1, travel_style)[0]
+        day_plan.day = day
+        day_plan.notes = _basic_day_notes(day, itinerary.duration)
+        day_plan.city = city
+        daily_plans[day] = day_plan
+    
+    return Itinerary(
+        destination=itinerary.destination,
+        duration=itinerary.duration,
+        total_days=itinerary.total_days,
+        daily_plans=[daily_plans[day] for day in sorted(daily_plans)],
+        general_tips=itinerary.general_tips,
+        estimated_budget=itinerary.estimated_budget
+    )
+
+DAY_PLAN_SYSTEM_PROMPT = """
+    You are an expert travel planner. Plan ONE day of an existing trip and return ONLY a valid JSON object:
+
+    {"activities": ["Morning: ...", "Lunch: ...", "Afternoon: ...", "Evening: ..."],
+     "places": ["Place name", ...], "notes": "Practical tips for the day"}
+
+    Prefer places from the provided list and use their exact names in "places".
+    """
+
+def _gpt_generate_day_plan(destination: str, day: int, duration: int, places: List[Dict[str, Any]], 
+                           interests: List[str], travel_style: str, instructions: Optional[str], 
+                           current_plan: Optional[DayPlan]) -> DayPlan:
+    """
+    Ask GPT for a single DayPlan as JSON - a small call instead of a whole itinerary
+    """
+    
+    places_text = "\n".join(
+        f"- {place['name']} ({place.get('type', 'attraction').replace('_', ' ')})"
+        for place in places[:10]
+    ) or "No specific places provided - please suggest popular attractions."
+    
+    user_prompt = f"""
+    Destination: {destination}
+    Day: {day} of {duration}
+    Interests: {', '.join(interests)}
+    Travel style: {travel_style}
+    Current plan for this day: {', '.join(current_plan.activities) if current_plan else 'none'}
+    Requested change: {instructions or 'Suggest a different plan for this day'}
+
+    Available places (not used on other days):
+    {places_text}
+    """
+    
+    response = chat_completion(
+        messages=[
+            {"role": "system", "content": DAY_PLAN_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        max_tokens=500
+    )
+    
+    data = json.loads(response.choices[0].message.content)
+    data['day'] = day
+    return DayPlan(**data)
+
+def _generate_basic_structured_itinerary(destination: str, duration: int, places: List[Dict[str, Any]], 
+                                        interests: List[str], travel_style: str) -> Itinerary:
+    """
+    Fallback method to build a structured itinerary without GPT
+    """
+    
+    return Itinerary(
+        destination=destination,
+        duration=duration,
+        total_days=duration,
+        daily_plans=_build_basic_day_plans(places, duration, travel_style),
+        general_tips=_basic_general_tips(interests)
+    )
+
+def _build_basic_day_plans(places: List[Dict[str, Any]], duration: int, 
+                           travel_style: str) -> List[DayPlan]:
+    """
+    Turn the scheduled days into DayPlan models
+    """
+    
+    day_plans = []
+    for day_slot in _plan_basic_days(places, duration, travel_style):
+        day = day_slot['day']
+        sections = _day_sections(day_slot['items'])
+        
+        activities = []
+        place_names = []
+        fallbacks = {
+            'morning': "Free time for exploration",
+            'lunch': "Local restaurant",
+            'afternoon': "Free time for shopping or relaxation",
+            'evening': "Dinner at a local restaurant"
+        }
+        for section, fallback in fallbacks.items():
+            for item in sections[section]:
+                verb = {'visit': "Visit ", 'lunch': "", 'dinner': "Dinner at "}[item['kind']]
+                activities.append(f"{section.title()} {clock(item['start'])}-{clock(item['end'])}: {verb}{item['place'].name}")
+                place_names.append(item['place'].name)
+            if not sections[section]:
+                activities.append(f"{section.title()}: {fallback}")
+        
+        day_plans.append(DayPlan(day=day, activities=activities, places=place_names, 
+                                 notes=_basic_day_notes(day, duration)))
+    
+    return day_plans
+
+def _basic_day_notes(day: int, duration: int) -> str:
+    """
+    Day tips for the basic structured itinerary
+    """
+    
+    if day == 1:
+        return "Arrive early to make the most of your first day. Get a local SIM card or check WiFi options."
+    elif day == duration:
+        return "Pack and prepare for departure. Buy souvenirs and do last-minute shopping."
+    else:
+        return "Wear comfortable walking shoes. Carry water and snacks."
+
+def _basic_general_tips(interests: List[str]) -> List[str]:
+    """
+    General tips list used by the structured itineraries
+    """
+    
+    tips = list(GENERIC_TIPS['general'])
+    for interest in interests:
+        if interest in _INTEREST_TIP_LINES:
+            tips.extend(GENERIC_TIPS[interest])
+    
+    return tips
+
+def render_itinerary_markdown(itinerary: Itinerary) -> str:
+    """
+    Render a structured Itinerary as Markdown for chat clients
+    """
+    
+    lines = [f"# {itinerary.duration}-Day Itinerary for {itinerary.destination} 🌍", ""]
+    if itinerary.estimated_budget:
+        lines += [f"**Estimated Budget:** {itinerary.estimated_budget}", ""]
+    
+    for day_plan in itinerary.daily_plans:
+        lines.append(f"## Day {day_plan.day} - {day_plan.city}" if day_plan.city else f"## Day {day_plan.day}")
+        lines.append("")
+        lines += [f"- {activity}" for activity in day_plan.activities]
+        if day_plan.notes:
+            lines += ["", f"**💡 Day Tips:** {day_plan.notes}"]
+        lines.append("")
     
-    itinerary += "\n**Have an amazing trip! 🌟✈️**"
+    if itinerary.general_tips:
+        lines += ["## 💡 General Tips", ""]
+        lines += [f"- {tip}" for tip in itinerary.general_tips]
     
-    return itinerary
\ No newline at end of file
+    return "\n".join(lines)
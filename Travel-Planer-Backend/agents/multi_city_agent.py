@@ -0,0 +1,266 @@
+"""
+Multi-City Agent - Plans trips through several cities ("a week in Rome, Florence and Venice").
+
+The parser lists the stops with their days (destination_info['cities']). Each stop is
+planned as its own segment - places search, then the itinerary for its days - and the
+segments run in parallel and are merged in travel order: only the day sections of each
+stop's itinerary are kept, renumbered across the trip, under one title and one tips section. A three-city trip therefore takes about as long as its slowest city
+rather than the sum of them, and each segment is cached like a single-city trip.
+"""
+
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from agents.google_places_agent import get_place_recommendations
+from agents.itinerary_agent import (_generate_additional_tips, generate_itinerary_with_source,
+                                    generate_structured_itinerary, iter_basic_itinerary)
+from agents.place_dedup import dedupe_places
+from schemas.models import DayPlan, Itinerary
+from schemas.place_record import to_dicts, to_records
+
+# Places searched per stop; the trip's place list is all of them together
+PLACES_PER_CITY = 15
+
+# Enough for every stop of a few concurrent trips (the parser allows 5 stops)
+_segment_executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="city-segment")
+
+_DAY_PATTERN = re.compile(r'\b(Day)\s+(\d+)\b')
+_HEADING_PATTERN = re.compile(r'^(#{1,5}) ', re.MULTILINE)
+_ANY_HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*)$', re.MULTILINE)
+
+def city_segments(destination_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The stops of a multi-city trip with the trip day each one starts on, and
+    whether the trip arrives at (first stop) or departs from (last stop) it
+    """
+    cities = destination_info.get('cities') or []
+    segments = []
+    first_day = 1
+    for index, city in enumerate(cities):
+        segments.append({
+            'destination': city['destination'],
+            'days': city['days'],
+            'first_day': first_day,
+            'arrival': index == 0,
+            'departure': index == len(cities) - 1
+        })
+        first_day += city['days']
+    return segments
+
+def _run_parallel(function: Callable[[Dict[str, Any]], Any], segments: List[Dict[str, Any]]) -> List[Any]:
+    """
+    function(segment) for every segment at once, results in segment order.
+    Each runs in a copy of the caller's context, so the request deadline applies.
+    """
+    futures = [
+        _segment_executor.submit(contextvars.copy_context().run, function, segment)
+        for segment in segments
+    ]
+    return [future.result() for future in futures]
+
+def plan_multi_city_trip(destination_info: Dict[str, Any], structured: bool = False) -> Dict[str, Any]:
+    """
+    Search places and generate the itinerary of every stop in parallel.
+    Returns the merged places (tagged with their 'city'), the Markdown itinerary,
+    the structured itinerary (structured=True only) and the itinerary source.
+    """
+    interests = destination_info.get('interests', ['general'])
+    travel_style = destination_info.get('travel_style', 'moderate')
+
+    def plan_segment(segment: Dict[str, Any]) -> Dict[str, Any]:
+        # A stop's itinerary starts as soon as its own places are found
+        places = _search_segment_places(segment, interests)
+        if structured:
+            return {'places': places, 'structured': generate_structured_itinerary(
+                segment['destination'], segment['days'], places, interests, travel_style)}
+        itinerary, source = _generate_segment_itinerary(segment, places, interests, travel_style)
+        return {'places': places, 'itinerary': itinerary, 'source': source}
+
+    segments = city_segments(destination_info)
+    print(f"Planning {len(segments)} cities in parallel: {[segment['destination'] for segment in segments]}")
+    results = _run_parallel(plan_segment, segments)
+    places = _merge_places([result['places'] for result in results])
+
+    if structured:
+        structured_itinerary = _merge_structured(destination_info, segments, [result['structured'] for result in results])
+        return {'places': places, 'structured_itinerary': structured_itinerary, 'itinerary': None, 'itinerary_source': None}
+
+    itinerary = _merge_markdown(destination_info, segments, [result['itinerary'] for result in results])
+    return {
+        'places': places,
+        'itinerary': itinerary,
+        'structured_itinerary': None,
+        'itinerary_source': _combined_source([result['source'] for result in results])
+    }
+
+def search_city_places(destination_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The places of every stop, searched in parallel (for the streaming endpoint)
+    """
+    interests = destination_info.get('interests', ['general'])
+    results = _run_parallel(lambda segment: _search_segment_places(segment, interests), city_segments(destination_info))
+    return _merge_places(results)
+
+def generate_multi_city_itinerary(destination_info: Dict[str, Any], places: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    The Markdown itinerary and its source for already found places (e.g. for a
+    background upgrade); each stop uses the places tagged with its city
+    """
+    interests = destination_info.get('interests', ['general'])
+    travel_style = destination_info.get('travel_style', 'moderate')
+    segments = city_segments(destination_info)
+    results = _run_parallel(
+        lambda segment: _generate_segment_itinerary(segment, _places_in(places, segment), interests, travel_style),
+        segments
+    )
+    itinerary = _merge_markdown(destination_info, segments, [itinerary for itinerary, _ in results])
+    return itinerary, _combined_source([source for _, source in results])
+
+def iter_multi_city_basic_itinerary(destination_info: Dict[str, Any], places: List[Dict[str, Any]]) -> Iterator[str]:
+    """
+    The basic itinerary of every stop in travel order, as Markdown chunks
+    """
+    interests = destination_info.get('interests', ['general'])
+    travel_style = destination_info.get('travel_style', 'moderate')
+    segments = city_segments(destination_info)
+
+    yield _route_header(destination_info, segments)
+    for segment in segments:
+        yield _leg_heading(segment)
+        chunks = iter_basic_itinerary(segment['destination'], segment['days'], _places_in(places, segment),
+                                      interests, travel_style, segment['arrival'], segment['departure'])
+        for chunk in chunks:
+            days = _day_sections(chunk)
+            if days:
+                yield _shift_segment(days, segment)
+    yield _trip_footer(destination_info)
+
+def _search_segment_places(segment: Dict[str, Any], interests: List[str]) -> List[Dict[str, Any]]:
+    try:
+        places = get_place_recommendations(segment['destination'], interests, max_places=PLACES_PER_CITY)
+    except Exception as e:
+        print(f"Error searching places in {segment['destination']}: {e}")
+        return []
+    return [{**place, 'city': segment['destination']} for place in places]
+
+def _generate_segment_itinerary(segment: Dict[str, Any], places: List[Dict[str, Any]],
+                                interests: List[str], travel_style: str) -> Tuple[str, str]:
+    return generate_itinerary_with_source(
+        destination=segment['destination'],
+        duration=segment['days'],
+        places=places,
+        interests=interests,
+        travel_style=travel_style,
+        arrival=segment['arrival'],
+        departure=segment['departure']
+    )
+
+def _places_in(places: List[Dict[str, Any]], segment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [place for place in places if place.get('city') == segment['destination']]
+
+def _merge_places(places_by_city: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    All stops' places in travel order. Duplicates are only resolved within a stop:
+    every stop keeps its own places, even where two stops' searches overlap.
+    """
+    merged: List[Dict[str, Any]] = []
+    for places in places_by_city:
+        merged.extend(to_dicts(dedupe_places(to_records(places))))
+    return merged
+
+def _combined_source(sources: List[str]) -> str:
+    """
+    The trip is only as good as its weakest segment
+    """
+    if "deadline" in sources:
+        return "deadline"
+    if "basic" in sources:
+        return "basic"
+    return "gpt"
+
+def _short_name(destination: str) -> str:
+    return destination.split(',')[0]
+
+def _day_range(segment: Dict[str, Any]) -> str:
+    last_day = segment['first_day'] + segment['days'] - 1
+    return f"Day {last_day}" if segment['days'] == 1 else f"Days {segment['first_day']}-{last_day}"
+
+def _route_header(destination_info: Dict[str, Any], segments: List[Dict[str, Any]]) -> str:
+    route = " → ".join(f"{_short_name(segment['destination'])} ({_day_range(segment)})" for segment in segments)
+    duration = sum(segment['days'] for segment in segments)
+    return f"# {duration}-Day Trip: {destination_info['destination']} 🗺️\n\n**Route:** {route}\n\n"
+
+def _leg_heading(segment: Dict[str, Any]) -> str:
+    if segment['arrival']:
+        return f"## 📍 {_short_name(segment['destination'])} ({_day_range(segment)})\n\n"
+    return f"\n---\n\n## 🚆 On to {_short_name(segment['destination'])} ({_day_range(segment)})\n\n"
+
+def _trip_footer(destination_info: Dict[str, Any]) -> str:
+    tips = _generate_additional_tips(destination_info['destination'], destination_info.get('interests', ['general']))
+    return f"\n{tips}\n**Have an amazing trip! 🌟✈️**"
+
+def _day_sections(markdown: str) -> str:
+    """
+    Only the "Day N" sections of a stop's itinerary, each up to the next heading of its
+    level or above; the stop's own title, introduction, tips and sign-off are dropped.
+    Empty if the itinerary has no day headings.
+    """
+    headings = list(_ANY_HEADING_PATTERN.finditer(markdown))
+    sections: List[str] = []
+    section_end = 0
+    for index, heading in enumerate(headings):
+        if heading.start() < section_end or not _DAY_PATTERN.search(heading.group(2)):
+            continue
+        level = len(heading.group(1))
+        section_end = next(
+            (later.start() for later in headings[index + 1:] if len(later.group(1)) <= level),
+            len(markdown)
+        )
+        sections.append(markdown[heading.start():section_end])
+    return "".join(sections)
+
+def _shift_segment(markdown: str, segment: Dict[str, Any]) -> str:
+    """
+    A stop's itinerary as part of the trip: days numbered from the stop's first trip
+    day and headings one level down, under the trip's own title
+    """
+    offset = segment['first_day'] - 1
+    if offset:
+        markdown = _DAY_PATTERN.sub(lambda match: f"{match.group(1)} {int(match.group(2)) + offset}", markdown)
+    return _HEADING_PATTERN.sub(r'#\1 ', markdown)
+
+def _merge_markdown(destination_info: Dict[str, Any], segments: List[Dict[str, Any]], itineraries: List[str]) -> str:
+    parts = [_route_header(destination_info, segments)]
+    for segment, itinerary in zip(segments, itineraries):
+        parts.append(_leg_heading(segment))
+        # An itinerary without day headings is kept whole rather than lost
+        parts.append(_shift_segment(_day_sections(itinerary) or itinerary, segment))
+    parts.append(_trip_footer(destination_info))
+    return "".join(parts)
+
+def _merge_structured(destination_info: Dict[str, Any], segments: List[Dict[str, Any]],
+                      itineraries: List[Itinerary]) -> Itinerary:
+    daily_plans: List[DayPlan] = []
+    general_tips: List[str] = []
+    budgets = []
+    for segment, itinerary in zip(segments, itineraries):
+        for day_plan in itinerary.daily_plans[:segment['days']]:
+            daily_plans.append(day_plan.model_copy(update={
+                'day': segment['first_day'] + day_plan.day - 1,
+                'city': segment['destination']
+            }))
+        general_tips.extend(tip for tip in itinerary.general_tips if tip not in general_tips)
+        if itinerary.estimated_budget:
+            budgets.append(f"{_short_name(segment['destination'])}: {itinerary.estimated_budget}")
+
+    duration = sum(segment['days'] for segment in segments)
+    return Itinerary(
+        destination=destination_info['destination'],
+        duration=duration,
+        total_days=duration,
+        daily_plans=daily_plans,
+        general_tips=general_tips,
+        estimated_budget="; ".join(budgets) or None
+    )
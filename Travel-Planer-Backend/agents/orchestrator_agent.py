@@ -0,0 +1,196 @@
+"""
+Orchestrator Agent - Lets GPT plan a trip by calling the travel_functions tools
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import json
+
+from agents.functions import travel_functions
+from agents.destination_agent import parse_destination_request_with_source
+from agents.google_places_agent import search_places
+from agents.itinerary_agent import generate_itinerary_with_source
+from agents.tips_agent import get_travel_tips
+from services.cache import get_cache
+from services.llm_client import chat_completion
+
+def _generate_itinerary_tool(args: Dict[str, Any]) -> Tuple[Dict[str, str], bool]:
+    itinerary, source = generate_itinerary_with_source(
+        destination=args['destination'],
+        duration=int(args.get('duration', 7)),
+        places=args.get('places') or [],
+        interests=args.get('interests') or ['general'],
+        travel_style=args.get('travel_style', 'moderate')
+    )
+    return {'itinerary': itinerary, 'itinerary_source': source}, source == "gpt"
+
+def _parse_tool(args: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    destination_info, source = parse_destination_request_with_source(args['text'])
+    return {'destination_info': destination_info, 'parse_source': source}, source == "gpt"
+
+# Tool name -> implementation taking the parsed JSON arguments and returning the result
+# and whether it may be cached (fallback parses and basic itineraries may not: later
+# conversations should get the real result once GPT answers again)
+TOOL_HANDLERS = {
+    'parse_destination_request': _parse_tool,
+    'search_places': lambda args: (search_places(
+        location=args['location'],
+        interests=args.get('interests') or ['general'],
+        place_types=args.get('place_types') or None
+    ), True),
+    'generate_itinerary': _generate_itinerary_tool,
+    'get_travel_tips': lambda args: (get_travel_tips(
+        destination=args['destination'],
+        tip_categories=args.get('tip_categories') or None
+    ), True)
+}
+
+ORCHESTRATOR_SYSTEM_PROMPT = """
+You are a travel planning assistant with access to tools.
+To plan a trip:
+1. Call parse_destination_request with the user's message.
+2. Call search_places for the destination (and get_travel_tips if useful). These calls are independent - request them together in one turn.
+3. Call generate_itinerary with the parsed destination, duration, interests, travel style and the places found.
+When the itinerary is ready, reply with a one-sentence summary.
+"""
+
+def make_tool_key(name: str, arguments: Dict[str, Any]) -> str:
+    return f"{name}:{json.dumps(arguments, sort_keys=True, separators=(',', ':'))}"
+
+_tool_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="travel-tool")
+
+def execute_tool_call(name: str, arguments: Dict[str, Any]) -> Any:
+    """
+    Run a single tool call, serving repeated calls from the cache
+    """
+    
+    handler = TOOL_HANDLERS.get(name)
+    if handler is None:
+        return {"error": f"Tool {name} is not available"}
+    
+    def run_tool():
+        print(f"Executing tool: {name}")
+        result, cacheable = handler(arguments)
+        return [result, cacheable]
+    
+    # Shared across conversations (and workers, with a shared backend) so repeated tool calls are free
+    result, _ = get_cache().get_or_compute('tool', make_tool_key(name, arguments), run_tool,
+                                           should_cache=lambda entry: entry[1])
+    return result
+
+def execute_tool_calls(tool_calls: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Run the tool calls of one model turn concurrently.
+    Each call is {'name': ..., 'arguments': {...}}; results keep the input order.
+    Identical calls in the same turn only run once.
+    """
+    
+    futures = {}
+    for call in tool_calls:
+        key = make_tool_key(call['name'], call['arguments'])
+        if key not in futures:
+            # Copy the context so tools see the request deadline
+            context = contextvars.copy_context()
+            futures[key] = _tool_executor.submit(context.run, execute_tool_call, call['name'], call['arguments'])
+    
+    results = []
+    for call in tool_calls:
+        key = make_tool_key(call['name'], call['arguments'])
+        try:
+            results.append(futures[key].result())
+        except Exception as e:
+            print(f"Tool {call['name']} failed: {e}")
+            results.append({"error": str(e)})
+    
+    return results
+
+def run_orchestrated_plan(message: str, max_rounds: int = 6) -> Dict[str, Any]:
+    """
+    Plan a trip by letting GPT call the travel tools.
+    Returns the destination info, places and itinerary collected from the tool calls,
+    the parse and itinerary sources and a status: "success", or "incomplete" if the model never
+    parsed the request or produced an itinerary with the tool, or ran out of rounds.
+    """
+    
+    tools = [{"type": "function", "function": function} for function in travel_functions]
+    messages = [
+        {"role": "system", "content": ORCHESTRATOR_SYSTEM_PROMPT},
+        {"role": "user", "content": message}
+    ]
+    
+    destination_info: Dict[str, Any] = {}
+    places: List[Dict[str, Any]] = []
+    itinerary: Optional[str] = None
+    itinerary_source: Optional[str] = None
+    parse_source: Optional[str] = None
+    finished = False
+    
+    for round_number in range(1, max_rounds + 1):
+        response = chat_completion(
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            temperature=0.1
+        )
+        reply = response.choices[0].message
+        
+        if not reply.tool_calls:
+            finished = True
+            break
+        
+        calls = []
+        for tool_call in reply.tool_calls:
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError:
+                arguments = {}
+            calls.append({'name': tool_call.function.name, 'arguments': arguments})
+        
+        print(f"Orchestrator round {round_number}: {[call['name'] for call in calls]}")
+        results = execute_tool_calls(calls)
+        
+        messages.append({
+            "role": "assistant",
+            "content": reply.content,
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+                }
+                for tool_call in reply.tool_calls
+            ]
+        })
+        
+        for tool_call, call, result in zip(reply.tool_calls, calls, results):
+            # Keep what the API response needs from the tool results
+            if call['name'] == 'parse_destination_request' and isinstance(result, dict) and 'destination_info' in result:
+                destination_info, parse_source = result['destination_info'], result['parse_source']
+                # The model only needs the parsed request
+                result = destination_info
+            elif call['name'] == 'search_places' and isinstance(result, list):
+                known_ids = {place.get('place_id') for place in places}
+                places.extend(place for place in result if place.get('place_id') not in known_ids)
+            elif call['name'] == 'generate_itinerary' and isinstance(result, dict) and 'itinerary' in result:
+                itinerary, itinerary_source = result['itinerary'], result['itinerary_source']
+                # The model only needs the itinerary text
+                result = itinerary
+            
+            messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "content": result if isinstance(result, str) else json.dumps(result, default=str)
+            })
+    
+    if not finished:
+        print(f"Orchestrator stopped after {max_rounds} rounds without finishing")
+    complete = finished and bool(destination_info) and itinerary is not None
+    return {
+        "status": "success" if complete else "incomplete",
+        "destination_info": destination_info,
+        "places": places,
+        "itinerary": itinerary or "Unable to generate detailed itinerary. Please try again.",
+        "itinerary_source": itinerary_source,
+        "parse_source": parse_source
+    }
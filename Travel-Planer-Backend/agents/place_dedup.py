@@ -0,0 +1,194 @@
+"""
+Place Dedup - Resolves the same real-world place returned by several searches.
+
+A landmark often comes back from more than one place type (a museum under both
+"museum" and "tourist_attraction") with a slightly different name or vicinity, and
+each copy would take an itinerary slot and prompt tokens. A place is a duplicate of
+one already kept if:
+1. it has the same place_id, or
+2. it has the same name and address and a compatible kind, or
+3. it lies within DEFAULT_RADIUS_METERS, is of a compatible kind and its normalized
+   name is similar enough.
+Kinds are sights, food and drink, shops and lodging: a museum's cafe or bookshop is a
+place of its own.
+
+Step 3 only compares places in neighbouring cells of a spatial grid (cells about
+the radius wide), so resolving n places costs O(n) grid lookups plus a few name
+comparisons each, instead of comparing every pair.
+"""
+
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from schemas.place_record import PlaceRecord
+
+DEFAULT_RADIUS_METERS = 150.0
+DEFAULT_NAME_SIMILARITY = 0.85
+# Short names differ in few characters ("st mary church" / "st mark church"), so they
+# need a closer match
+SHORT_NAME_LENGTH = 20
+SHORT_NAME_SIMILARITY = 0.9
+# Names of as many words must match word by word: "mary" / "mark" are different words,
+# "museum" / "museums" the same one
+WORD_SIMILARITY = 0.8
+
+_METERS_PER_DEGREE = 111_320.0
+_NON_WORD = re.compile(r"[^\w\s]")
+# Articles and connectors that vary between listings of the same place
+_NAME_STOPWORDS = frozenset(('the', 'a', 'an', 'of', 'and', 'la', 'le', 'les', 'il', 'lo', 'di', 'de',
+                             'del', 'della', 'des', 'el', 'los', 'las'))
+# Spellings of the same word, replaced by one form when normalizing
+_NAME_ALIASES = {'saint': 'st', 'san': 'st', 'santa': 'st', 'mount': 'mt'}
+# Words naming a place of its own inside or next to another: "Louvre Museum Cafe"
+# is not the Louvre Museum
+_CATEGORY_WORDS = frozenset(('cafe', 'caffe', 'coffee', 'bar', 'restaurant', 'ristorante', 'bistro', 'bakery',
+                             'shop', 'bookshop', 'bookstore', 'store', 'giftshop', 'gift', 'kiosk', 'hotel',
+                             'hostel', 'parking', 'station', 'entrance', 'ticket', 'tickets'))
+# Place types grouped into kinds; places of different kinds are never the same place.
+# Types not listed (museums, churches, parks, attractions...) are sights.
+_TYPE_KINDS = {
+    **dict.fromkeys(('restaurant', 'cafe', 'bakery', 'bar', 'meal_takeaway', 'meal_delivery', 'food',
+                     'night_club'), 'food'),
+    **dict.fromkeys(('store', 'book_store', 'clothing_store', 'electronics_store', 'shopping_mall',
+                     'gift_shop', 'souvenir_shop'), 'shop'),
+    **dict.fromkeys(('lodging', 'hotel'), 'lodging')
+}
+
+def normalize_name(name: str) -> str:
+    """
+    Lowercase, accents and punctuation removed, articles dropped: "The Pantheon" -> "pantheon"
+    """
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ' '.join(
+        _NAME_ALIASES.get(token, token) for token in _NON_WORD.sub(' ', text).split() if token not in _NAME_STOPWORDS
+    )
+
+def types_compatible(first: Optional[str], second: Optional[str]) -> bool:
+    """
+    Whether places of these types could be the same place (an unknown type could be anything)
+    """
+    if not first or not second:
+        return True
+    return _TYPE_KINDS.get(first, 'sight') == _TYPE_KINDS.get(second, 'sight')
+
+def names_match(first: str, second: str, threshold: float = DEFAULT_NAME_SIMILARITY) -> bool:
+    """
+    Whether two normalized names plausibly name the same place
+    """
+    if first == second:
+        return bool(first)
+    if not first or not second:
+        return False
+
+    first_tokens, second_tokens = set(first.split()), set(second.split())
+    smaller, larger = sorted((first_tokens, second_tokens), key=len)
+    # "Vatican Museums" / "Vatican Museums Rome"; single words are too ambiguous, and
+    # "Louvre Museum" / "Louvre Museum Cafe" are two places
+    if len(smaller) >= 2 and smaller <= larger:
+        return not (larger - smaller) & _CATEGORY_WORDS
+
+    # Spelling variants: "Vatican Museum" / "Vatican Museums", "Colosseum" / "Colosseo"
+    if min(len(first), len(second)) < SHORT_NAME_LENGTH:
+        threshold = max(threshold, SHORT_NAME_SIMILARITY)
+    matcher = SequenceMatcher(None, first, second)
+    if not (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold):
+        return False
+    first_words, second_words = first.split(), second.split()
+    if len(first_words) != len(second_words):
+        return True
+    return all(
+        SequenceMatcher(None, first_word, second_word).ratio() >= WORD_SIMILARITY
+        for first_word, second_word in zip(first_words, second_words) if first_word != second_word
+    )
+
+class PlaceDeduplicator:
+    """
+    Keeps the first copy of each place; add() tells whether a place was new
+    """
+
+    def __init__(self, radius_meters: float = DEFAULT_RADIUS_METERS, name_similarity: float = DEFAULT_NAME_SIMILARITY):
+        self.radius_meters = radius_meters
+        self.name_similarity = name_similarity
+        self.places: List[PlaceRecord] = []
+        self.merged = 0
+
+        self._cell_degrees = radius_meters / _METERS_PER_DEGREE
+        self._by_place_id: Dict[str, PlaceRecord] = {}
+        self._by_name_address: Dict[Tuple[str, str], PlaceRecord] = {}
+        self._grid: Dict[Tuple[int, int], List[Tuple[PlaceRecord, str]]] = defaultdict(list)
+
+    def add(self, place: PlaceRecord) -> bool:
+        """
+        Add a place; False if it resolves to a place already added
+        """
+        if place.place_id and place.place_id in self._by_place_id:
+            self.merged += 1
+            return False
+
+        name = normalize_name(place.name)
+        name_address = (name, (place.address or '').lower())
+        existing = self._by_name_address.get(name_address)
+        if existing is not None and not types_compatible(place.type, existing.type):
+            existing = None
+        existing = existing or self._find_nearby(place, name)
+        if existing is not None:
+            # Later copies with this id resolve straight away
+            if place.place_id:
+                self._by_place_id[place.place_id] = existing
+            self.merged += 1
+            return False
+
+        self.places.append(place)
+        if place.place_id:
+            self._by_place_id[place.place_id] = place
+        self._by_name_address[name_address] = place
+        if place.lat is not None and place.lng is not None:
+            self._grid[self._cell(place.lat, place.lng)].append((place, name))
+        return True
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        row = math.floor(lat / self._cell_degrees)
+        return row, math.floor(lng / self._lng_cell_degrees(row))
+
+    def _lng_cell_degrees(self, row: int) -> float:
+        # Degrees of longitude shrink towards the poles; cells stay about radius wide
+        latitude = (row + 0.5) * self._cell_degrees
+        return self._cell_degrees / max(math.cos(math.radians(latitude)), 0.01)
+
+    def _find_nearby(self, place: PlaceRecord, name: str) -> Optional[PlaceRecord]:
+        if place.lat is None or place.lng is None:
+            return None
+
+        row = math.floor(place.lat / self._cell_degrees)
+        for neighbour_row in (row - 1, row, row + 1):
+            column = math.floor(place.lng / self._lng_cell_degrees(neighbour_row))
+            for neighbour_column in (column - 1, column, column + 1):
+                for candidate, candidate_name in self._grid.get((neighbour_row, neighbour_column), ()):
+                    if (self._distance_meters(place, candidate) <= self.radius_meters
+                            and types_compatible(place.type, candidate.type)
+                            and names_match(name, candidate_name, self.name_similarity)):
+                        return candidate
+        return None
+
+    @staticmethod
+    def _distance_meters(first: PlaceRecord, second: PlaceRecord) -> float:
+        # Equirectangular approximation; exact enough at a few hundred metres
+        mean_latitude = math.radians((first.lat + second.lat) / 2)
+        dx = (second.lng - first.lng) * math.cos(mean_latitude)
+        dy = second.lat - first.lat
+        return math.hypot(dx, dy) * _METERS_PER_DEGREE
+
+def dedupe_places(places: List[PlaceRecord]) -> List[PlaceRecord]:
+    """
+    The places without duplicates, in their original order
+    """
+    deduplicator = PlaceDeduplicator()
+    for place in places:
+        deduplicator.add(place)
+    return deduplicator.places
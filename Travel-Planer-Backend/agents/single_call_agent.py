@@ -0,0 +1,216 @@
+"""
+Single-Call Agent - Plans a trip with one LLM round-trip instead of two.
+
+The pipeline parses the request with GPT, searches places, then asks GPT for the
+itinerary. Here the fast local parser picks the destination, the places search runs
+for it right away, and one streamed call both confirms the parsed spec (as a JSON
+header line) and writes the itinerary for it.
+
+If GPT reads a different destination than the local parser, the places were searched
+for the wrong trip: they are searched again for GPT's destination and the itinerary
+is regenerated (the correction path, a second call only for these requests). Other
+differences (duration, interests, style) need no correction - the itinerary is
+written for the header GPT just produced.
+
+Trips through several cities are left to the pipeline, which plans them per city:
+requests naming a region or several cities never make the single call, and if the
+header still reveals one, the stream is cut off right after it.
+"""
+
+from typing import Callable, List, Dict, Any, Optional, Tuple
+import json
+import re
+
+from agents.destination_agent import _fallback_parse, clean_parsed_request, mentions_several_cities
+from agents.google_places_agent import get_place_recommendations
+from agents.itinerary_agent import (ITINERARY_SYSTEM_PROMPT, _enhance_short_itinerary, _format_places_for_prompt, _format_schedule_for_prompt,
+                                    _generate_basic_itinerary, generate_itinerary_with_source)
+from services.cache import get_cache
+from services.deadline import DeadlineExceeded
+from services.llm_client import stream_chat_completion
+
+# Static like the itinerary prompt it extends: that prompt comes first, so both share
+# the same leading block for the provider's prompt cache (once they are long enough
+# to be cached), and the single-call reply format is appended after it
+SINGLE_CALL_SYSTEM_PROMPT = ITINERARY_SYSTEM_PROMPT + """
+Your reply has two parts.
+
+First line: the trip you read from the user's request as a JSON object on a single line, with exactly these fields:
+{"destination": "City, Country", "duration": <days, 7 if not given>, "interests": [...], "travel_style": "budget|moderate|luxury|relaxed|packed|adventure", "special_requirements": [...]}
+The user's message includes a quick automatic parse; correct anything it got wrong.
+If the trip goes through several cities or a region, add "cities": [{"destination": "City, Country", "days": <days>}, ...] in travel order and end your reply after the JSON line.
+
+Then an empty line, then the itinerary in Markdown for the trip in your JSON line.
+"""
+
+_HEADER_PATTERN = re.compile(r'^\s*(?:```(?:json)?\s*)?(\{.*?\})\s*(?:```)?\s*\n', re.DOTALL)
+
+def run_single_call_plan(message: str) -> Optional[Dict[str, Any]]:
+    """
+    Plan a trip with one streamed LLM call.
+    Returns the destination info, places, itinerary, its source ("gpt", "basic" or
+    "deadline"), the parse source ("gpt", or "fallback" for the local parse) and the
+    spec fields GPT corrected; None if the local parser can't
+    find a destination (the caller should use the pipeline, whose GPT parse may)
+    or the trip goes through several cities (the pipeline plans those per city).
+    """
+
+    local_info = _fallback_parse(message)
+    if local_info['destination'] == 'Unknown' or local_info.get('cities') or mentions_several_cities(message):
+        return None
+
+    # The places search starts from the local parse, without waiting for GPT
+    places = _search_places(local_info)
+
+    try:
+        text = stream_chat_completion(
+            messages=_single_call_messages(message, local_info, places),
+            temperature=0.7,
+            max_tokens=3300,
+            on_token=_multi_city_header_watch()
+        )
+    except DeadlineExceeded as e:
+        print(f"Single-call itinerary too slow ({e}), returning basic itinerary")
+        return _result(local_info, places, _basic_itinerary(local_info, places), "deadline", "fallback")
+    except Exception as e:
+        print(f"Single-call itinerary failed: {e}, falling back to basic generation")
+        return _result(local_info, places, _basic_itinerary(local_info, places), "basic", "fallback")
+
+    header, itinerary = _split_header(text)
+    if header is None:
+        print("Single-call reply had no spec header, keeping the local parse")
+        destination_info = local_info
+        parse_source = "fallback"
+    else:
+        destination_info = clean_parsed_request(header, message)
+        parse_source = "gpt"
+        # Later pipeline requests with the same text can skip their parse call
+        get_cache().set('parse', ' '.join(message.lower().split()), destination_info)
+        if destination_info.get('cities'):
+            print("GPT found a multi-city trip, leaving it to the pipeline")
+            return None
+
+    corrected = _spec_differences(local_info, destination_info)
+    if corrected:
+        print(f"Single-call spec differs from the local parse: {corrected}")
+
+    if 'destination' in corrected:
+        # Correction path: the places and itinerary were for the wrong destination
+        places = _search_places(destination_info)
+        itinerary, source = generate_itinerary_with_source(
+            destination=destination_info['destination'],
+            duration=destination_info['duration'],
+            places=places,
+            interests=destination_info['interests'],
+            travel_style=destination_info['travel_style']
+        )
+        return _result(destination_info, places, itinerary, source, parse_source, corrected)
+
+    if len(itinerary) < 500:
+        itinerary = _enhance_short_itinerary(itinerary, destination_info['destination'], destination_info['duration'],
+                                             places, destination_info['interests'])
+    return _result(destination_info, places, itinerary, "gpt", parse_source, corrected)
+
+def _single_call_messages(message: str, local_info: Dict[str, Any], places: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    quick_parse = {key: local_info[key] for key in ('destination', 'duration', 'interests', 'travel_style')}
+    user_prompt = f"""
+**Travel Request:**
+{message}
+
+**Quick Parse:** {json.dumps(quick_parse, ensure_ascii=False)}
+
+**Available Places and Attractions** (found for {local_info['destination']}):
+{_format_places_for_prompt(places)}
+
+**Feasible Schedule** (fits opening hours and travel times between places):
+{_format_schedule_for_prompt(places, local_info['duration'], local_info['travel_style'])}
+"""
+    return [
+        {"role": "system", "content": SINGLE_CALL_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _multi_city_header_watch() -> Callable[[str], bool]:
+    """
+    on_token callback for the single call: True (stop the stream) once the header
+    line has arrived and lists several cities
+    """
+    received: List[str] = []
+    done = False
+    
+    def on_token(token: str) -> bool:
+        nonlocal done
+        if done:
+            return False
+        received.append(token)
+        match = _HEADER_PATTERN.match("".join(received))
+        if match is None:
+            # No header within the first few hundred tokens: there is none to watch for
+            done = len(received) > 400
+            return False
+        done = True
+        header, _ = _split_header(match.group(0))
+        cities = header.get('cities') if header else None
+        return isinstance(cities, list) and len(cities) > 1
+    
+    return on_token
+
+def _split_header(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Separate the leading JSON spec line from the Markdown itinerary
+    """
+    match = _HEADER_PATTERN.match(text)
+    if not match:
+        return None, text.strip()
+    try:
+        header = json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None, text.strip()
+    if not isinstance(header, dict):
+        return None, text.strip()
+    return header, text[match.end():].strip()
+
+def _spec_differences(local_info: Dict[str, Any], llm_info: Dict[str, Any]) -> List[str]:
+    """
+    Fields where GPT's reading differs from the local parse
+    """
+    differences = []
+    # "Rome" and "Rome, Italy" are the same place
+    if _place_name(local_info['destination']) != _place_name(llm_info['destination']):
+        differences.append('destination')
+    if local_info['duration'] != llm_info['duration']:
+        differences.append('duration')
+    if set(local_info['interests']) != set(llm_info['interests']):
+        differences.append('interests')
+    if local_info['travel_style'] != llm_info['travel_style']:
+        differences.append('travel_style')
+    return differences
+
+def _place_name(destination: str) -> str:
+    return destination.split(',')[0].strip().lower()
+
+def _search_places(destination_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    try:
+        return get_place_recommendations(
+            location=destination_info['destination'],
+            interests=destination_info.get('interests', ['general']),
+            max_places=15
+        )
+    except Exception as e:
+        print(f"Error searching places: {e}")
+        return []
+
+def _basic_itinerary(destination_info: Dict[str, Any], places: List[Dict[str, Any]]) -> str:
+    return _generate_basic_itinerary(destination_info['destination'], destination_info['duration'], places,
+                                     destination_info['interests'], destination_info['travel_style'])
+
+def _result(destination_info: Dict[str, Any], places: List[Dict[str, Any]], itinerary: str, source: str,
+            parse_source: str, corrected: Optional[List[str]] = None) -> Dict[str, Any]:
+    return {
+        "destination_info": destination_info,
+        "places": places,
+        "itinerary": itinerary,
+        "itinerary_source": source,
+        "parse_source": parse_source,
+        "corrected": corrected or []
+    }
@@ -0,0 +1,144 @@
+"""
+Tips Agent - Provides destination-specific travel tips from the precomputed tips store
+"""
+
+from typing import List, Dict, Optional
+import json
+
+from services.tips_store import tips_store
+from services.llm_client import chat_completion, llm_available
+
+# Generic tips used when a destination has no stored tips for a category
+GENERIC_TIPS = {
+    'general': [
+        "Download offline maps before you go",
+        "Learn basic local phrases",
+        "Keep digital and physical copies of important documents",
+        "Research local customs and etiquette",
+        "Check visa requirements and vaccination needs"
+    ],
+    'apps': [
+        "Google Translate for language help",
+        "Google Maps for navigation",
+        "Local transport apps",
+        "Currency converter",
+        "Weather forecast app"
+    ],
+    'transportation': [
+        "Check whether a multi-day public transport pass is cheaper than single tickets",
+        "Use official taxis or ride-hailing apps",
+        "Keep some small change for buses and trams"
+    ],
+    'culture': [
+        "Research local customs and etiquette",
+        "Dress modestly when visiting religious sites",
+        "Check local tipping customs"
+    ],
+    'safety': [
+        "Keep valuables out of sight in crowded areas",
+        "Save local emergency numbers in your phone",
+        "Get travel insurance before you go"
+    ],
+    'food': ["Try street food, visit local markets, book food tours"],
+    'history': ["Consider guided tours, audio guides, museum passes"],
+    'nature': ["Bring appropriate gear, check weather, book eco-tours"],
+    'art': ["Check museum schedules, book special exhibitions in advance"],
+    'adventure': ["Book activities in advance, check safety requirements"],
+    'relaxation': ["Book spa treatments early, find quiet spots"]
+}
+
+DEFAULT_TIP_CATEGORIES = ['general', 'transportation', 'culture', 'safety']
+
+def get_travel_tips(destination: str, tip_categories: Optional[List[str]] = None, 
+                    allow_generate: bool = True) -> Dict[str, List[str]]:
+    """
+    Get travel tips for a destination, grouped by category.
+    Served from the tips store; misses go to GPT once and are written back.
+    With allow_generate=False only stored and generic tips are used (no network).
+    """
+    
+    categories = [category.strip().lower() for category in (tip_categories or DEFAULT_TIP_CATEGORIES)]
+    
+    tips = {}
+    missing = []
+    for category in categories:
+        stored = tips_store.get(destination, category)
+        if stored is not None:
+            tips[category] = stored
+        else:
+            missing.append(category)
+    
+    if missing and allow_generate and llm_available():
+        try:
+            generated = _gpt_generate_tips(destination, missing)
+            tips_store.set_many(destination, generated)
+            tips.update(generated)
+        except Exception as e:
+            print(f"GPT tips generation failed for {destination}: {e}, using generic tips")
+    
+    for category in missing:
+        if category not in tips:
+            tips[category] = GENERIC_TIPS.get(category, GENERIC_TIPS['general'])
+    
+    return {category: tips[category] for category in categories}
+
+def build_tips_store(destinations: List[str], tip_categories: Optional[List[str]] = None, 
+                     overwrite: bool = False) -> int:
+    """
+    Fill the tips store offline for many destinations.
+    Returns the number of destinations that were generated.
+    """
+    
+    categories = tip_categories or DEFAULT_TIP_CATEGORIES + [
+        category for category in GENERIC_TIPS if category not in DEFAULT_TIP_CATEGORIES + ['apps']
+    ]
+    
+    generated_count = 0
+    for destination in destinations:
+        if overwrite:
+            missing = list(categories)
+        else:
+            missing = [category for category in categories if tips_store.get(destination, category) is None]
+        if not missing:
+            continue
+        
+        try:
+            generated = _gpt_generate_tips(destination, missing)
+        except Exception as e:
+            print(f"Error generating tips for {destination}: {e}")
+            continue
+        
+        tips_store.set_many(destination, generated, save=False)
+        generated_count += 1
+        print(f"Generated {len(generated)} tip categories for {destination}")
+    
+    tips_store.save()
+    return generated_count
+
+def _gpt_generate_tips(destination: str, categories: List[str]) -> Dict[str, List[str]]:
+    """
+    Ask GPT for tips in several categories with a single call
+    """
+    
+    system_prompt = """
+    You are an expert local travel guide. Return ONLY a valid JSON object mapping each requested
+    category to an array of 3-5 short, specific, practical tips for the destination.
+    """
+    
+    response = chat_completion(
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Destination: {destination}\nCategories: {', '.join(categories)}"}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.3,
+        max_tokens=150 * len(categories)
+    )
+    
+    data = json.loads(response.choices[0].message.content)
+    
+    return {
+        category: [str(tip) for tip in data[category]]
+        for category in categories
+        if isinstance(data.get(category), list) and data[category]
+    }
@@ -0,0 +1,117 @@
+"""
+Serialization benchmark - size and speed of the cache format vs the previous JSON
+format, and the uncompressed size of the columnar form.
+
+Payloads are built from the mock Places data: a place list per destination and
+a full /plan-trip response for each.
+
+Usage (from Travel-Planer-Backend):
+    python -m benchmarks.bench_serialization --iterations 2000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agents.google_places_agent import get_place_recommendations
+from agents.itinerary_agent import generate_itinerary_with_source
+from services import serialization
+
+DESTINATIONS = ["Rome, Italy", "Paris, France", "Tokyo, Japan", "Barcelona, Spain"]
+
+def json_encode(value):
+    """
+    The previous cache format: compact JSON, zlib above 1 KB
+    """
+    data = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+    return b"z" + zlib.compress(data, 6) if len(data) > 1024 else b"j" + data
+
+def json_decode(data):
+    payload = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+    return json.loads(payload)
+
+def json_size(value):
+    return len(json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode("utf-8"))
+
+def columnar_size(value):
+    if serialization.msgpack is not None:
+        return len(serialization.msgpack.packb(serialization.to_wire(value), use_bin_type=True))
+    return json_size(serialization.to_wire(value, binary=False))
+
+def build_payloads():
+    payloads = {"places": [], "response": []}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for destination in DESTINATIONS:
+            interests = ["history", "food", "art"]
+            places = get_place_recommendations(destination, interests, max_places=15)
+            itinerary, source = generate_itinerary_with_source(destination, 5, places, interests, "moderate")
+            payloads["places"].append(places)
+            payloads["response"].append({
+                "itinerary": itinerary,
+                "places": places,
+                "status": "success",
+                "destination_info": {"destination": destination, "duration": 5, "interests": interests,
+                                     "travel_style": "moderate", "special_requirements": []},
+                "structured_itinerary": None,
+                "trip_id": None,
+                "upgrade_status": None,
+                "itinerary_source": source
+            })
+    return payloads
+
+def measure(values, encode, decode, iterations, raw_size):
+    encoded = [encode(value) for value in values]
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for value in values:
+            encode(value)
+    encode_us = (time.perf_counter() - start) / (iterations * len(values)) * 1e6
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for data in encoded:
+            decode(data)
+    decode_us = (time.perf_counter() - start) / (iterations * len(values)) * 1e6
+    
+    return {
+        "avg_bytes": sum(len(data) for data in encoded) / len(encoded),
+        "avg_uncompressed_bytes": sum(raw_size(value) for value in values) / len(values),
+        "encode_us": round(encode_us, 1),
+        "decode_us": round(decode_us, 1)
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the cache format with the previous JSON format")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    
+    payloads = build_payloads()
+    report = {"msgpack": serialization.msgpack is not None}
+    for name, values in payloads.items():
+        # Cached values must round-trip exactly
+        for value in values:
+            decoded = serialization.decode(serialization.encode(value))
+            assert decoded == value, f"{name} did not round-trip"
+        
+        baseline = measure(values, json_encode, json_decode, args.iterations, json_size)
+        cache = measure(values, serialization.encode, serialization.decode, args.iterations, json_size)
+        report[name] = {
+            "json": baseline,
+            "cache": cache,
+            "size_ratio": round(cache["avg_bytes"] / baseline["avg_bytes"], 3),
+            "columnar_uncompressed_bytes": sum(columnar_size(value) for value in values) / len(values)
+        }
+    
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Startup benchmark - measures cold import time of main.py and application startup.
+
+Each run uses a fresh interpreter so nothing is cached between runs.
+
+Usage (from Travel-Planer-Backend):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --max-import-ms 500   # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in a child interpreter and prints timings as JSON
+CHILD_SCRIPT = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def _startup():
+    async with main.lifespan(main.app):
+        pass
+
+asyncio.run(_startup())
+started = time.perf_counter()
+heavy = [name for name in ("openai", "dotenv", "requests") if name in sys.modules]
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "heavy_modules": heavy
+}))
+"""
+
+def child_env(data_dir: str) -> dict:
+    """
+    Environment for a child run: the stores startup opens live in data_dir, not the source tree
+    """
+    return {
+        **os.environ,
+        "JOB_QUEUE_PATH": os.path.join(data_dir, "jobs.sqlite3"),
+        "TRIP_SESSION_PATH": os.path.join(data_dir, "trip_sessions.sqlite3"),
+        "CACHE_SQLITE_PATH": os.path.join(data_dir, "cache.sqlite3"),
+        "PROFILING_DIR": os.path.join(data_dir, "profiles")
+    }
+
+def run_once() -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as data_dir:
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT],
+            cwd=BACKEND_DIR,
+            env=child_env(data_dir),
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(limit: int = 10) -> list:
+    """
+    Use -X importtime to find the modules with the largest cumulative import time
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as data_dir:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=BACKEND_DIR,
+            env=child_env(data_dir),
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": us / 1000} for us, name in rows[:limit]]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold import and startup of the API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, help="Fail if median import time exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest imports")
+    args = parser.parse_args()
+    
+    runs = [run_once() for _ in range(args.runs)]
+    import_ms = [run["import_ms"] for run in runs]
+    startup_ms = [run["startup_ms"] for run in runs]
+    
+    report = {
+        "runs": args.runs,
+        "import_ms_median": statistics.median(import_ms),
+        "import_ms_min": min(import_ms),
+        "startup_ms_median": statistics.median(startup_ms),
+        "heavy_modules_after_startup": runs[-1]["heavy_modules"],
+        "slowest_imports": slowest_imports(args.top)
+    }
+    print(json.dumps(report, indent=2))
+    
+    if args.max_import_ms is not None and report["import_ms_median"] > args.max_import_ms:
+        print(f"Import time regression: {report['import_ms_median']:.1f}ms > {args.max_import_ms}ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    os.environ.setdefault("PYTHONDONTWRITEBYTECODE", "1")
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Load test - open-loop traffic against /plan-trip with a realistic request mix.
+
+Requests arrive on a Poisson schedule at the offered rate whether or not earlier
+ones have finished (open loop), so queueing shows up as latency and errors instead
+of silently lowering the load. The rate steps up through --rates; each step reports
+goodput and latency percentiles, and the first step that can't keep up is the
+saturation point.
+
+The traffic mix (all configurable):
+- popular vs long-tail destinations (the top ranked cities vs the rest of the known ones)
+- short (2-7 day) vs 30-day trips
+- repeats from a hot set of messages vs unique messages (response cache hits vs misses)
+- /plan-trip vs /plan-trip/stream
+
+By default the app runs in this process with local stand-ins for the LLM and the
+Places API: they answer like the providers (parse JSON, streamed Markdown, place
+lists) after a configurable latency, so results don't depend on provider quotas
+or cost. The app's own limits apply as configured (OPENAI_REQUESTS_PER_SECOND,
+PLAN_TRIP_MAX_CONCURRENT, CACHE_BACKEND, ...). Use --url to load a running server
+instead.
+
+Usage (from Travel-Planer-Backend):
+    python -m benchmarks.load_test --rates 2 4 8 16 --step-seconds 20
+    OPENAI_REQUESTS_PER_SECOND=50 python -m benchmarks.load_test --repeat-share 0.2 --json before.json
+    python -m benchmarks.load_test --url http://localhost:8001 --rates 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+INTEREST_PHRASES = ["history", "food", "art", "nature", "nightlife", "shopping", "museums and history",
+                    "food and wine", "beaches and relaxation", "hiking and adventure", "technology"]
+STYLE_PHRASES = ["", "budget ", "relaxing ", "luxury ", "packed "]
+TEMPLATES = [
+    "I want a {days}-day trip to {place} with {interests}",
+    "Plan {days} days in {place} for {interests}",
+    "{days} days in {place}, we love {interests}",
+    "Planning a {style}{days}-day holiday in {place} focused on {interests}",
+]
+LONG_TRIP_DAYS = 30
+
+class TrafficMix:
+    """
+    Generates request bodies for the configured mix; seeded so runs are comparable
+    """
+
+    def __init__(self, popular_share: float, long_trip_share: float, repeat_share: float,
+                 stream_share: float, mode: str, hot_set: int, seed: int):
+        from agents.destination_agent import DESTINATION_MAPPING
+        from services.cache_warmer import rank_destinations
+
+        self.random = random.Random(seed)
+        self.popular_share = popular_share
+        self.long_trip_share = long_trip_share
+        self.repeat_share = repeat_share
+        self.stream_share = stream_share
+        self.mode = mode
+
+        popular = set(rank_destinations(10))
+        # Phrases as users type them ("rome", "new york"), split by destination popularity
+        self.popular_places = [phrase.title() for phrase, name in DESTINATION_MAPPING.items() if name in popular]
+        self.long_tail_places = [phrase.title() for phrase, name in DESTINATION_MAPPING.items() if name not in popular]
+        self.unique_count = 0
+        self.hot_messages = [self._message() for _ in range(hot_set)]
+
+    def _message(self) -> str:
+        places = self.popular_places if self.random.random() < self.popular_share else self.long_tail_places
+        days = LONG_TRIP_DAYS if self.random.random() < self.long_trip_share else self.random.randint(2, 7)
+        return self.random.choice(TEMPLATES).format(
+            days=days,
+            place=self.random.choice(places),
+            interests=self.random.choice(INTEREST_PHRASES),
+            style=self.random.choice(STYLE_PHRASES)
+        )
+
+    def next_request(self) -> Dict[str, Any]:
+        if self.random.random() < self.repeat_share:
+            message, kind = self.random.choice(self.hot_messages), "repeat"
+        else:
+            # A reference number makes the text unique, like a real one-off request
+            self.unique_count += 1
+            message, kind = f"{self._message()}. Booking reference {self.unique_count}.", "unique"
+        stream = self.random.random() < self.stream_share
+        return {
+            "path": "/plan-trip/stream" if stream else "/plan-trip",
+            "body": {"message": message, "mode": self.mode},
+            "kind": kind
+        }
+
+def install_stand_ins(llm_first_token: float, llm_tokens_per_second: float, places_latency: float) -> None:
+    """
+    Replace the OpenAI client and the mock Places search with latency-shaped local stand-ins
+    """
+    from agents import google_places_agent
+    from agents.destination_agent import _fallback_parse
+    from services import llm_client
+
+    def fake_openai_create(stream: bool = False, messages: Optional[List[Dict[str, str]]] = None, **kwargs):
+        messages = messages or []
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+        usage = types.SimpleNamespace(prompt_tokens=len(system + user) // 4, completion_tokens=0,
+                                      prompt_tokens_details=types.SimpleNamespace(cached_tokens=len(system) // 4))
+
+        if not stream:
+            # The parse call: answer with what the local parser reads
+            time.sleep(llm_first_token + 60 / llm_tokens_per_second)
+            text = user.split("Parse this travel request:", 1)[-1].strip()
+            content = json.dumps(_fallback_parse(text))
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+                                         usage=usage)
+
+        days = 3
+        for line in user.splitlines():
+            if line.startswith("- Duration:") or line.startswith("**Quick Parse:**"):
+                digits = "".join(ch if ch.isdigit() else " " for ch in line).split()
+                days = int(digits[0]) if digits else days
+        header = ""
+        if "First line: the trip you read" in system:
+            quick_parse = user.split("**Quick Parse:**", 1)[-1].split("\n", 1)[0]
+            header = quick_parse.strip() + "\n\n"
+        # ~150 tokens per day, capped like max_tokens
+        tokens = min(150 * days, kwargs.get("max_tokens") or 3000)
+        words = [header + "# Itinerary\n"] + [f"Day {i // 150 + 1} activity {i} " for i in range(tokens)]
+
+        def chunks():
+            time.sleep(llm_first_token)
+            for index in range(0, len(words), 20):
+                time.sleep(20 / llm_tokens_per_second)
+                delta = types.SimpleNamespace(content="".join(words[index:index + 20]))
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+            yield types.SimpleNamespace(choices=[], usage=usage)
+        return chunks()
+
+    openai = llm_client.get_openai()
+    openai.chat.completions.create = fake_openai_create
+
+    mock_places = google_places_agent.GooglePlacesService._get_mock_places
+    def slow_mock_places(self, location, place_type):
+        time.sleep(places_latency)
+        return mock_places(self, location, place_type)
+    google_places_agent.GooglePlacesService._get_mock_places = slow_mock_places
+
+def start_local_server() -> str:
+    """
+    Run the app with uvicorn in a background thread; returns its base URL
+    """
+    import uvicorn
+    import main
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="load-test-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+def _ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+async def send_request(client, base_url: str, request: Dict[str, Any], step: int, started: float,
+                       results: List[Dict[str, Any]]) -> None:
+    sent_at = time.perf_counter()
+    result = {"step": step, "sent": sent_at - started, "kind": request["kind"], "path": request["path"]}
+    try:
+        async with client.stream("POST", base_url + request["path"], json=request["body"]) as response:
+            first_byte = None
+            async for _ in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - sent_at
+            result["status"] = response.status_code
+            result["ttfb"] = first_byte
+    except Exception as e:
+        result["status"] = type(e).__name__
+    result["latency"] = time.perf_counter() - sent_at
+    result["finished"] = time.perf_counter() - started
+    results.append(result)
+
+def summarize(results: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    ok = [result for result in results if result["status"] == 200]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result["status"] != 200:
+            errors[str(result["status"])] = errors.get(str(result["status"]), 0) + 1
+    latencies = [result["latency"] for result in ok]
+    streamed = [result["ttfb"] for result in ok if result["path"].endswith("/stream") and result.get("ttfb") is not None]
+    return {
+        "sent": len(results),
+        "ok": len(ok),
+        "errors": errors,
+        "goodput": round(len(ok) / duration, 2) if duration else 0.0,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p90_ms": _ms(percentile(latencies, 90)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "stream_ttfb_p50_ms": _ms(percentile(streamed, 50)),
+        "repeat_p50_ms": _ms(percentile([r["latency"] for r in ok if r["kind"] == "repeat"], 50)),
+        "unique_p50_ms": _ms(percentile([r["latency"] for r in ok if r["kind"] == "unique"], 50))
+    }
+
+async def report_windows(results: List[Dict[str, Any]], started: float, window: float, stop: asyncio.Event) -> None:
+    """
+    Print goodput and latency of the requests that finished in each window
+    """
+    reported = 0
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=window)
+        except asyncio.TimeoutError:
+            pass
+        now = time.perf_counter() - started
+        finished = results[reported:]
+        reported = len(results)
+        latencies = [result["latency"] for result in finished if result["status"] == 200]
+        errors = sum(1 for result in finished if result["status"] != 200)
+        print(f"  t={now:6.1f}s  done={len(finished):4d}  ok/s={len(latencies) / window:6.2f}  "
+              f"p50={_ms(percentile(latencies, 50)):>6}ms  p99={_ms(percentile(latencies, 99)):>6}ms  errors={errors}")
+
+async def run_load(base_url: str, mix: TrafficMix, rates: List[float], step_seconds: float,
+                   timeout: float, window: float, seed: int) -> List[Dict[str, Any]]:
+    import httpx
+
+    arrivals = random.Random(seed + 1)
+    results: List[Dict[str, Any]] = []
+    tasks = set()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        stop = asyncio.Event()
+        reporter = asyncio.create_task(report_windows(results, started, window, stop))
+
+        for step, rate in enumerate(rates):
+            print(f"Step {step + 1}/{len(rates)}: {rate} requests/s for {step_seconds}s")
+            step_end = time.perf_counter() + step_seconds
+            next_arrival = time.perf_counter()
+            while True:
+                next_arrival += arrivals.expovariate(rate)
+                if next_arrival >= step_end:
+                    break
+                await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+                task = asyncio.create_task(send_request(client, base_url, mix.next_request(), step, started, results))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(max(0.0, step_end - time.perf_counter()))
+
+        print(f"Waiting for {len(tasks)} requests still in flight...")
+        if tasks:
+            await asyncio.gather(*tasks)
+        stop.set()
+        await reporter
+    return results
+
+def find_saturation(steps: List[Dict[str, Any]], slo_ms: float) -> Optional[Dict[str, Any]]:
+    """
+    First step that can't keep up: goodput under 90% of the offered rate,
+    p99 over the SLO, or more than 1% errors
+    """
+    for step in steps:
+        summary = step["summary"]
+        p99 = float(summary["p99_ms"]) if summary["p99_ms"] != "-" else float("inf")
+        error_rate = (summary["sent"] - summary["ok"]) / summary["sent"] if summary["sent"] else 0.0
+        if summary["goodput"] < 0.9 * step["rate"] or p99 > slo_ms or error_rate > 0.01:
+            return step
+    return None
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load test for /plan-trip")
+    parser.add_argument("--url", help="Base URL of a running server (default: run the app in-process with stand-ins)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8], help="Offered requests/s per step")
+    parser.add_argument("--step-seconds", type=float, default=20, help="Duration of each step")
+    parser.add_argument("--window", type=float, default=5, help="Reporting window in seconds")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request")
+    parser.add_argument("--slo-ms", type=float, default=10000, help="p99 latency above which a step counts as saturated")
+    parser.add_argument("--popular-share", type=float, default=0.8, help="Share of requests for popular destinations")
+    parser.add_argument("--long-trip-share", type=float, default=0.1, help="Share of 30-day trips")
+    parser.add_argument("--repeat-share", type=float, default=0.5, help="Share of requests repeating a hot-set message")
+    parser.add_argument("--stream-share", type=float, default=0.0, help="Share of requests to /plan-trip/stream")
+    parser.add_argument("--hot-set", type=int, default=50, help="Number of distinct repeated messages")
+    parser.add_argument("--mode", default="pipeline", help="TravelRequest.mode to send")
+    parser.add_argument("--llm-first-token", type=float, default=0.8, help="Stand-in LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80, help="Stand-in LLM output speed")
+    parser.add_argument("--places-latency", type=float, default=0.15, help="Stand-in Places latency per search (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the per-step results to this file")
+    args = parser.parse_args()
+
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        # The stand-in LLM needs the app to think a key is configured; jobs aren't part of the test
+        os.environ["OPENAI_API_KEY"] = "stand-in"
+        os.environ.setdefault("JOB_WORKERS", "0")
+        install_stand_ins(args.llm_first_token, args.llm_tokens_per_second, args.places_latency)
+        base_url = start_local_server()
+
+        from config import get_settings
+        settings = get_settings()
+        print(f"In-process app at {base_url}: LLM {settings.openai_requests_per_second}/s, "
+              f"admission {settings.plan_trip_max_concurrent} concurrent + {settings.plan_trip_max_queue} queued, "
+              f"cache {settings.cache_backend}")
+
+    mix = TrafficMix(args.popular_share, args.long_trip_share, args.repeat_share, args.stream_share,
+                     args.mode, args.hot_set, args.seed)
+    results = asyncio.run(run_load(base_url, mix, args.rates, args.step_seconds, args.timeout, args.window, args.seed))
+
+    steps = []
+    for step, rate in enumerate(args.rates):
+        step_results = [result for result in results if result["step"] == step]
+        steps.append({"rate": rate, "summary": summarize(step_results, args.step_seconds)})
+
+    print(f"\n{'rate':>6} {'sent':>6} {'ok':>6} {'goodput':>8} {'p50ms':>7} {'p90ms':>7} {'p99ms':>7} "
+          f"{'repeat':>7} {'unique':>7} {'ttfb':>6}  errors")
+    for step in steps:
+        summary = step["summary"]
+        print(f"{step['rate']:>6} {summary['sent']:>6} {summary['ok']:>6} {summary['goodput']:>8} {summary['p50_ms']:>7} "
+              f"{summary['p90_ms']:>7} {summary['p99_ms']:>7} {summary['repeat_p50_ms']:>7} {summary['unique_p50_ms']:>7} "
+              f"{summary['stream_ttfb_p50_ms']:>6}  {summary['errors'] or '-'}")
+
+    saturated = find_saturation(steps, args.slo_ms)
+    if saturated is None:
+        print(f"\nNot saturated up to {args.rates[-1]} requests/s")
+    else:
+        index = steps.index(saturated)
+        sustained = steps[index - 1]["rate"] if index else None
+        print(f"\nSaturated at {saturated['rate']} requests/s"
+              + (f" (last sustained rate: {sustained} requests/s)" if sustained else " (already at the first step)"))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "steps": steps,
+                       "saturation_rate": saturated["rate"] if saturated else None}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Application settings - all environment configuration is read here, once
+"""
+
+import os
+from functools import lru_cache
+from typing import Optional
+
+class Settings:
+    """
+    Configuration loaded from environment variables (and .env if python-dotenv is installed)
+    """
+    
+    def __init__(self):
+        self.openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY") or None
+        self.openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.google_places_api_key: Optional[str] = os.getenv("GOOGLE_PLACES_API_KEY") or None
+        
+        self.travel_tips_path: Optional[str] = os.getenv("TRAVEL_TIPS_PATH") or None
+        self.trip_session_ttl_seconds: int = int(os.getenv("TRIP_SESSION_TTL_SECONDS", "3600"))
+        # Trip sessions are shared by the worker processes through this SQLite file
+        self.trip_session_path: str = os.getenv("TRIP_SESSION_PATH", "trip_sessions.sqlite3")
+        
+        # Provider quotas and /plan-trip admission control
+        self.openai_requests_per_second: float = float(os.getenv("OPENAI_REQUESTS_PER_SECOND", "3"))
+        self.places_requests_per_second: float = float(os.getenv("PLACES_REQUESTS_PER_SECOND", "10"))
+        self.rate_limit_wait_seconds: float = float(os.getenv("RATE_LIMIT_WAIT_SECONDS", "10"))
+        self.llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.plan_trip_max_concurrent: int = int(os.getenv("PLAN_TRIP_MAX_CONCURRENT", "8"))
+        self.plan_trip_max_queue: int = int(os.getenv("PLAN_TRIP_MAX_QUEUE", "32"))
+        self.plan_trip_queue_timeout: float = float(os.getenv("PLAN_TRIP_QUEUE_TIMEOUT", "30"))
+        
+        # Latency budget for /plan-trip and LLM hedging
+        self.plan_trip_slo_seconds: float = float(os.getenv("PLAN_TRIP_SLO_SECONDS", "30"))
+        self.llm_first_token_timeout: float = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "4"))
+        self.llm_hedge_enabled: bool = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        self.itinerary_upgrade_seconds: float = float(os.getenv("ITINERARY_UPGRADE_SECONDS", "120"))
+        
+        # Shared cache: "memory", "sqlite" or "redis"
+        self.cache_backend: str = os.getenv("CACHE_BACKEND", "memory").lower()
+        self.cache_prefix: str = os.getenv("CACHE_PREFIX", "travel:v1")
+        self.cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+        self.cache_sqlite_path: str = os.getenv("CACHE_SQLITE_PATH", "cache.sqlite3")
+        self.cache_redis_url: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        
+        # Cache warm-up for the most requested destinations
+        self.cache_warmup_on_startup: bool = os.getenv("CACHE_WARMUP_ON_STARTUP", "false").lower() == "true"
+        self.cache_warmup_destinations: int = int(os.getenv("CACHE_WARMUP_DESTINATIONS", "20"))
+        self.cache_warmup_rate: float = float(os.getenv("CACHE_WARMUP_RATE", "2"))
+        self.cache_warmup_itineraries: bool = os.getenv("CACHE_WARMUP_ITINERARIES", "false").lower() == "true"
+        self.cache_warmup_traffic_log: Optional[str] = os.getenv("CACHE_WARMUP_TRAFFIC_LOG") or None
+        
+        # Asynchronous trip jobs (POST /trips). The lease must outlast a job's time budget.
+        self.job_queue_path: str = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+        self.job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+        self.job_timeout_seconds: float = float(os.getenv("JOB_TIMEOUT_SECONDS", "300"))
+        self.job_max_queued: int = int(os.getenv("JOB_MAX_QUEUED", "1000"))
+        self.job_lease_seconds: float = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+        self.job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.job_retention_seconds: float = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+        
+        # Opt-in profiling (services/profiling.py); off unless a token is set
+        self.profiling_token: Optional[str] = os.getenv("PROFILING_TOKEN") or None
+        self.profiling_dir: str = os.getenv("PROFILING_DIR", "profiles")
+        self.profiling_interval_ms: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+        
+        # gzip/brotli for responses of at least this size (-1 turns compression off)
+        self.response_compression_min_bytes: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+        
+        self.host: str = os.getenv("HOST", "0.0.0.0")
+        self.port: int = int(os.getenv("PORT", "8001"))
+        
+        # Multi-process deployment (serve.py). Provider quotas are split between the workers.
+        self.workers: int = max(1, int(os.getenv("WORKERS", "1")))
+        self.graceful_shutdown_seconds: float = float(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Build the settings on first use. Loading .env happens here rather than at import time.
+    """
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    return Settings()
@@ -1,20 +1,83 @@
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from pydantic import BaseModel
-import openai
-import json
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 import os
+import time
 import traceback
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-# Import our agents and functions
-from agents.functions import travel_functions
-from agents.destination_agent import parse_destination_request
-from agents.google_places_agent import search_places, get_place_recommendations
-from agents.itinerary_agent import generate_itinerary
+# Import our agents (the orchestrator is imported on first use)
+from agents.destination_agent import _fallback_parse, parse_destination_request, parse_destination_request_with_source
+from agents.google_places_agent import PlacesPrefetch, search_places, get_place_recommendations
+from agents.itinerary_agent import generate_itinerary, generate_itinerary_with_source, iter_basic_itinerary, generate_structured_itinerary, render_itinerary_markdown, regenerate_days
+from agents.multi_city_agent import PLACES_PER_CITY, generate_multi_city_itinerary, iter_multi_city_basic_itinerary, plan_multi_city_trip, search_city_places
+from config import get_settings
+from schemas.models import Itinerary
+from services.cache import get_cache, set_cache
+from services.cache_warmer import start_startup_warmup, warmup_status
+from services.compression import CompressionMiddleware
+from services.deadline import deadline_scope
+from services.job_queue import JobWorkerPool, QueueFull, get_job_queue
+from services.llm_client import get_openai, llm_available, llm_usage_stats
+from services.profiling import ProfilerBusy, ProfilingMiddleware, list_profiles, profile_path, profile_window, token_valid
+from services.rate_limiter import AdmissionController, Overloaded, rate_limiter_stats
+from services.response_payload import payload_response
+from services.trip_session_store import trip_sessions
+from services.tips_store import tips_store
 
-app = FastAPI(title="Travel Planner API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load precomputed data once so requests never pay for it
+    tips_store.load()
+    # Optional background cache warm-up; /ready reports when it is done
+    start_startup_warmup()
+    # Background workers for POST /trips jobs
+    job_workers = None
+    if get_settings().job_workers > 0:
+        job_workers = JobWorkerPool(get_job_queue(), _run_trip_job, workers=get_settings().job_workers)
+        job_workers.start()
+    yield
+    if job_workers is not None:
+        job_workers.stop()
+
+def preload() -> None:
+    """
+    Build shared, read-only state once. serve.py calls this in the parent process before
+    forking the workers, so they all share these pages copy-on-write.
+    (Importing this module already compiled the interest matcher and destination tables.)
+    """
+    tips_store.load()
+    # Modules that are otherwise imported on first use
+    import agents.orchestrator_agent  # noqa: F401
+    import agents.single_call_agent  # noqa: F401
+    if llm_available():
+        get_openai()
+
+def warmup_worker() -> None:
+    """
+    Per-worker setup after the fork: open this process's own cache connection and run
+    one basic plan so the first real request doesn't pay for cold code paths.
+    """
+    start = time.perf_counter()
+    # SQLite/Redis connections must never be shared between processes
+    set_cache(None)
+    get_cache()
+    places = get_place_recommendations("Rome, Italy", ["history", "food"], max_places=15)
+    "".join(iter_basic_itinerary("Rome, Italy", 3, places, ["history", "food"], "moderate"))
+    print(f"Worker {os.getpid()} warmed up in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+app = FastAPI(title="Travel Planner API", version="1.0.0", lifespan=lifespan)
+
+# Limits are read from settings on first request
+plan_trip_admission = AdmissionController()
+
+# Background upgrades of itineraries that fell back to the basic generator
+_upgrade_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="itinerary-upgrade")
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,34 +85,228 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# gzip/brotli above RESPONSE_COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+# Per-request profiles with X-Profile (only when PROFILING_TOKEN is set)
+app.add_middleware(ProfilingMiddleware)
 
 class TravelRequest(BaseModel):
     message: str
+    structured: bool = False  # also return the itinerary as an Itinerary model
+    mode: str = "pipeline"  # "pipeline", "orchestrated" (GPT drives the travel_functions tools) or "single_call" (parse and itinerary in one LLM call)
+    upgrade: bool = False  # if GPT is too slow, return the basic plan now and upgrade it in the background
 
 class TravelResponse(BaseModel):
     itinerary: str
     places: List[Dict[str, Any]]
     status: str
     destination_info: Dict[str, Any] = {}
+    structured_itinerary: Optional[Itinerary] = None
+    trip_id: Optional[str] = None
+    upgrade_status: Optional[str] = None  # "pending", "ready" or "failed" for background upgrades
+    itinerary_source: Optional[str] = None  # "gpt", "basic" or "deadline" (basic plan because GPT was too slow)
+    parse_source: Optional[str] = None  # "gpt" or "fallback" (the offline parser read the request)
+
+class RegenerateDaysRequest(BaseModel):
+    days: List[int]
+    instructions: Optional[str] = None  # e.g. "something outdoorsy"
 
 @app.post("/plan-trip", response_model=TravelResponse)
-async def plan_trip(request: TravelRequest):
+async def plan_trip(request: TravelRequest, fields: Optional[str] = None, slim: bool = False):
+    """
+    Main endpoint for planning a trip based on user's natural language input.
+    ?fields=itinerary,places.name returns only those keys, ?slim=true drops the places.
+    The plan carries an ETag for later GET /plan-trip/{trip_id} requests.
+    """
+    # Bounded admission: under overload reject early with a retry hint
+    # instead of letting every request pile up on the providers
+    try:
+        async with plan_trip_admission.admit():
+            response = await run_in_threadpool(_plan_trip, request)
+        return payload_response(response, fields, slim)
+    except Overloaded as e:
+        print(f"Rejecting /plan-trip request, server busy (retry after {e.retry_after}s)")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "The travel planner is busy right now. Please try again shortly.", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+@app.post("/plan-trip/stream")
+async def plan_trip_stream(request: TravelRequest):
+    """
+    Stream the basic itinerary as Markdown while it is rendered.
+    Parsing and the places search run first; then the header goes out immediately,
+    followed by one chunk per day - long trips never wait for the whole document.
+    """
+    try:
+        async with plan_trip_admission.admit():
+            destination_info, places = await run_in_threadpool(_parse_and_search, request.message)
+    except Overloaded as e:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "The travel planner is busy right now. Please try again shortly.", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    if not destination_info.get('destination') or destination_info['destination'] == 'Unknown':
+        raise HTTPException(status_code=400, detail="I couldn't identify a specific destination from your request. Please specify a city or country you'd like to visit.")
+    
+    if destination_info.get('cities'):
+        chunks = iter_multi_city_basic_itinerary(destination_info, places)
+    else:
+        chunks = iter_basic_itinerary(
+            destination=destination_info['destination'],
+            duration=destination_info.get('duration', 7),
+            places=places,
+            interests=destination_info.get('interests', ['general']),
+            travel_style=destination_info.get('travel_style', 'moderate')
+        )
+    return StreamingResponse(chunks, media_type="text/markdown; charset=utf-8")
+
+def _parse_and_search(message: str):
+    """
+    Steps 1 and 2 of the pipeline for the streaming endpoint
+    """
+    with deadline_scope(get_settings().plan_trip_slo_seconds):
+        prefetch = _start_places_prefetch(message)
+        destination_info = parse_destination_request(message)
+        places = []
+        if destination_info.get('destination') and destination_info['destination'] != 'Unknown':
+            try:
+                if destination_info.get('cities'):
+                    places = search_city_places(destination_info)
+                else:
+                    places = _recommended_places(destination_info, prefetch)
+            except Exception as e:
+                print(f"Error searching places: {e}")
+        return destination_info, places
+
+def _start_places_prefetch(message: str) -> Optional[PlacesPrefetch]:
+    """
+    While GPT parses the request, search places for the trip the local parser guesses.
+    Without GPT the local parse is the parse and there is nothing to overlap.
+    """
+    if not llm_available():
+        return None
+    guess = _fallback_parse(message)
+    if guess['destination'] == 'Unknown':
+        return None
+    if guess.get('cities'):
+        # Each stop is searched again after the parse and finds these in the places cache
+        for city in guess['cities']:
+            PlacesPrefetch(city['destination'], guess['interests'], max_places=PLACES_PER_CITY)
+        return None
+    return PlacesPrefetch(guess['destination'], guess['interests'], max_places=15)
+
+def _recommended_places(destination_info: Dict[str, Any], prefetch: Optional[PlacesPrefetch]) -> List[Dict[str, Any]]:
+    """
+    Places for the parsed trip: the prefetched ones when the guess was right
+    """
+    location = destination_info['destination']
+    interests = destination_info.get('interests', ['general'])
+    if prefetch is not None:
+        places = prefetch.result_for(location, interests, max_places=15)
+        if places is not None:
+            print("Using prefetched places")
+            return places
+    return get_place_recommendations(location=location, interests=interests, max_places=15)
+
+def _plan_trip(request: TravelRequest, deadline_seconds: Optional[float] = None,
+               on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> TravelResponse:
     """
-    Main endpoint for planning a trip based on user's natural language input
+    Run the parse -> places -> itinerary pipeline (blocking, runs in the threadpool)
+    under the request's latency deadline
+    """
+    with deadline_scope(deadline_seconds or get_settings().plan_trip_slo_seconds):
+        if request.structured:
+            # Structured trips get their own editable session
+            return _run_pipeline(request, on_progress)
+        
+        # Identical requests share one pipeline run; concurrent duplicates wait for it
+        cache_key = [request.mode, request.upgrade, ' '.join(request.message.lower().split())]
+        data = get_cache().get_or_compute(
+            'response', cache_key,
+            lambda: jsonable_encoder(_run_pipeline(request, on_progress)),
+            should_cache=_is_cacheable_response
+        )
+        return TravelResponse(**data)
+
+def _is_cacheable_response(data: Dict[str, Any]) -> bool:
     """
+    Only complete plans are cached - not errors, deadline fallbacks or trips with a session.
+    With an LLM configured, a basic itinerary or a fallback parse means a GPT call failed,
+    so those plans aren't cached either: the next request should get the real one.
+    """
+    if data.get('status') != "success" or data.get('trip_id') is not None:
+        return False
+    if data.get('itinerary_source') not in ("gpt", "basic"):
+        return False
+    return not llm_available() or (data.get('itinerary_source') == "gpt" and data.get('parse_source') != "fallback")
+
+def _run_pipeline(request: TravelRequest,
+                  on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> TravelResponse:
+    """
+    on_progress(stage, partial) is told when each stage starts, with the results so far
+    """
+    
+    def report(stage: str, **partial: Any) -> None:
+        if on_progress is not None:
+            on_progress(stage, jsonable_encoder(partial))
+    
     try:
         print(f"Received request: {request.message}")
         
-        # Step 1: Parse the destination request directly
+        if request.mode == "orchestrated" and llm_available():
+            print("Planning with the tool-calling orchestrator...")
+            try:
+                from agents.orchestrator_agent import run_orchestrated_plan
+                result = run_orchestrated_plan(request.message)
+                if result['status'] == "success":
+                    return TravelResponse(
+                        itinerary=result['itinerary'],
+                        places=result['places'],
+                        status="success",
+                        destination_info=result['destination_info'],
+                        itinerary_source=result['itinerary_source'],
+                        parse_source=result['parse_source']
+                    )
+                print("Orchestrator did not complete the plan, falling back to the pipeline")
+            except Exception as e:
+                print(f"Orchestrated planning failed: {e}, falling back to the pipeline")
+                traceback.print_exc()
+        
+        if request.mode == "single_call" and llm_available() and not request.structured:
+            print("Planning with a single LLM call...")
+            try:
+                from agents.single_call_agent import run_single_call_plan
+                result = run_single_call_plan(request.message)
+                if result is not None:
+                    trip_id, upgrade_status = _start_upgrade_if_needed(request, result['destination_info'], result['places'],
+                                                                       result['itinerary'], result['itinerary_source'])
+                    return TravelResponse(
+                        itinerary=result['itinerary'],
+                        places=result['places'],
+                        status="success",
+                        destination_info=result['destination_info'],
+                        trip_id=trip_id,
+                        upgrade_status=upgrade_status,
+                        itinerary_source=result['itinerary_source'],
+                        parse_source=result['parse_source']
+                    )
+                print("Not a single-destination trip, falling back to the pipeline")
+            except Exception as e:
+                print(f"Single-call planning failed: {e}, falling back to the pipeline")
+                traceback.print_exc()
+        
+        # Step 1: Parse the destination request directly; places for the locally
+        # guessed trip are searched meanwhile
         print("Step 1: Parsing destination request...")
+        prefetch = _start_places_prefetch(request.message)
         try:
-            destination_info = parse_destination_request(request.message)
+            destination_info, parse_source = parse_destination_request_with_source(request.message)
             print(f"Parsed destination info: {destination_info}")
         except Exception as e:
             print(f"Error parsing destination: {e}")
@@ -69,15 +326,15 @@ async def plan_trip(request: TravelRequest):
                 destination_info=destination_info
             )
         
+        if destination_info.get('cities'):
+            return _run_multi_city_pipeline(request, destination_info, parse_source, report)
+        
         # Step 2: Search for places
         print("Step 2: Searching for places...")
+        report("searching_places", destination_info=destination_info)
         try:
             if 'get_place_recommendations' in globals():
-                places = get_place_recommendations(
-                    location=destination_info['destination'],
-                    interests=destination_info.get('interests', ['general']),
-                    max_places=15
-                )
+                places = _recommended_places(destination_info, prefetch)
             else:
                 places = search_places(
                     location=destination_info['destination'],
@@ -92,14 +349,27 @@ async def plan_trip(request: TravelRequest):
         
         # Step 3: Generate itinerary
         print("Step 3: Generating itinerary...")
+        report("generating_itinerary", destination_info=destination_info, places=places)
+        structured_itinerary = None
+        itinerary_source = None
         try:
-            itinerary = generate_itinerary(
-                destination=destination_info['destination'],
-                duration=destination_info.get('duration', 7),
-                places=places,
-                interests=destination_info.get('interests', ['general']),
-                travel_style=destination_info.get('travel_style', 'moderate')
-            )
+            if request.structured:
+                structured_itinerary = generate_structured_itinerary(
+                    destination=destination_info['destination'],
+                    duration=destination_info.get('duration', 7),
+                    places=places,
+                    interests=destination_info.get('interests', ['general']),
+                    travel_style=destination_info.get('travel_style', 'moderate')
+                )
+                itinerary = render_itinerary_markdown(structured_itinerary)
+            else:
+                itinerary, itinerary_source = generate_itinerary_with_source(
+                    destination=destination_info['destination'],
+                    duration=destination_info.get('duration', 7),
+                    places=places,
+                    interests=destination_info.get('interests', ['general']),
+                    travel_style=destination_info.get('travel_style', 'moderate')
+                )
             
             # Ensure itinerary is a string
             if not isinstance(itinerary, str):
@@ -115,11 +385,24 @@ async def plan_trip(request: TravelRequest):
             itinerary += f"Interests: {', '.join(destination_info.get('interests', ['general']))}\n\n"
             itinerary += "I recommend researching popular attractions and creating a day-by-day plan based on your interests."
         
+        # Keep structured trips around so single days can be regenerated later
+        trip_id = None
+        upgrade_status = None
+        if structured_itinerary is not None:
+            trip_id = trip_sessions.create(destination_info, places, structured_itinerary)
+        else:
+            trip_id, upgrade_status = _start_upgrade_if_needed(request, destination_info, places, itinerary, itinerary_source)
+        
         return TravelResponse(
             itinerary=itinerary,
             places=places,
             status="success",
-            destination_info=destination_info
+            destination_info=destination_info,
+            structured_itinerary=structured_itinerary,
+            trip_id=trip_id,
+            upgrade_status=upgrade_status,
+            itinerary_source=itinerary_source,
+            parse_source=parse_source
         )
         
     except Exception as e:
@@ -134,13 +417,237 @@ async def plan_trip(request: TravelRequest):
             destination_info={}
         )
 
+def _run_multi_city_pipeline(request: TravelRequest, destination_info: Dict[str, Any], parse_source: str,
+                             report: Callable[..., None]) -> TravelResponse:
+    """
+    Steps 2 and 3 for a trip through several cities: the places search and itinerary
+    of every city run in parallel and are merged in travel order
+    """
+    print(f"Steps 2-3: Planning {len(destination_info['cities'])} cities in parallel...")
+    report("planning_cities", destination_info=destination_info)
+    result = plan_multi_city_trip(destination_info, structured=request.structured)
+    places = result['places']
+    print(f"Found {len(places)} places")
+    
+    structured_itinerary = result['structured_itinerary']
+    if structured_itinerary is not None:
+        itinerary = render_itinerary_markdown(structured_itinerary)
+        trip_id, upgrade_status = trip_sessions.create(destination_info, places, structured_itinerary), None
+    else:
+        itinerary = result['itinerary']
+        trip_id, upgrade_status = _start_upgrade_if_needed(request, destination_info, places, itinerary, result['itinerary_source'])
+    
+    print("Successfully generated travel plan!")
+    return TravelResponse(
+        itinerary=itinerary,
+        places=places,
+        status="success",
+        destination_info=destination_info,
+        structured_itinerary=structured_itinerary,
+        trip_id=trip_id,
+        upgrade_status=upgrade_status,
+        itinerary_source=result['itinerary_source'],
+        parse_source=parse_source
+    )
+
+@app.post("/trips", status_code=202)
+async def create_trip_job(request: TravelRequest):
+    """
+    Queue a trip for planning in the background and return its job id right away.
+    Poll GET /trips/{job_id} for the status, partial results and the final plan.
+    """
+    try:
+        job_id = await run_in_threadpool(get_job_queue().enqueue, jsonable_encoder(request), get_settings().job_max_queued)
+    except QueueFull as e:
+        print(f"Rejecting /trips request: {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "The travel planner is busy right now. Please try again shortly.", "retry_after": 30},
+            headers={"Retry-After": "30"}
+        )
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "poll": f"/trips/{job_id}"},
+        headers={"Location": f"/trips/{job_id}"}
+    )
+
+@app.get("/trips/{job_id}")
+async def get_trip_job(job_id: str):
+    """
+    Status of a queued trip: queued/running with the stage and partial results
+    (destination_info, then places), then done with the full TravelResponse or failed
+    """
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired. Please plan the trip again.")
+    if job['status'] in ("queued", "running"):
+        return JSONResponse(content=job, headers={"Retry-After": "2"})
+    return job
+
+def _run_trip_job(job: Dict[str, Any], report_progress: Callable[[str, Dict[str, Any]], None]) -> Dict[str, Any]:
+    """
+    Run a queued trip through the regular pipeline (called by the job workers).
+    Jobs get JOB_TIMEOUT_SECONDS instead of the interactive latency budget.
+    """
+    request = TravelRequest(**job['request'])
+    response = _plan_trip(request, deadline_seconds=get_settings().job_timeout_seconds, on_progress=report_progress)
+    return jsonable_encoder(response)
+
+def _start_upgrade_if_needed(request: TravelRequest, destination_info: Dict[str, Any], places: List[Dict[str, Any]],
+                             itinerary: str, itinerary_source: Optional[str]):
+    """
+    If GPT was too slow, the client gets the basic plan now and can poll for the GPT one.
+    Returns the (trip_id, upgrade_status) for the response.
+    """
+    if itinerary_source != "deadline" or not request.upgrade:
+        return None, None
+    upgrade_status = "pending"
+    trip_id = trip_sessions.create(destination_info, places, markdown=itinerary, upgrade_status=upgrade_status)
+    _upgrade_executor.submit(_upgrade_itinerary, trip_id)
+    return trip_id, upgrade_status
+
+def _upgrade_itinerary(trip_id: str) -> None:
+    """
+    Background follow-up: generate the GPT itinerary for a trip that got the basic one
+    """
+    session = trip_sessions.get(trip_id)
+    if session is None:
+        return
+    
+    destination_info = session['destination_info']
+    settings = get_settings()
+    # A generous budget; the user already has a usable plan
+    with deadline_scope(settings.itinerary_upgrade_seconds, first_token_timeout=settings.itinerary_upgrade_seconds):
+        if destination_info.get('cities'):
+            itinerary, source = generate_multi_city_itinerary(destination_info, session['places'])
+        else:
+            itinerary, source = generate_itinerary_with_source(
+                destination=destination_info['destination'],
+                duration=destination_info.get('duration', 7),
+                places=session['places'],
+                interests=destination_info.get('interests', ['general']),
+                travel_style=destination_info.get('travel_style', 'moderate')
+            )
+    
+    try:
+        if source == "gpt":
+            trip_sessions.update(trip_id, markdown=itinerary, upgrade_status="ready")
+            print(f"Upgraded itinerary for trip {trip_id}")
+        else:
+            trip_sessions.update(trip_id, upgrade_status="failed")
+    except KeyError:
+        pass  # session expired meanwhile
+
+@app.get("/plan-trip/{trip_id}", response_model=TravelResponse)
+async def get_trip(trip_id: str, fields: Optional[str] = None, slim: bool = False,
+                   if_none_match: Optional[str] = Header(None)):
+    """
+    Get the latest version of a planned trip (e.g. to pick up a background upgrade).
+    Pollers send If-None-Match and get 304 until the trip changes.
+    """
+    session = trip_sessions.get(trip_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Trip not found or expired. Please plan the trip again.")
+    
+    structured_itinerary = session['itinerary']
+    itinerary = session['markdown']
+    if itinerary is None and structured_itinerary is not None:
+        itinerary = render_itinerary_markdown(structured_itinerary)
+    
+    response = TravelResponse(
+        itinerary=itinerary or "",
+        places=session['places'],
+        status="success",
+        destination_info=session['destination_info'],
+        structured_itinerary=structured_itinerary,
+        trip_id=trip_id,
+        upgrade_status=session.get('upgrade_status')
+    )
+    return payload_response(response, fields, slim, if_none_match)
+
+@app.post("/plan-trip/{trip_id}/regenerate", response_model=TravelResponse)
+async def regenerate_trip_days(trip_id: str, request: RegenerateDaysRequest, fields: Optional[str] = None, slim: bool = False):
+    """
+    Regenerate only the requested days of a structured trip, reusing the
+    parsed request, places and the other days from the trip session
+    """
+    # Regenerating calls GPT, so it is admitted and budgeted like /plan-trip
+    try:
+        async with plan_trip_admission.admit():
+            response = await run_in_threadpool(_regenerate_trip_days, trip_id, request)
+        return payload_response(response, fields, slim)
+    except Overloaded as e:
+        print(f"Rejecting regenerate request, server busy (retry after {e.retry_after}s)")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "The travel planner is busy right now. Please try again shortly.", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def _regenerate_trip_days(trip_id: str, request: RegenerateDaysRequest) -> TravelResponse:
+    """
+    Blocking part of regenerate_trip_days (runs in the threadpool) under the request's latency deadline
+    """
+    session = trip_sessions.get(trip_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Trip not found or expired. Please plan the trip again.")
+    
+    itinerary = session['itinerary']
+    if itinerary is None:
+        raise HTTPException(status_code=400, detail="Only trips planned with structured=true can regenerate days")
+    invalid_days = [day for day in request.days if day < 1 or day > itinerary.duration]
+    if not request.days or invalid_days:
+        raise HTTPException(status_code=400, detail=f"Days must be between 1 and {itinerary.duration}")
+    
+    destination_info = session['destination_info']
+    print(f"Regenerating days {request.days} for trip {trip_id}")
+    
+    try:
+        with deadline_scope(get_settings().plan_trip_slo_seconds):
+            itinerary = regenerate_days(
+                itinerary=itinerary,
+                days=request.days,
+                places=session['places'],
+                interests=destination_info.get('interests', ['general']),
+                travel_style=destination_info.get('travel_style', 'moderate'),
+                instructions=request.instructions
+            )
+        # Only the requested days are written back, so concurrent edits of other days are kept
+        itinerary = trip_sessions.replace_days(trip_id, itinerary, request.days)
+    except Exception as e:
+        print(f"Error regenerating days: {e}")
+        traceback.print_exc()
+        return TravelResponse(
+            itinerary=f"I encountered an error while updating your itinerary: {str(e)}. Please try again.",
+            places=session['places'],
+            status="error",
+            destination_info=destination_info,
+            structured_itinerary=session['itinerary'],
+            trip_id=trip_id
+        )
+    
+    return TravelResponse(
+        itinerary=render_itinerary_markdown(itinerary),
+        places=session['places'],
+        status="success",
+        destination_info=destination_info,
+        structured_itinerary=itinerary,
+        trip_id=trip_id
+    )
+
 @app.get("/")
 async def root():
     return {
         "message": "Travel Planner API is running!",
         "endpoints": {
             "plan_trip": "POST /plan-trip - Plan a complete trip",
+            "get_trip": "GET /plan-trip/{trip_id} - Get the latest version of a planned trip",
+            "regenerate_days": "POST /plan-trip/{trip_id}/regenerate - Regenerate selected days of a structured trip",
+            "plan_trip_stream": "POST /plan-trip/stream - Stream the basic itinerary as Markdown",
+            "create_trip_job": "POST /trips - Queue a trip for background planning",
+            "get_trip_job": "GET /trips/{job_id} - Poll a queued trip",
             "health": "GET /health - Check API health",
+            "ready": "GET /ready - Readiness (waits for the cache warm-up)",
             "test": "GET /test - Test the API components"
         }
     }
@@ -149,10 +656,63 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "openai_api": "configured" if openai.api_key else "not configured",
+        "openai_api": "configured" if llm_available() else "not configured",
+        "admission": plan_trip_admission.stats(),
+        "rate_limits": rate_limiter_stats(),
+        "cache": get_cache().stats(),
+        "cache_warmup": warmup_status(),
+        "trip_jobs": get_job_queue().stats(),
+        "llm_usage": llm_usage_stats(),
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness for load balancers: 503 until the startup cache warm-up has finished
+    """
+    status = warmup_status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up", "cache_warmup": status})
+    return {"status": "ready", "cache_warmup": status}
+
+def _require_profiling_token(token: Optional[str]) -> None:
+    if not token_valid(token):
+        # Same answer whether profiling is off or the token is wrong
+        raise HTTPException(status_code=404, detail="Not found")
+
+@app.post("/admin/profile")
+async def start_profile(kind: str = "cpu", seconds: float = 30, x_profile_token: Optional[str] = Header(None)):
+    """
+    Profile the whole process for the next few seconds (kind: cpu or memory)
+    """
+    _require_profiling_token(x_profile_token)
+    if not 0 < seconds <= 600:
+        raise HTTPException(status_code=400, detail="seconds must be between 0 and 600")
+    try:
+        name = profile_window(kind, seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "profiling", "kind": kind, "seconds": seconds, "file": name, "download": f"/admin/profiles/{name}"}
+
+@app.get("/admin/profiles")
+async def get_profiles(x_profile_token: Optional[str] = Header(None)):
+    _require_profiling_token(x_profile_token)
+    return {"profiles": list_profiles()}
+
+@app.get("/admin/profiles/{name}")
+async def download_profile(name: str, x_profile_token: Optional[str] = Header(None)):
+    """
+    A dump in collapsed-stack format, e.g. for flamegraph.pl or speedscope
+    """
+    _require_profiling_token(x_profile_token)
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
+
 @app.get("/test")
 async def test_endpoint():
     """
@@ -201,6 +761,7 @@ async def test_endpoint():
 
 if __name__ == "__main__":
     import uvicorn
+    settings = get_settings()
     print("Starting Travel Planner API...")
-    print(f"OpenAI API Key: {'Configured' if openai.api_key else 'Not configured'}")
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    print(f"OpenAI API Key: {'Configured' if settings.openai_api_key else 'Not configured'}")
+    uvicorn.run(app, host=settings.host, port=settings.port)
\ No newline at end of file
@@ -1,6 +1,5 @@
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from datetime import datetime
 
 class DestinationRequest(BaseModel):
     """Model for parsing user's travel request"""
@@ -28,6 +27,7 @@ class DayPlan(BaseModel):
     activities: List[str]
     places: List[str]
     notes: Optional[str] = None
+    city: Optional[str] = None  # the stop this day is spent in, for multi-city trips
 
 class Itinerary(BaseModel):
     """Complete travel itinerary model"""
@@ -56,11 +56,3 @@ class ItineraryResponse(BaseModel):
     itinerary: Itinerary
     recommended_places: List[Place]
     status: str
-
-print("Models defined successfully!")
-print("Available models:")
-print("- DestinationRequest: For parsing user travel requests")
-print("- Place: For individual travel destinations")
-print("- DayPlan: For daily itinerary planning")
-print("- Itinerary: Complete travel plan")
-print("- TravelPreferences: User preferences")
\ No newline at end of file
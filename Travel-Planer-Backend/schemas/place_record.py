@@ -0,0 +1,109 @@
+"""
+Place record - compact in-memory place used on the ranking and itinerary hot paths.
+
+Places arrive from the Places layer (and leave through the API) as dicts. In between,
+search, filtering and the basic itinerary work on PlaceRecord objects: fixed slots
+instead of a dict per place, with the lowercase search text and the de-duplication
+key computed once when the record is built.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Keys with their own slot; anything else is kept in `extra`
+_CORE_KEYS = frozenset(('name', 'type', 'rating', 'address', 'coordinates', 'description', 'place_id', 'price_level',
+                        'opening_hours'))
+
+class PlaceRecord:
+    """
+    A single place with precomputed search fields
+    """
+    
+    __slots__ = ('name', 'type', 'rating', 'address', 'lat', 'lng', 'description', 'place_id', 
+                 'price_level', 'opening_hours', 'extra', 'name_lower', 'type_lower', 'search_text', 'key')
+    
+    def __init__(self, name: str, type: Optional[str] = None, rating: Optional[float] = None, 
+                 address: Optional[str] = None, lat: Optional[float] = None, lng: Optional[float] = None, 
+                 description: Optional[str] = None, place_id: Optional[str] = None, 
+                 price_level: Optional[int] = None, opening_hours: Optional[str] = None, 
+                 extra: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.type = type
+        self.rating = rating
+        self.address = address
+        self.lat = lat
+        self.lng = lng
+        self.description = description
+        self.place_id = place_id
+        self.price_level = price_level
+        self.opening_hours = opening_hours
+        self.extra = extra
+        
+        # Precomputed once instead of per keyword check / per comparison
+        self.name_lower = name.lower()
+        self.type_lower = (type or '').lower()
+        # Underscores become spaces so "art_gallery" matches on word boundaries
+        self.search_text = f"{self.name_lower} {(description or '').lower()} {self.type_lower.replace('_', ' ')}"
+        self.key: Tuple[str, str] = (name, address or '')
+    
+    @classmethod
+    def from_dict(cls, place: Dict[str, Any]) -> 'PlaceRecord':
+        coordinates = place.get('coordinates') or {}
+        extra = {key: value for key, value in place.items() if key not in _CORE_KEYS} or None
+        return cls(
+            name=place.get('name', ''),
+            type=place.get('type'),
+            rating=place.get('rating'),
+            address=place.get('address'),
+            lat=coordinates.get('lat'),
+            lng=coordinates.get('lng'),
+            description=place.get('description'),
+            place_id=place.get('place_id'),
+            price_level=place.get('price_level'),
+            opening_hours=place.get('opening_hours'),
+            extra=extra
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The API representation of the place
+        """
+        place = {'name': self.name, 'type': self.type, 'rating': self.rating}
+        if self.address is not None:
+            place['address'] = self.address
+        if self.lat is not None:
+            place['coordinates'] = {'lat': self.lat, 'lng': self.lng}
+        if self.description is not None:
+            place['description'] = self.description
+        if self.place_id is not None:
+            place['place_id'] = self.place_id
+        if self.price_level is not None:
+            place['price_level'] = self.price_level
+        if self.opening_hours is not None:
+            place['opening_hours'] = self.opening_hours
+        if self.extra:
+            place.update(self.extra)
+        return place
+    
+    def _fields(self) -> tuple:
+        return (self.name, self.type, self.rating, self.address, self.lat, self.lng, 
+                self.description, self.place_id, self.price_level, self.opening_hours, self.extra)
+    
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, PlaceRecord):
+            return NotImplemented
+        return self._fields() == other._fields()
+    
+    def __hash__(self) -> int:
+        return hash(self.key)
+    
+    def __repr__(self) -> str:
+        return f"PlaceRecord({self.name!r}, type={self.type!r}, rating={self.rating!r})"
+
+def to_records(places: Iterable[Any]) -> List[PlaceRecord]:
+    """
+    Accept dicts or records and return records
+    """
+    return [place if isinstance(place, PlaceRecord) else PlaceRecord.from_dict(place) for place in places]
+
+def to_dicts(records: Iterable[PlaceRecord]) -> List[Dict[str, Any]]:
+    return [record.to_dict() for record in records]
@@ -0,0 +1,40 @@
+"""
+Fill the travel tips store offline.
+
+Usage (from Travel-Planer-Backend):
+    python -m scripts.build_tips_store "Rome, Italy" "Tokyo, Japan"
+    python -m scripts.build_tips_store --file destinations.txt --categories food safety
+"""
+
+import argparse
+import sys
+
+from agents.tips_agent import build_tips_store
+from config import get_settings
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Precompute travel tips for destinations")
+    parser.add_argument("destinations", nargs="*", help="Destinations to generate tips for")
+    parser.add_argument("--file", help="File with one destination per line")
+    parser.add_argument("--categories", nargs="*", help="Tip categories (default: all known categories)")
+    parser.add_argument("--overwrite", action="store_true", help="Regenerate tips that are already stored")
+    args = parser.parse_args()
+    
+    if not get_settings().openai_api_key:
+        print("OPENAI_API_KEY is required to generate tips")
+        return 1
+    
+    destinations = list(args.destinations)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            destinations.extend(line.strip() for line in f if line.strip())
+    
+    if not destinations:
+        parser.error("no destinations given")
+    
+    count = build_tips_store(destinations, args.categories, overwrite=args.overwrite)
+    print(f"Generated tips for {count}/{len(destinations)} destinations")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
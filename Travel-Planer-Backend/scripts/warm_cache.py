@@ -0,0 +1,39 @@
+"""
+Pre-populate the shared cache for the most requested destinations.
+Use with CACHE_BACKEND=sqlite or redis so the API workers see the warmed entries.
+
+Usage (from Travel-Planer-Backend):
+    python -m scripts.warm_cache --destinations 20
+    python -m scripts.warm_cache --traffic-log api.log --rate 5 --itineraries
+"""
+
+import argparse
+import json
+import sys
+
+from config import get_settings
+from services.cache_warmer import CacheWarmer, rank_destinations
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Warm the cache for top destinations")
+    parser.add_argument("--destinations", type=int, default=20, help="How many destinations to warm")
+    parser.add_argument("--traffic-log", help="API log or JSON lines to rank destinations by traffic")
+    parser.add_argument("--rate", type=float, default=2.0, help="Warm-up tasks per second")
+    parser.add_argument("--itineraries", action="store_true", help="Also generate GPT itineraries for common specs")
+    parser.add_argument("--durations", type=int, nargs="*", help="Trip lengths for --itineraries")
+    args = parser.parse_args()
+    
+    if get_settings().cache_backend == "memory":
+        print("Warning: CACHE_BACKEND=memory - the warmed entries disappear when this script exits")
+    
+    destinations = rank_destinations(args.destinations, args.traffic_log)
+    if not destinations:
+        parser.error("no destinations found")
+    
+    warmer = CacheWarmer(destinations, durations=args.durations, rate=args.rate, warm_itineraries=args.itineraries)
+    stats = warmer.run()
+    print(json.dumps(stats, indent=2))
+    return 0 if stats["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
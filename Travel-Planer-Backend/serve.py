@@ -0,0 +1,169 @@
+"""
+Production launcher - runs the API in several worker processes on one port.
+
+The parent process imports the app and calls main.preload() once, then forks the
+workers, so the matchers, destination tables and tips store are shared copy-on-write
+instead of being built in every process. Each worker runs main.warmup_worker() and
+serves the shared listening socket with uvicorn. The parent restarts workers that
+die, and on SIGTERM/SIGINT tells every worker to stop accepting connections and
+finish its in-flight requests (up to GRACEFUL_SHUTDOWN_SECONDS) before exiting.
+
+State that follow-up requests need is shared through local SQLite files, not held
+per process: trip sessions (TRIP_SESSION_PATH) and trip jobs (JOB_QUEUE_PATH), so a
+poll or regenerate request can land on any worker.
+
+Usage (from Travel-Planer-Backend):
+    python serve.py --workers 4
+    WORKERS=8 PORT=8001 python serve.py
+
+For local development, `python main.py` still runs a single process.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Travel Planner API with multiple worker processes")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: WORKERS or the CPU count)")
+    parser.add_argument("--host", help="Bind address (default: HOST)")
+    parser.add_argument("--port", type=int, help="Port (default: PORT)")
+    return parser.parse_args()
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """
+    Listening socket created once in the parent and inherited by every worker
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(sock: socket.socket, drain_seconds: float) -> None:
+    """
+    Body of a forked worker process; never returns
+    """
+    import uvicorn
+    import main
+
+    # Default signal handling; uvicorn installs its own graceful handlers in serve()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    exit_code = 0
+    try:
+        main.warmup_worker()
+        config = uvicorn.Config(main.app, lifespan="on", timeout_graceful_shutdown=drain_seconds, log_level="info")
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception as e:
+        print(f"Worker {os.getpid()} crashed: {e}")
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(exit_code)
+
+def spawn_worker(sock: socket.socket, drain_seconds: float) -> int:
+    pid = os.fork()
+    if pid == 0:
+        run_worker(sock, drain_seconds)
+    return pid
+
+def serve(workers: int, host: str, port: int, drain_seconds: float) -> int:
+    if workers == 1 or not hasattr(os, "fork"):
+        # No fork on this platform (or nothing to fork for): a single uvicorn process
+        import uvicorn
+        import main
+        main.preload()
+        uvicorn.run(main.app, host=host, port=port, timeout_graceful_shutdown=drain_seconds)
+        return 0
+
+    start = time.perf_counter()
+    import main
+    main.preload()
+    # Keep the preloaded objects out of the garbage collector's generations so
+    # collections in the workers don't touch (and copy) the shared pages
+    gc.freeze()
+    print(f"Preloaded application in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    sock = bind_socket(host, port)
+    print(f"Starting {workers} workers on http://{host}:{port}")
+    children = {spawn_worker(sock, drain_seconds) for _ in range(workers)}
+
+    stopping = False
+
+    def handle_stop(signum, frame):
+        nonlocal stopping
+        if not stopping:
+            print(f"Received signal {signum}, draining {len(children)} workers...")
+        stopping = True
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    # Supervise: replace workers that die until asked to stop
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, starting a replacement")
+            children.add(spawn_worker(sock, drain_seconds))
+
+    # Graceful drain: workers stop accepting and finish in-flight requests
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.monotonic() + drain_seconds + 5
+    while children and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.1)
+        else:
+            children.discard(pid)
+
+    for pid in children:
+        print(f"Worker {pid} did not finish in time, killing it")
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+    sock.close()
+    print("All workers stopped")
+    return 0
+
+def main() -> int:
+    from config import get_settings
+
+    args = parse_args()
+    get_settings()  # loads .env into the environment
+    workers = max(1, args.workers or int(os.getenv("WORKERS", "0")) or os.cpu_count() or 1)
+
+    # Workers read their share of the provider quotas from WORKERS
+    os.environ["WORKERS"] = str(workers)
+    get_settings.cache_clear()
+    settings = get_settings()
+
+    return serve(workers, args.host or settings.host, args.port or settings.port, settings.graceful_shutdown_seconds)
+
+if __name__ == "__main__":
+    sys.exit(main())
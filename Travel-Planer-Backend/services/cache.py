@@ -0,0 +1,363 @@
+"""
+Cache - Shared cache for parse, Places, geocode and response results.
+
+Backends:
+- memory: in-process LRU (default, per worker)
+- sqlite: a file on local disk shared by all workers on the host
+- redis:  any Redis-protocol server shared by the whole fleet (needs the redis package)
+
+Keys are namespaced ("<prefix>:<namespace>:<key>"), values use the byte
+format from services.serialization, and get_or_compute() makes sure only one caller computes a missing
+value while the others wait for it (stampede protection).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from config import get_settings
+from services.deadline import current_deadline
+from services.serialization import decode, encode
+
+# Default time-to-live per namespace, in seconds
+CACHE_TTLS = {
+    'parse': 24 * 3600,
+    'geocode': 30 * 24 * 3600,
+    'places': 24 * 3600,
+    'place_details': 7 * 24 * 3600,
+    'itinerary': 24 * 3600,
+    'tool': 3600,
+    'response': 600
+}
+
+_MISSING = object()
+
+class CacheBackend:
+    """
+    Byte-level storage used by Cache
+    """
+    
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+    
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+    
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+    
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """
+        Set key only if it doesn't exist; used as a lock between processes
+        """
+        raise NotImplementedError
+
+class InProcessLRUCache(CacheBackend):
+    """
+    Bounded LRU dict with per-entry expiry
+    """
+    
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or time.time() <= entry[1]):
+                return False
+            self._entries[key] = (value, time.time() + ttl)
+            return True
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache table in a local SQLite file, shared by all worker processes on the host
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+    
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and time.time() > row[1]:
+            self.delete(key)
+            return None
+        return row[0]
+    
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), time.time() + ttl if ttl else None)
+        )
+    
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+    
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        connection = self._connection()
+        now = time.time()
+        # Drop an expired holder first, then try to take the key
+        connection.execute("DELETE FROM cache WHERE key = ? AND expires_at < ?", (key, now))
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), now + ttl)
+        )
+        return cursor.rowcount == 1
+    
+    def purge_expired(self) -> int:
+        cursor = self._connection().execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+class RedisCache(CacheBackend):
+    """
+    Redis-protocol backend. Pass a client (e.g. fakeredis in tests) or a URL.
+    """
+    
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0", socket_timeout=1)
+        self.client = client
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+    
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if ttl:
+            self.client.set(key, value, px=int(ttl * 1000))
+        else:
+            self.client.set(key, value)
+    
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+    
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self.client.set(key, value, px=int(ttl * 1000), nx=True))
+
+class Cache:
+    """
+    Namespaced cache with serialization, hit/miss stats and stampede protection
+    """
+    
+    def __init__(self, backend: CacheBackend, prefix: str = "travel:v1"):
+        self.backend = backend
+        self.prefix = prefix
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+    
+    def make_key(self, namespace: str, key: Any) -> str:
+        """
+        Build the full key; non-string or long keys are hashed
+        """
+        if not isinstance(key, str):
+            key = json.dumps(key, sort_keys=True, separators=(',', ':'), default=str)
+        if len(key) > 100:
+            key = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{namespace}:{key}"
+    
+    def _count(self, namespace: str, field: str) -> None:
+        stats = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "errors": 0})
+        stats[field] += 1
+    
+    def _read(self, namespace: str, full_key: str) -> Any:
+        try:
+            data = self.backend.get(full_key)
+        except Exception as e:
+            print(f"Cache read error ({namespace}): {e}")
+            self._count(namespace, "errors")
+            return _MISSING
+        if data is None:
+            return _MISSING
+        try:
+            return decode(data)
+        except Exception as e:
+            print(f"Cache decode error ({namespace}): {e}")
+            self._count(namespace, "errors")
+            return _MISSING
+    
+    def get(self, namespace: str, key: Any, default: Any = None) -> Any:
+        value = self._read(namespace, self.make_key(namespace, key))
+        self._count(namespace, "misses" if value is _MISSING else "hits")
+        return default if value is _MISSING else value
+    
+    def set(self, namespace: str, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            self.backend.set(self.make_key(namespace, key), encode(value), ttl or CACHE_TTLS.get(namespace))
+        except Exception as e:
+            print(f"Cache write error ({namespace}): {e}")
+            self._count(namespace, "errors")
+    
+    def delete(self, namespace: str, key: Any) -> None:
+        self.backend.delete(self.make_key(namespace, key))
+    
+    def get_or_compute(self, namespace: str, key: Any, compute: Callable[[], Any], 
+                       ttl: Optional[float] = None, should_cache: Optional[Callable[[Any], bool]] = None,
+                       lock_timeout: float = 30.0) -> Any:
+        """
+        Return the cached value or compute it once.
+        Concurrent callers for the same key (in this process, or in other processes
+        sharing the backend) wait for the first caller's result instead of recomputing.
+        Waiting stops at the request deadline, and as soon as the first caller is done
+        without storing a value (should_cache said no, or compute raised).
+        """
+        
+        # Never wait past the request deadline
+        deadline = current_deadline()
+        wait_timeout = deadline.clamp(lock_timeout) if deadline is not None else lock_timeout
+        
+        full_key = self.make_key(namespace, key)
+        value = self._read(namespace, full_key)
+        if value is not _MISSING:
+            self._count(namespace, "hits")
+            return value
+        self._count(namespace, "misses")
+        
+        # In-process single flight
+        with self._inflight_lock:
+            event = self._inflight.get(full_key)
+            leader = event is None
+            if leader:
+                event = self._inflight[full_key] = threading.Event()
+        
+        if not leader:
+            event.wait(wait_timeout)
+            value = self._read(namespace, full_key)
+            return compute() if value is _MISSING else value
+        
+        try:
+            # Cross-process single flight through a short-lived lock key
+            lock_key = full_key + ":lock"
+            try:
+                have_lock = self.backend.add(lock_key, b"1", lock_timeout)
+            except Exception:
+                have_lock = True
+            
+            if not have_lock:
+                waited_until = time.monotonic() + wait_timeout
+                while time.monotonic() < waited_until:
+                    time.sleep(0.05)
+                    value = self._read(namespace, full_key)
+                    if value is not _MISSING:
+                        return value
+                    if not self._lock_held(lock_key):
+                        # The other process finished without storing a value
+                        value = self._read(namespace, full_key)
+                        if value is not _MISSING:
+                            return value
+                        break
+            
+            try:
+                value = compute()
+                if should_cache is None or should_cache(value):
+                    data = encode(value)
+                    try:
+                        self.backend.set(full_key, data, ttl or CACHE_TTLS.get(namespace))
+                    except Exception as e:
+                        print(f"Cache write error ({namespace}): {e}")
+                        self._count(namespace, "errors")
+                    # Hand back what later hits will see (e.g. tuples come back as lists)
+                    # so a computed value and a cached one always compare equal
+                    value = decode(data)
+                return value
+            finally:
+                if have_lock:
+                    try:
+                        self.backend.delete(lock_key)
+                    except Exception:
+                        pass
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(full_key, None)
+            event.set()
+    
+    def _lock_held(self, lock_key: str) -> bool:
+        try:
+            return self.backend.get(lock_key) is not None
+        except Exception:
+            return True
+    
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for namespace, counts in self._stats.items():
+            lookups = counts["hits"] + counts["misses"]
+            namespaces[namespace] = {**counts, "hit_rate": round(counts["hits"] / lookups, 3) if lookups else 0.0}
+        return {"backend": type(self.backend).__name__, "namespaces": namespaces}
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+def create_backend(kind: str) -> CacheBackend:
+    settings = get_settings()
+    if kind == "sqlite":
+        return SQLiteCache(settings.cache_sqlite_path)
+    if kind == "redis":
+        return RedisCache(settings.cache_redis_url)
+    return InProcessLRUCache(settings.cache_max_entries)
+
+def get_cache() -> Cache:
+    """
+    Shared cache, built from settings on first use
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            settings = get_settings()
+            _cache = Cache(create_backend(settings.cache_backend), prefix=settings.cache_prefix)
+        return _cache
+
+def set_cache(cache: Optional[Cache]) -> None:
+    """
+    Replace the shared cache (e.g. with a fake backend in tests)
+    """
+    global _cache
+    with _cache_lock:
+        _cache = cache
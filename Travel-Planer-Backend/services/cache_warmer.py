@@ -0,0 +1,221 @@
+"""
+Cache Warmer - Pre-populates the shared cache for the most requested destinations.
+
+After a deploy every cache is cold and the first users for each popular city pay
+the full Places and GPT latency. The warmer walks a ranked destination list and,
+at a throttled rate, fills:
+- places: the recommendations the /plan-trip pipeline asks for, per common interest set,
+  through the same get_place_recommendations call and cache keys as requests
+- itinerary: GPT itineraries for common parsed specs (opt-in, it costs tokens)
+
+Destinations are ranked from logged traffic when a log is given ("Received request: ..."
+lines from the API output, or JSON lines with "destination" or "message"),
+otherwise from the destination parser's known mapping.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agents.destination_agent import DESTINATION_MAPPING, _extract_destination
+from agents.google_places_agent import get_place_recommendations
+from agents.itinerary_agent import generate_itinerary_with_source
+from config import get_settings
+from services.cache import get_cache
+from services.deadline import deadline_scope
+from services.llm_client import llm_available
+
+# Interest sets and trip lengths most requests parse to
+DEFAULT_INTEREST_SETS = [['general'], ['food'], ['history'], ['history', 'food'], ['art'], ['nature']]
+DEFAULT_DURATIONS = [3, 5, 7]
+
+_REQUEST_LOG_PREFIX = "Received request: "
+
+def rank_destinations(limit: int = 20, traffic_log: Optional[str] = None) -> List[str]:
+    """
+    Most requested destinations first
+    """
+
+    if traffic_log:
+        counts = Counter()
+        with open(traffic_log, encoding="utf-8") as f:
+            for line in f:
+                destination = _destination_from_log_line(line.strip())
+                if destination and destination != "Unknown":
+                    counts[destination] += 1
+        return [destination for destination, _ in counts.most_common(limit)]
+
+    # No traffic yet: the parser's known destinations, cities before countries
+    destinations = list(dict.fromkeys(DESTINATION_MAPPING.values()))
+    destinations.sort(key=lambda destination: ',' not in destination)
+    return destinations[:limit]
+
+def _destination_from_log_line(line: str) -> Optional[str]:
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        if entry.get('destination'):
+            return entry['destination']
+        return _extract_destination(entry['message']) if entry.get('message') else None
+    if _REQUEST_LOG_PREFIX in line:
+        return _extract_destination(line.split(_REQUEST_LOG_PREFIX, 1)[1])
+    return None
+
+class CacheWarmer:
+    """
+    Runs the warm-up tasks at a fixed rate and tracks progress and cache hit rates
+    """
+
+    def __init__(self, destinations: List[str], interest_sets: Optional[List[List[str]]] = None,
+                 durations: Optional[List[int]] = None, rate: float = 2.0, warm_itineraries: bool = False):
+        self.destinations = destinations
+        self.interest_sets = interest_sets or DEFAULT_INTEREST_SETS
+        self.durations = durations or DEFAULT_DURATIONS
+        self.rate = rate
+        self.warm_itineraries = warm_itineraries
+
+        self.state = "idle"  # idle -> running -> done
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cache_before: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def build_tasks(self) -> List[Tuple[str, Callable[[], Any]]]:
+        """
+        (description, callable) for every cache entry to warm
+        """
+
+        tasks = []
+        for destination in self.destinations:
+            for interests in self.interest_sets:
+                tasks.append((f"places {destination} {interests}",
+                              lambda d=destination, i=interests: get_place_recommendations(d, i, max_places=15)))
+
+            if self.warm_itineraries and llm_available():
+                for duration in self.durations:
+                    for interests in self.interest_sets:
+                        tasks.append((f"itinerary {destination} {duration} days {interests}",
+                                      lambda d=destination, n=duration, i=interests: _warm_itinerary(d, n, i)))
+        return tasks
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run every task (blocking) and return the final stats
+        """
+
+        tasks = self.build_tasks()
+        with self._lock:
+            self.state = "running"
+            self.total = len(tasks)
+            self.completed = 0
+            self.failed = 0
+            self.started_at = time.time()
+            self._cache_before = _namespace_counts()
+        print(f"Cache warm-up: {len(tasks)} tasks for {len(self.destinations)} destinations at {self.rate}/s")
+
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        next_start = time.monotonic()
+        for index, (description, task) in enumerate(tasks, 1):
+            # Throttle so warm-up never competes with real traffic for provider quota
+            delay = next_start - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_start = max(next_start, time.monotonic()) + interval
+
+            try:
+                task()
+            except Exception as e:
+                print(f"Cache warm-up task failed ({description}): {e}")
+                with self._lock:
+                    self.failed += 1
+            with self._lock:
+                self.completed += 1
+            if index % 10 == 0 or index == len(tasks):
+                print(f"Cache warm-up: {index}/{len(tasks)} done")
+
+        with self._lock:
+            self.state = "done"
+            self.finished_at = time.time()
+        stats = self.stats()
+        print(f"Cache warm-up finished: {json.dumps(stats)}")
+        return stats
+
+    def start_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name="cache-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "done"
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Progress and, per cache namespace, how many warm-up lookups were already warm
+        """
+
+        with self._lock:
+            end = self.finished_at or time.time()
+            hit_rates = {}
+            for namespace, counts in _namespace_counts().items():
+                before = self._cache_before.get(namespace, {})
+                hits = counts["hits"] - before.get("hits", 0)
+                misses = counts["misses"] - before.get("misses", 0)
+                if hits + misses:
+                    hit_rates[namespace] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 3)}
+            return {
+                "state": self.state,
+                "total": self.total,
+                "completed": self.completed,
+                "failed": self.failed,
+                "progress": round(self.completed / self.total, 3) if self.total else (1.0 if self.state == "done" else 0.0),
+                "elapsed_seconds": round(end - self.started_at, 1) if self.started_at else 0.0,
+                "cache": hit_rates
+            }
+
+def _namespace_counts() -> Dict[str, Dict[str, int]]:
+    return {namespace: dict(counts) for namespace, counts in get_cache().stats()["namespaces"].items()}
+
+def _warm_itinerary(destination: str, duration: int, interests: List[str]) -> None:
+    """
+    Generate the GPT itinerary the pipeline would produce for this spec
+    """
+    places = get_place_recommendations(destination, interests, max_places=15)
+    # No request deadline here - warm-up has time to wait for a full generation
+    with deadline_scope(get_settings().itinerary_upgrade_seconds, first_token_timeout=get_settings().itinerary_upgrade_seconds):
+        generate_itinerary_with_source(destination, duration, places, interests, "moderate")
+
+# Warm-up started at application startup (see CACHE_WARMUP_ON_STARTUP)
+_startup_warmer: Optional[CacheWarmer] = None
+
+def start_startup_warmup() -> Optional[CacheWarmer]:
+    """
+    Start the configured warm-up in the background, once per process
+    """
+    global _startup_warmer
+    settings = get_settings()
+    if not settings.cache_warmup_on_startup or _startup_warmer is not None:
+        return _startup_warmer
+
+    destinations = rank_destinations(settings.cache_warmup_destinations, settings.cache_warmup_traffic_log)
+    _startup_warmer = CacheWarmer(destinations, rate=settings.cache_warmup_rate,
+                                  warm_itineraries=settings.cache_warmup_itineraries)
+    _startup_warmer.start_background()
+    return _startup_warmer
+
+def warmup_status() -> Dict[str, Any]:
+    """
+    Warm-up state for /ready and /health; "disabled" counts as ready
+    """
+    if _startup_warmer is None:
+        return {"state": "disabled", "ready": True}
+    return {**_startup_warmer.stats(), "ready": _startup_warmer.ready}
@@ -0,0 +1,144 @@
+"""
+Response Compression - gzip/brotli for responses above a size threshold.
+
+Itineraries are 10-20 KB of Markdown plus the place list, and Markdown compresses
+well, so clients on slow networks get their plan several times faster.
+Brotli is used when the client accepts it and the brotli package is installed,
+otherwise gzip. Streamed responses (/plan-trip/stream) are compressed chunk by chunk
+with a flush after each, so every day still reaches the client as soon as it is rendered.
+Small responses are sent as they are: compressing them costs more than it saves.
+"""
+
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from config import get_settings
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5  # good ratio at a speed that suits per-request compression
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    "br" or "gzip" from an Accept-Encoding header, None if neither is accepted
+    """
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=_BROTLI_QUALITY)
+        else:
+            self._gzip = zlib.compressobj(_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._gzip.compress(data)
+        return out + self._gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies of at least RESPONSE_COMPRESSION_MIN_BYTES
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        # Read from settings on first request
+        self._minimum_size = minimum_size
+
+    @property
+    def minimum_size(self) -> int:
+        if self._minimum_size is None:
+            self._minimum_size = get_settings().response_compression_min_bytes
+        return self._minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size < 0:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+class _CompressingSend:
+    """
+    Wraps the ASGI send of one response
+    """
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self._flush_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if ("content-encoding" in headers or self.start_message["status"] in (204, 304)
+                    or (not more_body and len(body) < self.minimum_size)):
+                self.passthrough = True
+                await self._flush_start()
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            data = self.compressor.compress(body, final=not more_body)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                if "content-length" in headers:
+                    del headers["content-length"]
+            else:
+                headers["Content-Length"] = str(len(data))
+            await self._flush_start()
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        if self.passthrough or self.compressor is None:
+            await self.send(message)
+            return
+        data = self.compressor.compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            message, self.start_message = self.start_message, None
+            await self.send(message)
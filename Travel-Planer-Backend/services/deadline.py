@@ -0,0 +1,60 @@
+"""
+Deadline - Per-request latency budget shared by every stage of the pipeline.
+The active deadline is kept in a context variable so agents don't need extra parameters.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a stage can't finish within the request's latency budget
+    """
+
+class Deadline:
+    """
+    A point in time by which the request must be answered
+    """
+    
+    def __init__(self, seconds: float, first_token_timeout: Optional[float] = None):
+        self.expires_at = time.monotonic() + seconds
+        # How long an LLM stream may take to start before we hedge or fall back
+        self.first_token_timeout = first_token_timeout
+    
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+    
+    def clamp(self, timeout: float) -> float:
+        """
+        Shorten a stage timeout so it never outlives the deadline
+        """
+        return min(timeout, self.remaining())
+    
+    def check(self, stage: str) -> None:
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline exceeded before {stage}")
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    The deadline of the request being processed, if any
+    """
+    return _current_deadline.get()
+
+@contextmanager
+def deadline_scope(seconds: float, first_token_timeout: Optional[float] = None):
+    """
+    Run a block of work under a new deadline
+    """
+    deadline = Deadline(seconds, first_token_timeout)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -2,19 +2,68 @@
 Google Places Service - Handles communication with Google Places API
 """
 
-from dotenv import load_dotenv
 import requests
-import os
 from typing import List, Dict, Any, Optional
 
+from config import get_settings
+from services.cache import get_cache
+from services.rate_limiter import RateLimitExceeded, get_rate_limiter, parse_retry_after
+
+# Mock places by city and place type, used when no API key is configured
+MOCK_PLACES = {
+    'rome': {
+        'tourist_attraction': [
+            {'name': 'Colosseum', 'rating': 4.6, 'description': 'Ancient Roman amphitheater and gladiator arena'},
+            {'name': 'Vatican Museums', 'rating': 4.5, 'description': 'World-renowned art collection including Sistine Chapel'},
+            {'name': 'Trevi Fountain', 'rating': 4.4, 'description': 'Baroque fountain where wishes come true'},
+            {'name': 'Pantheon', 'rating': 4.5, 'description': 'Best-preserved Roman building with impressive dome'},
+            {'name': 'Roman Forum', 'rating': 4.3, 'description': 'Ancient Roman marketplace and political center'}
+        ],
+        'restaurant': [
+            {'name': 'Da Enzo al 29', 'rating': 4.7, 'description': 'Authentic Roman trattoria in Trastevere'},
+            {'name': 'Checchino dal 1887', 'rating': 4.5, 'description': 'Historic restaurant serving traditional Roman cuisine'},
+            {'name': 'Piperno', 'rating': 4.4, 'description': 'Famous for carciofi alla giudia since 1860'},
+            {'name': 'Il Sorpasso', 'rating': 4.3, 'description': 'Modern bistro with excellent wine selection'}
+        ],
+        'museum': [
+            {'name': 'Capitoline Museums', 'rating': 4.4, 'description': 'Oldest public museums with ancient Roman statues'},
+            {'name': 'Palazzo Altemps', 'rating': 4.2, 'description': 'Renaissance palace housing ancient sculptures'},
+            {'name': 'Baths of Diocletian', 'rating': 4.1, 'description': 'Ancient Roman public baths complex'}
+        ]
+    },
+    'tokyo': {
+        'tourist_attraction': [
+            {'name': 'Senso-ji Temple', 'rating': 4.3, 'description': 'Ancient Buddhist temple in Asakusa'},
+            {'name': 'Tokyo Skytree', 'rating': 4.2, 'description': 'Tallest tower in Japan with panoramic views'},
+            {'name': 'Meiji Shrine', 'rating': 4.4, 'description': 'Shinto shrine dedicated to Emperor Meiji'},
+            {'name': 'Tsukiji Outer Market', 'rating': 4.1, 'description': 'Famous fish market and food destination'}
+        ],
+        'restaurant': [
+            {'name': 'Sukiyabashi Jiro', 'rating': 4.8, 'description': 'World-famous sushi restaurant'},
+            {'name': 'Ramen Yashichi', 'rating': 4.5, 'description': 'Authentic ramen shop in Shibuya'},
+            {'name': 'Tonki', 'rating': 4.4, 'description': 'Traditional tonkatsu restaurant since 1939'}
+        ]
+    }
+}
+
+# Generic descriptions by place type
+PLACE_TYPE_DESCRIPTIONS = {
+    'restaurant': 'Local dining establishment',
+    'tourist_attraction': 'Popular tourist destination',
+    'museum': 'Cultural institution with exhibits',
+    'park': 'Green space for recreation',
+    'shopping_mall': 'Retail shopping center',
+    'church': 'Religious place of worship',
+    'art_gallery': 'Space for art exhibitions'
+}
+
 class GooglePlacesService:
     """
     Service class for interacting with Google Places API
     """
     
     def __init__(self, api_key: Optional[str] = None):
-        load_dotenv()
-        self.api_key = api_key or os.getenv("GOOGLE_PLACES_API_KEY")
+        self.api_key = api_key or get_settings().google_places_api_key
         self.base_url = "https://maps.googleapis.com/maps/api/place"
         
         # For demo purposes, we'll use mock data if no API key is provided
@@ -32,7 +81,22 @@ class GooglePlacesService:
             return self._get_mock_places(location, place_type)
         
         try:
-            # First, get coordinates for the location
+            return get_cache().get_or_compute(
+                'places', [location, place_type, radius],
+                lambda: self._search_nearby(location, place_type, radius),
+                # An empty list may be a failed geocode or an API error status
+                should_cache=bool
+            )
+        except Exception as e:
+            print(f"Error searching places: {e}")
+            return self._get_mock_places(location, place_type)
+    
+    def geocode(self, location: str) -> Optional[Dict[str, float]]:
+        """
+        Get coordinates for a location; cached for a long time since cities don't move
+        """
+        
+        def lookup():
             geocode_url = f"{self.base_url}/findplacefromtext/json"
             geocode_params = {
                 'input': location,
@@ -41,50 +105,55 @@ class GooglePlacesService:
                 'key': self.api_key
             }
             
-            geocode_response = requests.get(geocode_url, params=geocode_params)
-            geocode_data = geocode_response.json()
+            geocode_data = self._get_json(geocode_url, geocode_params)
             
             if not geocode_data.get('candidates'):
-                return []
-            
-            # Get coordinates
-            lat = geocode_data['candidates'][0]['geometry']['location']['lat']
-            lng = geocode_data['candidates'][0]['geometry']['location']['lng']
-            
-            # Search for places nearby
-            search_url = f"{self.base_url}/nearbysearch/json"
-            search_params = {
-                'location': f"{lat},{lng}",
-                'radius': radius,
+                return None
+            return geocode_data['candidates'][0]['geometry']['location']
+        
+        return get_cache().get_or_compute(
+            'geocode', location.lower().strip(), lookup, should_cache=lambda coordinates: coordinates is not None
+        )
+    
+    def _search_nearby(self, location: str, place_type: str, radius: int) -> List[Dict[str, Any]]:
+        """
+        Nearby search around the geocoded location
+        """
+        
+        # First, get coordinates for the location
+        coordinates = self.geocode(location)
+        if not coordinates:
+            return []
+        
+        # Search for places nearby
+        search_url = f"{self.base_url}/nearbysearch/json"
+        search_params = {
+            'location': f"{coordinates['lat']},{coordinates['lng']}",
+            'radius': radius,
+            'type': place_type,
+            'key': self.api_key
+        }
+        
+        search_data = self._get_json(search_url, search_params)
+        
+        places = []
+        for result in search_data.get('results', []):
+            place = {
+                'name': result.get('name', ''),
                 'type': place_type,
-                'key': self.api_key
+                'rating': result.get('rating'),
+                'address': result.get('vicinity', ''),
+                'coordinates': {
+                    'lat': result['geometry']['location']['lat'],
+                    'lng': result['geometry']['location']['lng']
+                },
+                'price_level': result.get('price_level'),
+                'place_id': result.get('place_id'),
+                'description': self._get_place_description(place_type)
             }
-            
-            search_response = requests.get(search_url, params=search_params)
-            search_data = search_response.json()
-            
-            places = []
-            for result in search_data.get('results', []):
-                place = {
-                    'name': result.get('name', ''),
-                    'type': place_type,
-                    'rating': result.get('rating'),
-                    'address': result.get('vicinity', ''),
-                    'coordinates': {
-                        'lat': result['geometry']['location']['lat'],
-                        'lng': result['geometry']['location']['lng']
-                    },
-                    'price_level': result.get('price_level'),
-                    'place_id': result.get('place_id'),
-                    'description': self._get_place_description(place_type)
-                }
-                places.append(place)
-            
-            return places
-            
-        except Exception as e:
-            print(f"Error searching places: {e}")
-            return self._get_mock_places(location, place_type)
+            places.append(place)
+        
+        return places
     
     def get_place_details(self, place_id: str) -> Dict[str, Any]:
         """
@@ -102,8 +171,10 @@ class GooglePlacesService:
                 'key': self.api_key
             }
             
-            response = requests.get(details_url, params=params)
-            data = response.json()
+            data = get_cache().get_or_compute(
+                'place_details', place_id, lambda: self._get_json(details_url, params),
+                should_cache=lambda data: bool(data.get('result'))
+            )
             
             if data.get('result'):
                 return data['result']
@@ -114,52 +185,37 @@ class GooglePlacesService:
             print(f"Error getting place details: {e}")
             return {}
     
+    def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        GET a Places API endpoint through the shared google_places rate limiter
+        """
+        
+        limiter = get_rate_limiter("google_places")
+        limiter.acquire(timeout=get_settings().rate_limit_wait_seconds)
+        
+        response = requests.get(url, params=params, timeout=10)
+        if response.status_code == 429:
+            limiter.on_rate_limited(parse_retry_after(response.headers.get("Retry-After")))
+            response.raise_for_status()
+        
+        data = response.json()
+        if data.get('status') == 'OVER_QUERY_LIMIT':
+            limiter.on_rate_limited()
+            raise RateLimitExceeded("google_places", 1.0)
+        
+        limiter.on_success()
+        return data
+    
     def _get_mock_places(self, location: str, place_type: str) -> List[Dict[str, Any]]:
         """
         Generate mock places data for demonstration
         """
         
-        mock_data = {
-            'rome': {
-                'tourist_attraction': [
-                    {'name': 'Colosseum', 'rating': 4.6, 'description': 'Ancient Roman amphitheater and gladiator arena'},
-                    {'name': 'Vatican Museums', 'rating': 4.5, 'description': 'World-renowned art collection including Sistine Chapel'},
-                    {'name': 'Trevi Fountain', 'rating': 4.4, 'description': 'Baroque fountain where wishes come true'},
-                    {'name': 'Pantheon', 'rating': 4.5, 'description': 'Best-preserved Roman building with impressive dome'},
-                    {'name': 'Roman Forum', 'rating': 4.3, 'description': 'Ancient Roman marketplace and political center'}
-                ],
-                'restaurant': [
-                    {'name': 'Da Enzo al 29', 'rating': 4.7, 'description': 'Authentic Roman trattoria in Trastevere'},
-                    {'name': 'Checchino dal 1887', 'rating': 4.5, 'description': 'Historic restaurant serving traditional Roman cuisine'},
-                    {'name': 'Piperno', 'rating': 4.4, 'description': 'Famous for carciofi alla giudia since 1860'},
-                    {'name': 'Il Sorpasso', 'rating': 4.3, 'description': 'Modern bistro with excellent wine selection'}
-                ],
-                'museum': [
-                    {'name': 'Capitoline Museums', 'rating': 4.4, 'description': 'Oldest public museums with ancient Roman statues'},
-                    {'name': 'Palazzo Altemps', 'rating': 4.2, 'description': 'Renaissance palace housing ancient sculptures'},
-                    {'name': 'Baths of Diocletian', 'rating': 4.1, 'description': 'Ancient Roman public baths complex'}
-                ]
-            },
-            'tokyo': {
-                'tourist_attraction': [
-                    {'name': 'Senso-ji Temple', 'rating': 4.3, 'description': 'Ancient Buddhist temple in Asakusa'},
-                    {'name': 'Tokyo Skytree', 'rating': 4.2, 'description': 'Tallest tower in Japan with panoramic views'},
-                    {'name': 'Meiji Shrine', 'rating': 4.4, 'description': 'Shinto shrine dedicated to Emperor Meiji'},
-                    {'name': 'Tsukiji Outer Market', 'rating': 4.1, 'description': 'Famous fish market and food destination'}
-                ],
-                'restaurant': [
-                    {'name': 'Sukiyabashi Jiro', 'rating': 4.8, 'description': 'World-famous sushi restaurant'},
-                    {'name': 'Ramen Yashichi', 'rating': 4.5, 'description': 'Authentic ramen shop in Shibuya'},
-                    {'name': 'Tonki', 'rating': 4.4, 'description': 'Traditional tonkatsu restaurant since 1939'}
-                ]
-            }
-        }
-        
         # Normalize location name
         location_key = location.lower().split(',')[0].strip()
         
         # Get places for the location and type
-        places_data = mock_data.get(location_key, {}).get(place_type, [])
+        places_data = MOCK_PLACES.get(location_key, {}).get(place_type, [])
         
         # Convert to standard format
         places = []
@@ -194,17 +250,7 @@ class GooglePlacesService:
         """
         Generate generic descriptions based on place type
         """
-        descriptions = {
-            'restaurant': 'Local dining establishment',
-            'tourist_attraction': 'Popular tourist destination',
-            'museum': 'Cultural institution with exhibits',
-            'park': 'Green space for recreation',
-            'shopping_mall': 'Retail shopping center',
-            'church': 'Religious place of worship',
-            'art_gallery': 'Space for art exhibitions'
-        }
-        
-        return descriptions.get(place_type, 'Point of interest')
+        return PLACE_TYPE_DESCRIPTIONS.get(place_type, 'Point of interest')
 
 # Test the service
 if __name__ == "__main__":
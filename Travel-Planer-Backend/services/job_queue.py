@@ -0,0 +1,272 @@
+"""
+Job Queue - Durable queue of trip-planning jobs for the asynchronous /trips API.
+
+POST /trips only enqueues the request, so admission no longer depends on how long
+generation takes. A pool of background threads claims jobs and runs the regular
+pipeline, reporting the parsed request and the places as partial results while the
+itinerary is still being written. GET /trips/{id} polls the job.
+
+Jobs live in a local SQLite file (JOB_QUEUE_PATH), so they survive restarts and are
+shared by the worker processes of serve.py. Claiming a job is a single transaction,
+so each job runs once. Jobs whose worker died (no progress within JOB_LEASE_SECONDS)
+are queued again.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from config import get_settings
+
+class QueueFull(Exception):
+    """
+    Raised when too many jobs are waiting; the client should retry later
+    """
+
+class JobQueue:
+    """
+    Jobs table in a local SQLite file.
+    status: queued -> running -> done | failed; stage tells how far a running job got.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # Wakes idle workers in this process as soon as a job is enqueued
+        self.new_job = threading.Event()
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                request TEXT NOT NULL,
+                partial TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, request: Dict[str, Any], max_queued: Optional[int] = None) -> str:
+        """
+        Add a job and return its id. Raises QueueFull if max_queued jobs are already waiting.
+        """
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if max_queued is not None:
+                queued = connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFull(f"{queued} jobs are already waiting")
+            connection.execute(
+                "INSERT INTO jobs (id, status, stage, request, created_at, updated_at) VALUES (?, 'queued', 'queued', ?, ?, ?)",
+                (job_id, json.dumps(request), now, now)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.new_job.set()
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued job for this worker, or None if there is none
+        """
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT id, request, attempts FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', stage = 'started', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (time.time(), row[0])
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return {'id': row[0], 'request': json.loads(row[1]), 'attempts': row[2] + 1}
+
+    def report_progress(self, job_id: str, stage: str, partial: Dict[str, Any]) -> None:
+        """
+        Record the stage a running job reached and what it has produced so far
+        """
+        self._connection().execute(
+            "UPDATE jobs SET stage = ?, partial = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+            (stage, json.dumps(partial, default=str), time.time(), job_id)
+        )
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._connection().execute(
+            "UPDATE jobs SET status = 'done', stage = 'done', result = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(result, default=str), time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._connection().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+            (error, time.time(), job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT id, status, stage, partial, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'status': row[1],
+            'stage': row[2],
+            'partial': json.loads(row[3]) if row[3] else {},
+            'result': json.loads(row[4]) if row[4] else None,
+            'error': row[5],
+            'attempts': row[6],
+            'created_at': row[7],
+            'updated_at': row[8]
+        }
+
+    def requeue_stale(self, lease_seconds: float, max_attempts: int) -> int:
+        """
+        Queue running jobs again whose worker stopped reporting progress (e.g. it was
+        killed); jobs that already used max_attempts are failed instead
+        """
+
+        connection = self._connection()
+        cutoff = time.time() - lease_seconds
+        connection.execute(
+            "UPDATE jobs SET status = 'failed', error = 'The job was interrupted too many times' "
+            "WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+            (cutoff, max_attempts)
+        )
+        cursor = connection.execute(
+            "UPDATE jobs SET status = 'queued', stage = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+            (time.time(), cutoff)
+        )
+        if cursor.rowcount:
+            self.new_job.set()
+        return cursor.rowcount
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (time.time() - older_than_seconds,)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return counts
+
+class JobWorkerPool:
+    """
+    Background threads that claim jobs and hand them to run_job(job, report_progress)
+    """
+
+    def __init__(self, queue: JobQueue, run_job: Callable[[Dict[str, Any], Callable[[str, Dict[str, Any]], None]], Dict[str, Any]],
+                 workers: int = 2, poll_seconds: float = 1.0):
+        self.queue = queue
+        self.run_job = run_job
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._last_maintenance = 0.0
+        self._maintenance_lock = threading.Lock()
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"trip-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.workers} trip job workers")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self.queue.new_job.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._maintain()
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f"Job queue unavailable: {e}")
+                job = None
+
+            if job is None:
+                # Enqueues in this process wake us at once; other processes are seen on the next poll
+                self.queue.new_job.wait(self.poll_seconds)
+                self.queue.new_job.clear()
+                continue
+
+            print(f"Running trip job {job['id']} (attempt {job['attempts']})")
+            try:
+                result = self.run_job(job, lambda stage, partial: self.queue.report_progress(job['id'], stage, partial))
+                self.queue.complete(job['id'], result)
+            except sqlite3.Error as e:
+                # The lease runs out and requeue_stale() hands the job out again
+                print(f"Could not record trip job {job['id']}: {e}")
+            except Exception as e:
+                print(f"Trip job {job['id']} failed: {e}")
+                try:
+                    self.queue.fail(job['id'], str(e))
+                except sqlite3.Error as db_error:
+                    print(f"Could not record trip job {job['id']}: {db_error}")
+
+    def _maintain(self) -> None:
+        """
+        Once a minute (in one thread): requeue abandoned jobs, drop old finished ones
+        """
+        now = time.monotonic()
+        if now - self._last_maintenance < 60 or not self._maintenance_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_maintenance = now
+            settings = get_settings()
+            requeued = self.queue.requeue_stale(settings.job_lease_seconds, settings.job_max_attempts)
+            if requeued:
+                print(f"Requeued {requeued} interrupted trip jobs")
+            self.queue.purge_finished(settings.job_retention_seconds)
+        finally:
+            self._maintenance_lock.release()
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """
+    The process-wide job queue, opened on first use
+    """
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(get_settings().job_queue_path)
+    return _job_queue
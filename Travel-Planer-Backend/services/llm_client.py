@@ -0,0 +1,264 @@
+"""
+LLM Client - Single entry point for OpenAI chat completions.
+The openai package is imported on first use to keep application startup fast.
+Calls go through the shared "openai" rate limiter, which adapts to 429 responses,
+and respect the current request deadline.
+Token usage, including the prompt tokens served from the provider's prefix cache,
+is totalled for /health.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import get_settings
+from services.deadline import DeadlineExceeded, current_deadline
+from services.rate_limiter import RateLimitExceeded, get_rate_limiter, parse_retry_after
+
+_openai = None
+
+def get_openai():
+    """
+    Import and configure the openai module on first use
+    """
+    global _openai
+    if _openai is None:
+        import openai
+        openai.api_key = get_settings().openai_api_key
+        # Retries are handled here so the rate limiter sees every 429
+        openai.max_retries = 0
+        _openai = openai
+    return _openai
+
+def llm_available() -> bool:
+    """
+    True when an OpenAI API key is configured
+    """
+    return bool(get_settings().openai_api_key)
+
+class UsageStats:
+    """
+    Running totals of the token usage reported by completed calls
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+    
+    def record(self, usage: Any) -> None:
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            self.cached_tokens += getattr(details, "cached_tokens", 0) or 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0
+            }
+
+_usage = UsageStats()
+
+def llm_usage_stats() -> Dict[str, Any]:
+    return _usage.stats()
+
+def _retry_after_from_error(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return parse_retry_after(headers.get("retry-after"))
+
+def chat_completion(**kwargs) -> Any:
+    """
+    Create a chat completion; the model defaults to the configured one.
+    Waits for a token from the openai rate limiter and retries 429s after the
+    provider's retry-after. Raises RateLimitExceeded if no token is available in time
+    and DeadlineExceeded if the request deadline runs out.
+    """
+    
+    settings = get_settings()
+    openai = get_openai()
+    limiter = get_rate_limiter("openai")
+    deadline = current_deadline()
+    kwargs.setdefault("model", settings.openai_model)
+    
+    for attempt in range(settings.llm_max_retries + 1):
+        wait_timeout = settings.rate_limit_wait_seconds
+        if deadline is not None:
+            deadline.check("LLM call")
+            wait_timeout = deadline.clamp(wait_timeout)
+            kwargs["timeout"] = deadline.remaining()
+        
+        limiter.acquire(timeout=wait_timeout)
+        try:
+            response = openai.chat.completions.create(**kwargs)
+        except openai.RateLimitError as e:
+            limiter.on_rate_limited(_retry_after_from_error(e))
+            if attempt == settings.llm_max_retries:
+                raise
+            print(f"OpenAI rate limited, retrying (attempt {attempt + 2})")
+            continue
+        except openai.APITimeoutError as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded("LLM call did not finish before the deadline") from e
+            raise
+        limiter.on_success()
+        _usage.record(getattr(response, "usage", None))
+        return response
+
+class LLMStartTimeout(DeadlineExceeded):
+    """
+    Raised when no LLM stream started producing tokens within the first-token timeout
+    """
+
+class _StreamAttempt(threading.Thread):
+    """
+    One streaming request, reporting its tokens to a shared event queue
+    """
+    
+    def __init__(self, index: int, events: queue.Queue, kwargs: Dict[str, Any]):
+        super().__init__(daemon=True, name=f"llm-stream-{index}")
+        self.index = index
+        self.events = events
+        self.kwargs = kwargs
+        self.chunks: List[str] = []
+        self.usage: Any = None
+        self.cancelled = False
+    
+    def run(self) -> None:
+        openai = get_openai()
+        try:
+            # The final chunk carries the usage (with no choices) when asked for
+            stream = openai.chat.completions.create(stream=True, stream_options={"include_usage": True}, **self.kwargs)
+            for chunk in stream:
+                if self.cancelled:
+                    close = getattr(stream, "close", None)
+                    if close:
+                        close()
+                    return
+                if getattr(chunk, "usage", None) is not None:
+                    self.usage = chunk.usage
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    self.events.put(("token", self.index, content))
+            self.events.put(("done", self.index, None))
+        except openai.RateLimitError as e:
+            get_rate_limiter("openai").on_rate_limited(_retry_after_from_error(e))
+            self.events.put(("error", self.index, e))
+        except Exception as e:
+            self.events.put(("error", self.index, e))
+
+def stream_chat_completion(hedge: Optional[bool] = None, on_token: Optional[Callable[[str], bool]] = None,
+                           **kwargs) -> str:
+    """
+    Stream a chat completion and return the full text, bounded by the request deadline.
+    
+    If no tokens arrive within the first-token timeout, a second (hedged) request is
+    fired and whichever starts first wins; without hedging, or if the hedge doesn't
+    start either, LLMStartTimeout is raised so the caller can use a fast fallback.
+    
+    on_token is called with each token of the winning stream; if it returns True the
+    stream is cancelled and the text so far returned.
+    """
+    
+    settings = get_settings()
+    limiter = get_rate_limiter("openai")
+    deadline = current_deadline()
+    hedge = settings.llm_hedge_enabled if hedge is None else hedge
+    first_token_timeout = settings.llm_first_token_timeout
+    if deadline is not None:
+        deadline.check("LLM stream")
+        if deadline.first_token_timeout is not None:
+            first_token_timeout = deadline.first_token_timeout
+        kwargs["timeout"] = deadline.remaining()
+    kwargs.setdefault("model", settings.openai_model)
+    
+    events: queue.Queue = queue.Queue()
+    attempts: List[_StreamAttempt] = []
+    
+    def start_attempt(wait_timeout: float) -> bool:
+        try:
+            limiter.acquire(timeout=wait_timeout)
+        except RateLimitExceeded:
+            return False
+        attempt = _StreamAttempt(len(attempts), events, dict(kwargs))
+        attempts.append(attempt)
+        attempt.start()
+        return True
+    
+    def cancel_all() -> None:
+        for attempt in attempts:
+            attempt.cancelled = True
+    
+    wait_timeout = settings.rate_limit_wait_seconds
+    if deadline is not None:
+        wait_timeout = deadline.clamp(wait_timeout)
+    if not start_attempt(wait_timeout):
+        raise RateLimitExceeded("openai", wait_timeout)
+    
+    start_by = time.monotonic() + first_token_timeout
+    winner: Optional[_StreamAttempt] = None
+    failed = set()
+    
+    while True:
+        # Wait for the next event, but not past the deadline or the start threshold
+        timeout = deadline.remaining() if deadline is not None else None
+        if winner is None:
+            until_start = max(0.0, start_by - time.monotonic())
+            timeout = until_start if timeout is None else min(timeout, until_start)
+        
+        try:
+            kind, index, payload = events.get(timeout=timeout)
+        except queue.Empty:
+            if deadline is not None and deadline.expired():
+                cancel_all()
+                raise DeadlineExceeded("LLM stream did not finish before the deadline")
+            # Nothing has started by the threshold: hedge once, otherwise give up
+            if hedge and len(attempts) == 1 and start_attempt(0):
+                print("LLM stream slow to start, firing hedged request")
+                start_by = time.monotonic() + first_token_timeout
+                continue
+            cancel_all()
+            raise LLMStartTimeout("LLM stream did not start in time")
+        
+        attempt = attempts[index]
+        if winner is not None and attempt is not winner:
+            continue
+        
+        if kind == "token":
+            if winner is None:
+                winner = attempt
+                for other in attempts:
+                    if other is not winner:
+                        other.cancelled = True
+            attempt.chunks.append(payload)
+            if on_token is not None and on_token(payload):
+                cancel_all()
+                limiter.on_success()
+                return "".join(attempt.chunks)
+        elif kind == "done":
+            if winner is None:
+                winner = attempt
+            limiter.on_success()
+            _usage.record(winner.usage)
+            return "".join(winner.chunks)
+        else:
+            failed.add(index)
+            if winner is not None:
+                raise payload
+            if len(failed) < len(attempts):
+                continue
+            # Every attempt failed before starting: try the hedge right away
+            if hedge and len(attempts) == 1 and start_attempt(0):
+                continue
+            raise payload
@@ -0,0 +1,243 @@
+"""
+Profiling - Opt-in CPU sampling and allocation snapshots for production instances.
+
+Off unless PROFILING_TOKEN is set; then the only per-request cost is one header lookup.
+Two ways to take a profile (both need the token):
+- one request: send "X-Profile: cpu" or "X-Profile: memory" with "X-Profile-Token";
+  the response names the dump in its X-Profile-File header
+- a time window: POST /admin/profile?kind=cpu&seconds=30 while traffic runs
+
+CPU profiles sample the Python stacks of all threads every PROFILING_INTERVAL_MS
+(the request's own work runs in threadpool and helper threads, and concurrent
+requests are included too - profile a quiet instance to isolate one request).
+Requests shorter than a few intervals get few or no samples; for fast hot paths,
+profile a window while benchmarks/load_test.py drives traffic.
+Memory profiles diff tracemalloc snapshots taken before and after and count the
+bytes still allocated per call stack.
+
+Dumps are written to PROFILING_DIR in the collapsed-stack format
+("frame;frame;frame count" per line) read by flamegraph.pl, speedscope and inferno.
+"""
+
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+from config import get_settings
+
+PROFILE_KINDS = ("cpu", "memory")
+
+# Leaf frames in these modules mean the thread is waiting, not working
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", "base_events.py")
+
+class ProfilerBusy(Exception):
+    """
+    Raised when a profile is already being taken
+    """
+
+class StackSampler:
+    """
+    Samples the Python stack of every thread at a fixed interval
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                self.counts[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            stack.append(label)
+            frame = frame.f_back
+        # Thread pools name their threads "<prefix>_<n>"; group them by prefix
+        stack.append(re.sub(r"[-_]\d+$", "", thread_name))
+        return ";".join(reversed(stack))
+
+def _short_path(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        return "/".join(parts[parts.index("site-packages") + 1:])
+    return "/".join(parts[-2:])
+
+class ProfileSession:
+    """
+    One CPU or memory profile, written to PROFILING_DIR when stopped
+    """
+
+    def __init__(self, kind: str, label: str):
+        if kind not in PROFILE_KINDS:
+            raise ValueError(f"Unknown profile kind '{kind}', use one of {PROFILE_KINDS}")
+        self.kind = kind
+        safe_label = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:40] or "profile"
+        self.name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{safe_label}-{kind}.collapsed"
+        self._sampler: Optional[StackSampler] = None
+        self._before: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+        self._started_at = 0.0
+
+    def start(self) -> "ProfileSession":
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is running")
+        self._started_at = time.perf_counter()
+        if self.kind == "cpu":
+            self._sampler = StackSampler(get_settings().profiling_interval_ms / 1000)
+            self._sampler.start()
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracing = True
+            self._before = tracemalloc.take_snapshot()
+        return self
+
+    def stop(self) -> str:
+        """
+        Stop profiling, write the dump and return its file name
+        """
+        try:
+            elapsed = time.perf_counter() - self._started_at
+            if self.kind == "cpu":
+                counts = self._sampler.stop()
+                summary = f"{self._sampler.samples} samples over {elapsed:.2f}s"
+            else:
+                counts = _allocation_stacks(self._before, tracemalloc.take_snapshot())
+                summary = f"{sum(counts.values())} bytes still allocated after {elapsed:.2f}s"
+                if self._started_tracing:
+                    tracemalloc.stop()
+            _write_collapsed(self.name, counts)
+            print(f"Profile written to {self.name} ({summary})")
+            return self.name
+        finally:
+            _session_lock.release()
+
+_session_lock = threading.Lock()
+
+def _allocation_stacks(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> Counter:
+    """
+    Bytes allocated between the snapshots (and not freed), per call stack
+    """
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    counts: Counter = Counter()
+    for stat in after.filter_traces(exclude).compare_to(before.filter_traces(exclude), "traceback"):
+        if stat.size_diff <= 0:
+            continue
+        # tracemalloc lists the oldest call first, like the CPU stacks
+        stack = ";".join(f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+        counts[stack] += stat.size_diff
+    return counts
+
+def _write_collapsed(name: str, counts: Counter) -> None:
+    directory = get_settings().profiling_dir
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+
+def profiling_enabled() -> bool:
+    return bool(get_settings().profiling_token)
+
+def token_valid(token: Optional[str]) -> bool:
+    expected = get_settings().profiling_token
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+def list_profiles() -> List[Dict[str, object]]:
+    directory = get_settings().profiling_dir
+    if not os.path.isdir(directory):
+        return []
+    return [
+        {"name": name, "bytes": os.path.getsize(os.path.join(directory, name))}
+        for name in sorted(os.listdir(directory), reverse=True) if name.endswith(".collapsed")
+    ]
+
+def profile_path(name: str) -> Optional[str]:
+    """
+    Path of a dump by name, None for unknown names (or attempts to leave the directory)
+    """
+    if os.path.basename(name) != name or not name.endswith(".collapsed"):
+        return None
+    path = os.path.join(get_settings().profiling_dir, name)
+    return path if os.path.isfile(path) else None
+
+def profile_window(kind: str, seconds: float) -> str:
+    """
+    Profile whatever the process does for the next few seconds, in the background.
+    Returns the name the dump will be written under.
+    """
+    session = ProfileSession(kind, f"window-{int(seconds)}s").start()
+    timer = threading.Timer(seconds, session.stop)
+    timer.daemon = True
+    timer.start()
+    return session.name
+
+class ProfilingMiddleware:
+    """
+    Profiles single requests that ask for it with X-Profile and a valid X-Profile-Token
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # Read from settings on first request
+        self._enabled: Optional[bool] = None
+
+    async def __call__(self, scope, receive, send):
+        if self._enabled is None:
+            self._enabled = profiling_enabled()
+        if not self._enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        kind = headers.get(b"x-profile", b"").decode("latin-1").lower()
+        if kind not in PROFILE_KINDS or not token_valid(headers.get(b"x-profile-token", b"").decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            session = ProfileSession(kind, f"{scope['method']}{scope['path']}").start()
+        except ProfilerBusy:
+            session = None
+        profile_header = (b"x-profile-file", session.name.encode() if session else b"busy")
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [profile_header]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            if session is not None:
+                session.stop()
@@ -0,0 +1,208 @@
+"""
+Rate Limiter - Adaptive per-provider token buckets and request admission control
+"""
+
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from config import get_settings
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a provider call can't get a token within its wait budget
+    """
+    
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} rate limit reached, retry after {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose rate adapts to the provider's responses:
+    halved on a 429 (AIMD) and paused for any retry-after the provider sends,
+    then slowly increased back towards max_rate on successful calls.
+    """
+    
+    def __init__(self, name: str, rate: float, burst: int, min_rate: float = 0.1, 
+                 max_rate: Optional[float] = None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled_count = 0
+    
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+    
+    def acquire(self, timeout: float = 10.0) -> None:
+        """
+        Take one token, waiting up to timeout seconds. Raises RateLimitExceeded otherwise.
+        """
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            
+            if now + wait > deadline:
+                raise RateLimitExceeded(self.name, wait)
+            time.sleep(wait)
+    
+    def on_success(self) -> None:
+        """
+        Additive increase after a successful call
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+    
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Multiplicative decrease after a 429, honouring the provider's retry-after
+        """
+        with self._lock:
+            self.throttled_count += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        print(f"{self.name} rate limited, rate lowered to {self.rate:.2f}/s")
+    
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate_per_second": round(self.rate, 3),
+                "max_rate_per_second": self.max_rate,
+                "throttled_count": self.throttled_count
+            }
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str) -> AdaptiveRateLimiter:
+    """
+    Shared limiter for a provider ("openai" or "google_places")
+    """
+    
+    with _limiters_lock:
+        if provider not in _limiters:
+            settings = get_settings()
+            rate = {
+                "openai": settings.openai_requests_per_second,
+                "google_places": settings.places_requests_per_second
+            }.get(provider, 5.0)
+            # The quota is per account, so each worker process gets its share
+            rate = rate / settings.workers
+            _limiters[provider] = AdaptiveRateLimiter(provider, rate=rate, burst=max(1, int(rate * 2)))
+        return _limiters[provider]
+
+def rate_limiter_stats() -> Dict[str, Dict[str, float]]:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a retry-after header value in seconds (HTTP dates are ignored)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+class Overloaded(Exception):
+    """
+    Raised when the admission queue is full
+    """
+    
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy")
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounded admission in front of expensive endpoints: at most max_concurrent
+    requests run, at most max_queue wait, and the rest are rejected immediately.
+    """
+    
+    def __init__(self, max_concurrent: Optional[int] = None, max_queue: Optional[int] = None, 
+                 queue_timeout: Optional[float] = None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._avg_seconds = 5.0  # moving average of request duration
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+    
+    def _configure(self) -> None:
+        """
+        Fill unset limits from settings and create the semaphore (inside the event loop)
+        """
+        settings = get_settings()
+        if self.max_concurrent is None:
+            self.max_concurrent = settings.plan_trip_max_concurrent
+        if self.max_queue is None:
+            self.max_queue = settings.plan_trip_max_queue
+        if self.queue_timeout is None:
+            self.queue_timeout = settings.plan_trip_queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+    
+    def retry_after(self) -> int:
+        """
+        Rough hint for clients: how long until a queue slot is likely free
+        """
+        return max(1, math.ceil(self._avg_seconds * (self.waiting + 1) / self.max_concurrent))
+    
+    @asynccontextmanager
+    async def admit(self):
+        if self._semaphore is None:
+            self._configure()
+        
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+        
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+        finally:
+            self.waiting -= 1
+        
+        self.active += 1
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.monotonic() - started_at)
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue
+        }
@@ -0,0 +1,71 @@
+"""
+Response Payload - Slim responses and conditional requests for trip payloads.
+
+- fields: keep only these keys, e.g. "itinerary,destination_info" or, for lighter
+  place lists, "itinerary,places.name,places.rating"
+- slim: drop the place list and keys without a value
+- ETag / If-None-Match: a client polling a trip (GET) that already has this exact
+  payload gets 304 Not Modified; POST responses carry the ETag but are always sent
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+def shape_payload(data: Dict[str, Any], fields: Optional[str] = None, slim: bool = False) -> Dict[str, Any]:
+    """
+    Apply the fields and slim options to an encoded response
+    """
+
+    if fields:
+        top_level: List[str] = []
+        place_keys: List[str] = []
+        for field in (field.strip() for field in fields.split(",")):
+            if not field:
+                continue
+            if field.startswith("places."):
+                place_keys.append(field[len("places."):])
+                field = "places"
+            if field not in data:
+                raise HTTPException(status_code=400, detail=f"Unknown field '{field}'. Available fields: {', '.join(data)}")
+            if field not in top_level:
+                top_level.append(field)
+        data = {key: data[key] for key in top_level}
+        if place_keys and isinstance(data.get("places"), list):
+            data["places"] = [{key: place[key] for key in place_keys if key in place} for place in data["places"]]
+
+    if slim:
+        data = {key: value for key, value in data.items() if key != "places" and value not in (None, {}, [], "")}
+    return data
+
+def payload_etag(body: bytes) -> str:
+    # Weak: the same payload may be sent gzip/brotli encoded or not
+    return f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()) == opaque
+               for tag in if_none_match.split(","))
+
+def payload_response(response: Any, fields: Optional[str] = None, slim: bool = False,
+                     if_none_match: Optional[str] = None) -> Response:
+    """
+    JSON response for a TravelResponse (or dict) with an ETag, or 304 if the client has it
+    already; only pass if_none_match for GET requests
+    """
+
+    data = shape_payload(jsonable_encoder(response), fields, slim)
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = payload_etag(body)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type=JSONResponse.media_type, headers={"ETag": etag})
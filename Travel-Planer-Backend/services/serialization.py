@@ -0,0 +1,144 @@
+"""
+Serialization - Byte format for cached values, and a columnar form for place lists.
+
+Cached values (encode/decode) are compact JSON, zlib-compressed above
+_COMPRESS_ABOVE bytes; smaller ones use msgpack when it is installed. Once
+compressed, the columnar form below is larger than plain JSON and slower to decode
+(zlib already removes the repeated keys and strings), so cached values don't use it.
+
+The columnar form (to_wire/from_wire) is for uncompressed payloads, where it is
+much smaller:
+- each key is written once per list, not once per place
+- repeated strings (types, addresses, descriptions) are interned into a small table
+- coordinates are int32 micro-degrees (4 bytes each, rounded to 6 decimals)
+"""
+
+import json
+import zlib
+from array import array
+from typing import Any, Dict, List
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_PLACES_MARKER = '__places__'
+_NO_COORDINATE = -2 ** 31
+_COMPRESS_ABOVE = 512
+
+def _is_place_list(value: Any) -> bool:
+    if not isinstance(value, list) or len(value) < 2:
+        return False
+    first = value[0]
+    if not isinstance(first, dict) or 'name' not in first:
+        return False
+    keys = list(first)
+    return all(isinstance(place, dict) and list(place) == keys for place in value)
+
+def _is_coordinate(value: Any) -> bool:
+    return (isinstance(value, dict) and len(value) == 2
+            and isinstance(value.get('lat'), (int, float)) and isinstance(value.get('lng'), (int, float)))
+
+def pack_places(places: List[Dict[str, Any]], binary: bool = True) -> Dict[str, Any]:
+    """
+    Turn a list of same-shaped place dicts into columns
+    """
+    
+    keys = list(places[0])
+    columns = []
+    for key in keys:
+        values = [place[key] for place in places]
+        
+        if key == 'coordinates' and all(value is None or _is_coordinate(value) for value in values):
+            lat = array('i', (_NO_COORDINATE if value is None else round(value['lat'] * 1e6) for value in values))
+            lng = array('i', (_NO_COORDINATE if value is None else round(value['lng'] * 1e6) for value in values))
+            if binary:
+                columns.append(['c', lat.tobytes(), lng.tobytes()])
+            else:
+                columns.append(['c', lat.tolist(), lng.tolist()])
+            continue
+        
+        if all(isinstance(value, str) for value in values):
+            table = {}
+            indexes = [table.setdefault(value, len(table)) for value in values]
+            if len(table) * 2 <= len(values):
+                columns.append(['s', list(table), indexes])
+                continue
+        
+        columns.append(['v', values])
+    
+    return {_PLACES_MARKER: 1, 'n': len(places), 'keys': keys, 'cols': columns}
+
+def unpack_places(packed: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Rebuild the list of place dicts from pack_places output
+    """
+    
+    columns = []
+    for column in packed['cols']:
+        kind = column[0]
+        if kind == 'c':
+            lat, lng = column[1], column[2]
+            if isinstance(lat, bytes):
+                lat, lng = array('i', lat), array('i', lng)
+            columns.append([
+                None if y == _NO_COORDINATE else {'lat': round(y / 1e6, 6), 'lng': round(x / 1e6, 6)}
+                for y, x in zip(lat, lng)
+            ])
+        elif kind == 's':
+            table = column[1]
+            columns.append([table[index] for index in column[2]])
+        else:
+            columns.append(column[1])
+    
+    keys = packed['keys']
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+def to_wire(value: Any, binary: bool = True) -> Any:
+    """
+    Replace place lists (top level or one level down, e.g. a response's 'places') with columns
+    """
+    if _is_place_list(value):
+        return pack_places(value, binary)
+    if isinstance(value, dict):
+        return {key: pack_places(item, binary) if _is_place_list(item) else item for key, item in value.items()}
+    return value
+
+def from_wire(value: Any) -> Any:
+    if isinstance(value, dict):
+        if _PLACES_MARKER in value:
+            return unpack_places(value)
+        return {key: unpack_places(item) if isinstance(item, dict) and _PLACES_MARKER in item else item
+                for key, item in value.items()}
+    return value
+
+def encode(value: Any) -> bytes:
+    """
+    Compact bytes for a cacheable value. The first byte tells the format:
+    z = JSON + zlib, m = msgpack, j = JSON.
+    """
+    data = json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str).encode("utf-8")
+    if len(data) > _COMPRESS_ABOVE:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            return b"z" + compressed
+    if msgpack is not None:
+        return b"m" + msgpack.packb(value, use_bin_type=True, default=str)
+    return b"j" + data
+
+def decode(data: bytes) -> Any:
+    """
+    Value from encode() bytes; values cached in the earlier columnar format
+    (M = columnar msgpack + zlib) are still read.
+    """
+    kind, payload = data[:1], data[1:]
+    if kind in (b"M", b"z"):
+        payload = zlib.decompress(payload)
+    if kind in (b"m", b"M"):
+        if msgpack is None:
+            raise ValueError("Cached value was written with msgpack, which is not installed")
+        value = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    else:
+        value = json.loads(payload)
+    return from_wire(value)
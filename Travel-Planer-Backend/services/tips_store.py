@@ -0,0 +1,134 @@
+"""
+Tips Store - Precomputed travel tips per destination and category, backed by a JSON file
+
+Every worker process of serve.py holds its own copy of the table. Saving merges this
+process's new tips into the file as it is on disk (under a file lock), so workers never
+overwrite each other's tips, and picks up the tips the others added meanwhile.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Set
+
+from config import get_settings
+
+try:
+    import fcntl
+except ImportError:  # no file locks on this platform; saves only stay atomic
+    fcntl = None
+
+DEFAULT_TIPS_PATH = Path(__file__).resolve().parent.parent / "data" / "travel_tips.json"
+
+class TipsStore:
+    """
+    In-memory tips table loaded once from disk.
+    Layout: {destination_key: {category: [tip, ...]}}
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self._path = Path(path) if path else None
+        self._tips: Dict[str, Dict[str, List[str]]] = {}
+        # Categories set in this process since the last save: {destination_key: {category, ...}}
+        self._unsaved: Dict[str, Set[str]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = Path(get_settings().travel_tips_path or DEFAULT_TIPS_PATH)
+        return self._path
+    
+    @staticmethod
+    def destination_key(destination: str) -> str:
+        """
+        Normalize a destination ("Rome, Italy" -> "rome")
+        """
+        return destination.lower().split(',')[0].strip()
+    
+    def load(self) -> None:
+        """
+        Load the tips file into memory (no-op if already loaded)
+        """
+        
+        with self._lock:
+            if self._loaded:
+                return
+            self._tips = self._read()
+            if self._tips:
+                print(f"Loaded travel tips for {len(self._tips)} destinations from {self.path}")
+            self._loaded = True
+    
+    def _read(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        The tips table as it is on disk ({} if there is none or it can't be read)
+        """
+        
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading travel tips from {self.path}: {e}")
+            return {}
+    
+    def get(self, destination: str, category: str) -> Optional[List[str]]:
+        """
+        Get tips for a destination/category, or None on a miss
+        """
+        
+        if not self._loaded:
+            self.load()
+        return self._tips.get(self.destination_key(destination), {}).get(category)
+    
+    def set_many(self, destination: str, tips_by_category: Dict[str, List[str]], save: bool = True) -> None:
+        """
+        Store tips for several categories of a destination and write them back to disk
+        """
+        
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            key = self.destination_key(destination)
+            self._tips.setdefault(key, {}).update(tips_by_category)
+            self._unsaved.setdefault(key, set()).update(tips_by_category)
+            if save:
+                self._save()
+    
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+    
+    def _save(self) -> None:
+        """
+        Merge this process's unsaved tips into the file on disk and atomically replace it
+        (caller must hold the lock)
+        """
+        
+        if not self._unsaved:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_suffix(".lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                tips = self._read()
+                for key, categories in self._unsaved.items():
+                    entry = tips.setdefault(key, {})
+                    for category in categories:
+                        entry[category] = self._tips[key][category]
+                # Each process writes its own temporary file
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(tips, f, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            self._tips = tips
+            self._unsaved = {}
+        except OSError as e:
+            print(f"Error saving travel tips to {self.path}: {e}")
+
+# Shared store, loaded at application startup
+tips_store = TipsStore()
@@ -0,0 +1,171 @@
+"""
+Trip Session Store - Keeps planned trips so single days can be regenerated and
+background upgrades can be polled.
+
+Sessions live in a local SQLite file (TRIP_SESSION_PATH) like the job queue, so every
+worker process of serve.py sees the trips the others created: a follow-up request
+(GET /plan-trip/{trip_id}, .../regenerate) may land on any worker.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, List, Dict, Any, Optional
+
+from config import get_settings
+from schemas.models import Itinerary
+
+class TripSessionStore:
+    """
+    Trips keyed by trip id, with the parsed request, the place list and the itinerary.
+    The file is opened on first use, so each worker opens its own connections.
+    """
+    
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None, max_sessions: int = 1000):
+        self._path = path
+        self._ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._local = threading.local()
+    
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = get_settings().trip_session_path
+        return self._path
+    
+    @property
+    def ttl_seconds(self) -> int:
+        if self._ttl_seconds is None:
+            self._ttl_seconds = get_settings().trip_session_ttl_seconds
+        return self._ttl_seconds
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS trip_sessions (
+                    trip_id TEXT PRIMARY KEY,
+                    session TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS trip_sessions_updated ON trip_sessions (updated_at);
+            """)
+            self._local.connection = connection
+        return connection
+    
+    def create(self, destination_info: Dict[str, Any], places: List[Dict[str, Any]],
+               itinerary: Optional[Itinerary] = None, markdown: Optional[str] = None,
+               **fields: Any) -> str:
+        """
+        Save a new trip session and return its id.
+        itinerary is the structured plan (needed for day regeneration), markdown the text one.
+        """
+        
+        trip_id = uuid.uuid4().hex
+        session = {
+            'trip_id': trip_id,
+            'destination_info': destination_info,
+            'places': places,
+            'itinerary': itinerary,
+            'markdown': markdown,
+            **fields
+        }
+        
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            connection.execute(
+                "INSERT INTO trip_sessions (trip_id, session, updated_at) VALUES (?, ?, ?)",
+                (trip_id, _dump(session), now)
+            )
+            connection.execute("DELETE FROM trip_sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+            # Drop the oldest sessions once we are over capacity
+            connection.execute(
+                "DELETE FROM trip_sessions WHERE trip_id IN "
+                "(SELECT trip_id FROM trip_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        
+        return trip_id
+    
+    def get(self, trip_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a trip session, or None if it doesn't exist or has expired
+        """
+        
+        row = self._connection().execute(
+            "SELECT session, updated_at FROM trip_sessions WHERE trip_id = ?", (trip_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return {**_load(row[0]), 'updated_at': row[1]}
+    
+    def update(self, trip_id: str, **fields: Any) -> None:
+        """
+        Update fields of a trip session and refresh its expiry
+        """
+        self._modify(trip_id, lambda session: session.update(fields))
+    
+    def replace_days(self, trip_id: str, itinerary: Itinerary, days: List[int]) -> Itinerary:
+        """
+        Replace only the given days of the stored structured itinerary with those of
+        itinerary and return the result. The stored itinerary is read again in the same
+        transaction, so days regenerated concurrently by another request are kept.
+        """
+        
+        new_plans = {day_plan.day: day_plan for day_plan in itinerary.daily_plans if day_plan.day in days}
+        
+        def replace(session: Dict[str, Any]) -> None:
+            stored = session['itinerary']
+            daily_plans = [new_plans.get(day_plan.day, day_plan) for day_plan in stored.daily_plans]
+            session['itinerary'] = stored.model_copy(update={'daily_plans': daily_plans})
+        
+        return self._modify(trip_id, replace)['itinerary']
+    
+    def _modify(self, trip_id: str, change: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """
+        Read a session, change it and write it back in one transaction; returns the new session
+        """
+        
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT session FROM trip_sessions WHERE trip_id = ?", (trip_id,)).fetchone()
+            if row is None:
+                raise KeyError(trip_id)
+            session = _load(row[0])
+            change(session)
+            connection.execute(
+                "UPDATE trip_sessions SET session = ?, updated_at = ? WHERE trip_id = ?",
+                (_dump(session), time.time(), trip_id)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return session
+
+def _dump(session: Dict[str, Any]) -> str:
+    itinerary = session.get('itinerary')
+    if itinerary is not None:
+        session = {**session, 'itinerary': itinerary.model_dump(mode="json")}
+    return json.dumps(session, default=str)
+
+def _load(text: str) -> Dict[str, Any]:
+    session = json.loads(text)
+    if session.get('itinerary') is not None:
+        session['itinerary'] = Itinerary.model_validate(session['itinerary'])
+    return session
+
+# Shared store used by the API
+trip_sessions = TripSessionStore()
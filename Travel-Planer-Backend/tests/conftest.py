@@ -0,0 +1,9 @@
+"""
+Tests run from Travel-Planer-Backend or the repository root; the modules import
+each other as top-level packages (agents, services, schemas)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,53 @@
+"""
+The offline parser only splits a trip into stops for cities the traveller stays in
+"""
+
+from agents.destination_agent import _fallback_parse
+
+def test_origin_city_is_not_a_stop():
+    result = _fallback_parse("Flying from New York to Rome for a week of food")
+
+    assert result['destination'] == "Rome, Italy"
+    assert result['duration'] == 7
+    assert 'cities' not in result
+
+def test_home_city_is_not_a_stop():
+    result = _fallback_parse("I live in London, plan 4 days in Paris")
+
+    assert result['destination'] == "Paris, France"
+    assert result['duration'] == 4
+    assert 'cities' not in result
+
+def test_alternative_city_is_not_a_stop():
+    result = _fallback_parse("Rome or Paris for 5 days?")
+
+    assert result['destination'] == "Rome, Italy"
+    assert result['duration'] == 5
+    assert 'cities' not in result
+
+def test_word_durations_per_stop():
+    result = _fallback_parse("a week in Rome, 2 days in Florence")
+
+    assert result['cities'] == [
+        {"destination": "Rome, Italy", "days": 7},
+        {"destination": "Florence, Italy", "days": 2}
+    ]
+    assert result['duration'] == 9
+
+def test_connected_cities_share_the_trip_length():
+    result = _fallback_parse("Tokyo, Kyoto and Osaka for 10 days")
+
+    assert [city['destination'] for city in result['cities']] == ["Tokyo, Japan", "Kyoto, Japan", "Osaka, Japan"]
+    assert result['duration'] == 10
+
+def test_split_as_a_verb_is_not_a_city():
+    result = _fallback_parse("split 5 days between Rome and Florence")
+
+    assert [city['destination'] for city in result['cities']] == ["Rome, Italy", "Florence, Italy"]
+    assert result['duration'] == 5
+
+def test_days_before_a_list_of_cities_are_the_trip_length():
+    result = _fallback_parse("A week in Rome, Paris and Tokyo")
+
+    assert [city['destination'] for city in result['cities']] == ["Rome, Italy", "Paris, France", "Tokyo, Japan"]
+    assert result['duration'] == 7
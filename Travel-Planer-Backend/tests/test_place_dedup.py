@@ -0,0 +1,33 @@
+"""
+Copies of one place are merged; distinct places next to each other are kept apart
+"""
+
+from agents.place_dedup import dedupe_places, names_match, normalize_name
+from schemas.place_record import PlaceRecord
+
+def _match(first: str, second: str) -> bool:
+    return names_match(normalize_name(first), normalize_name(second))
+
+def _place(name: str, type: str, offset: float = 0.0) -> PlaceRecord:
+    return PlaceRecord(name, type=type, address="Paris, France", lat=48.8606 + offset, lng=2.3376)
+
+def test_spelling_variants_match():
+    assert _match("Vatican Museum", "Vatican Museums")
+    assert _match("Vatican Museums", "Vatican Museums Rome")
+    assert _match("St Peter's Basilica", "Saint Peter's Basilica")
+
+def test_cafe_and_shop_inside_a_place_do_not_match():
+    assert not _match("Louvre Museum", "Louvre Museum Cafe")
+    assert not _match("Museo Nazionale Romano", "Museo Nazionale Romano Bookshop")
+
+def test_short_names_differing_in_a_word_do_not_match():
+    assert not _match("St Mary Church", "St Mark Church")
+
+def test_places_of_different_kinds_are_not_merged():
+    places = dedupe_places([
+        _place("Louvre Museum", "museum"),
+        _place("Louvre Museum", "cafe", 0.0002),
+        _place("The Louvre Museum", "tourist_attraction", 0.0001)
+    ])
+
+    assert [(place.name, place.type) for place in places] == [("Louvre Museum", "museum"), ("Louvre Museum", "cafe")]
@@ -0,0 +1,45 @@
+"""
+The system prompts must be byte-identical for every trip, or the provider's prompt
+cache never reuses them
+"""
+
+from types import SimpleNamespace
+
+import agents.destination_agent as destination_agent
+from agents.destination_agent import PARSE_SYSTEM_PROMPT
+from agents.itinerary_agent import ITINERARY_SYSTEM_PROMPT, _itinerary_messages
+from agents.single_call_agent import SINGLE_CALL_SYSTEM_PROMPT
+
+ROME_PLACES = [
+    {'name': 'Colosseum', 'type': 'tourist_attraction', 'rating': 4.6, 'address': 'Rome, Italy'},
+    {'name': 'Da Enzo al 29', 'type': 'restaurant', 'rating': 4.7, 'address': 'Rome, Italy'}
+]
+
+def test_itinerary_system_message_is_the_same_for_different_trips():
+    first = _itinerary_messages("Rome, Italy", 3, ROME_PLACES, ['history'], "moderate")
+    second = _itinerary_messages("Tokyo, Japan", 7, [], ['food', 'art'], "luxury")
+
+    assert first[0]['role'] == second[0]['role'] == "system"
+    assert first[0]['content'].encode("utf-8") == second[0]['content'].encode("utf-8")
+    assert first[0]['content'] == ITINERARY_SYSTEM_PROMPT
+    # Trip details only appear in the user message
+    assert "Rome" not in first[0]['content'] and "Rome" in first[1]['content']
+
+def test_parse_system_message_is_the_same_for_different_requests(monkeypatch):
+    sent = []
+
+    def fake_chat_completion(messages, **kwargs):
+        sent.append(messages)
+        content = '{"destination": "Rome, Italy", "duration": 3, "interests": [], "travel_style": "moderate"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(destination_agent, "chat_completion", fake_chat_completion)
+    destination_agent._gpt_parse("3 days in Rome with history")
+    destination_agent._gpt_parse("A relaxing week in Bali, beaches and spa")
+
+    first, second = sent
+    assert first[0]['content'].encode("utf-8") == second[0]['content'].encode("utf-8") == PARSE_SYSTEM_PROMPT.encode("utf-8")
+    assert first[1]['content'] != second[1]['content']
+
+def test_single_call_prompt_starts_with_the_itinerary_prompt():
+    assert SINGLE_CALL_SYSTEM_PROMPT.startswith(ITINERARY_SYSTEM_PROMPT)